@@ -1,21 +1,14 @@
 import streamlit as st
-import os
 import uuid
 from datetime import datetime, date
 from src.config import Config
 from src.ingestion import IngestionManager
-from src.extractor import PrescriptionExtractor
-from src.vector_store import VectorStoreManager
-from src.graph import RAGGraph
-from src.memory import MemoryManager
-from src.auth import AuthManager
-from src.otc_manager import OTCManager
-from src.reminder import ReminderManager
-from src.pharmacy_locator import PharmacyLocator, SAMPLE_PHARMACIES
+from src.graph import stream_answer
+from src.pharmacy_locator import SAMPLE_PHARMACIES
 from src.language import LanguageManager
-from src.utils import setup_logger
+from src.resources import get_resources
+from src.utils import setup_logger, save_upload
 from src.ui_pages_medical import render_medication_schedule_page, render_pharmacy_finder_page
-from src.voice_assistant import VoiceAssistant
 
 logger = setup_logger(__name__)
 
@@ -37,9 +30,17 @@ def load_medical_styles():
 
 load_medical_styles()
 
+# Heavy clients are built once per process and shared by every session.
+# Start building them while the user is still on the login screen.
+resources = get_resources()
+if not resources.is_built("rag_graph"):
+    if 'resources_warming' not in st.session_state:
+        resources.warm_up(["memory", "vector_store", "extractor", "rag_graph", "otc_manager"])
+        st.session_state.resources_warming = True
+
 # Initialize Auth
 if 'auth' not in st.session_state:
-    st.session_state.auth = AuthManager()
+    st.session_state.auth = resources.get("auth")
 if 'user' not in st.session_state:
     st.session_state.user = None
 
@@ -124,39 +125,63 @@ if not st.session_state.user:
     st.stop()
 
 # === INITIALIZE MANAGERS ===
-if 'extractor' not in st.session_state:
-    st.session_state.extractor = PrescriptionExtractor()
-if 'vector_store' not in st.session_state:
-    st.session_state.vector_store = VectorStoreManager()
-if 'rag_graph' not in st.session_state:
-    st.session_state.rag_graph = RAGGraph().build_graph()
-if 'memory' not in st.session_state:
-    st.session_state.memory = MemoryManager()
-elif not hasattr(st.session_state.memory, 'get_otc_result'):
-    st.session_state.memory = MemoryManager()
-if 'otc_manager' not in st.session_state:
-    st.session_state.otc_manager = OTCManager()
-if 'reminder_manager' not in st.session_state:
-    st.session_state.reminder_manager = ReminderManager()
-if 'pharmacy_locator' not in st.session_state:
-    st.session_state.pharmacy_locator = PharmacyLocator()
+for resource_name in ("extractor", "vector_store", "rag_graph", "memory", "otc_manager",
+                      "reminder_manager", "pharmacy_locator", "voice_assistant", "job_queue"):
+    if resource_name not in st.session_state:
+        st.session_state[resource_name] = resources.get(resource_name)
+if not hasattr(st.session_state.memory, 'get_otc_result'):
+    resources.reset("memory")
+    st.session_state.memory = resources.get("memory")
 if 'language_manager' not in st.session_state:
     st.session_state.language_manager = LanguageManager()
 if 'user_language' not in st.session_state:
     st.session_state.user_language = "en"
-if 'voice_assistant' not in st.session_state:
-    st.session_state.voice_assistant = VoiceAssistant()
 
 # Self-healing OTC Manager
 try:
     if st.session_state.otc_manager.get_otc_list() and isinstance(st.session_state.otc_manager.get_otc_list()[0], str):
-        st.session_state.otc_manager = OTCManager()
+        resources.reset("otc_manager")
+        st.session_state.otc_manager = resources.get("otc_manager")
 except Exception as e:
     logger.error(f"Error checking OTCManager: {e}")
-    st.session_state.otc_manager = OTCManager()
+    resources.reset("otc_manager")
+    st.session_state.otc_manager = resources.get("otc_manager")
 
 if 'uploaded_files_map' not in st.session_state:
-    st.session_state.uploaded_files_map = {}
+    st.session_state.uploaded_files_map = {}  # uploader file id -> (sha256, stored path)
+if 'upload_jobs' not in st.session_state:
+    st.session_state.upload_jobs = {}  # sha256 -> upload job id
+
+UPLOAD_STAGES = {
+    "queued": "⏳ Waiting to start...",
+    "extracting": "🔄 Processing prescription...",
+    "indexing": "🔄 Indexing in database...",
+}
+
+@st.fragment(run_every=Config.JOB_POLL_INTERVAL)
+def render_upload_job(content_sha):
+    """Polls an upload job and shows its stage and the medicines found so far."""
+    job_id = st.session_state.upload_jobs.get(content_sha)
+    job = st.session_state.job_queue.get(job_id) if job_id else None
+    if job is None:
+        return
+    result = job.get("result") or {}
+    if job["status"] == "done":
+        st.session_state.upload_jobs.pop(content_sha, None)
+        st.session_state.current_view = result.get("prescription_id")
+        st.rerun()
+    elif job["status"] == "failed":
+        st.error(f"⚠️ Failed to process prescription: {job.get('error')}")
+        if st.button("🔁 Retry", key=f"retry_{content_sha}", use_container_width=True):
+            st.session_state.upload_jobs.pop(content_sha, None)
+            st.rerun()
+    else:
+        st.info(UPLOAD_STAGES.get(job.get("stage") or job["status"], "🔄 Processing prescription..."))
+        medicines = (result.get("extraction") or {}).get("medicines")
+        if medicines:
+            st.success("✅ Prescription processed")
+            for med in medicines:
+                st.caption(f"💊 {med.get('name')}")
 
 # Translation helper
 def get_ui_text(key: str) -> str:
@@ -241,65 +266,44 @@ with st.sidebar:
         )
         
         if uploaded_file:
-            existing_p_id = st.session_state.memory.get_prescription_by_filename(
-                st.session_state.user, uploaded_file.name
-            )
+            # Hash each uploaded file once; reruns reuse the digest
+            upload_key = getattr(uploaded_file, "file_id", None) or f"{uploaded_file.name}:{uploaded_file.size}"
+            if upload_key not in st.session_state.uploaded_files_map:
+                st.session_state.uploaded_files_map[upload_key] = save_upload(
+                    uploaded_file, Config.INPUT_DIR, uploaded_file.name
+                )
+            content_sha, file_path = st.session_state.uploaded_files_map[upload_key]
+            known_upload = st.session_state.memory.get_upload(content_sha)
             
-            if existing_p_id:
+            if known_upload:
+                existing_p_id = known_upload["prescription_id"]
                 if st.session_state.get('current_view') != existing_p_id:
+                    # Same bytes were processed before: reuse the extraction and the stored vectors
                     st.info("📌 Prescription already in system. Loading...")
+                    st.session_state.memory.get_or_create_session(
+                        st.session_state.user, existing_p_id,
+                        title=known_upload.get("title"), filename=uploaded_file.name,
+                        details=known_upload.get("details"),
+                        context_chunks=known_upload.get("context_chunks"),
+                        medicines=(known_upload.get("extraction") or {}).get("medicines")
+                    )
                     st.session_state.current_view = existing_p_id
                     st.rerun()
             else:
-                file_id = str(uuid.uuid4())
-                from src.utils import ensure_directory
-                ensure_directory(Config.INPUT_DIR)
-                
-                file_path = os.path.join(Config.INPUT_DIR, uploaded_file.name)
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-                
-                if file_path not in st.session_state.uploaded_files_map.values():
-                    with st.spinner("🔄 Processing prescription..."):
-                        data = st.session_state.extractor.extract_data(file_path)
-                        
-                        if data:
-                            st.success("✅ Prescription processed")
-                            
-                            med_details = []
-                            for med in data.get('medicines', []):
-                                timing = med.get('timing', {})
-                                timing_str = f"Morning: {timing.get('morning')}, Afternoon: {timing.get('afternoon')}, Night: {timing.get('night')}, Instruction: {timing.get('instruction')}"
-                                med_details.append(
-                                    f"- {med.get('name')} (Qty: {med.get('quantity')}): {timing_str}, Freq: {med.get('frequency')}, Duration: {med.get('duration')}"
-                                )
-                            
-                            meds_str = "\n".join(med_details)
-                            text_content = f"Date: {data.get('date')}\n\nMedicines:\n{meds_str}\n\nNotes: {data.get('notes')}"
-                            
-                            metadata = {"filename": uploaded_file.name}
-                            st.session_state.vector_store.add_prescription(file_id, [text_content], metadata)
-                            
-                            st.session_state.uploaded_files_map[file_id] = uploaded_file.name
-                            
-                            med_names = [m.get('name', 'Unknown') for m in data.get('medicines', [])]
-                            if med_names:
-                                title = f"Rx: {', '.join(med_names[:2])}"
-                                if len(med_names) > 2:
-                                    title += "..."
-                            else:
-                                title = f"Rx: {uploaded_file.name}"
-                            
-                            st.session_state.memory.get_or_create_session(
-                                st.session_state.user, file_id, 
-                                title=title, filename=uploaded_file.name, details=meds_str
-                            )
-                            
-                            st.success("✅ Indexed in database")
-                            st.session_state.current_view = file_id
-                            st.rerun()
-                        else:
-                            st.error("⚠️ Failed to process prescription")
+                # Extraction and indexing run on the job queue; the page stays responsive meanwhile
+                if content_sha not in st.session_state.upload_jobs:
+                    st.session_state.upload_jobs[content_sha] = st.session_state.job_queue.submit(
+                        "upload",
+                        {
+                            "user_id": st.session_state.user,
+                            "prescription_id": str(uuid.uuid4()),
+                            "filename": uploaded_file.name,
+                            "file_path": file_path,
+                            "content_sha": content_sha,
+                        },
+                        dedup_key=f"{st.session_state.user}:{content_sha}"
+                    )
+                render_upload_job(content_sha)
 
         st.markdown("<div style='margin: 1rem 0 0.5rem 0;'></div>", unsafe_allow_html=True)
         
@@ -503,7 +507,10 @@ elif page == get_ui_text("my_prescriptions"):
                                 st.session_state[cache_key] = db_result
                             else:
                                 with st.spinner("🔄 Checking drug safety..."):
-                                    result = st.session_state.otc_manager.check_medicines_with_llm([details_text])
+                                    medicines = st.session_state.memory.get_session_medicines(st.session_state.session_id)
+                                    result = st.session_state.otc_manager.check_prescription(
+                                        medicines=medicines, details=details_text
+                                    )
                                     st.session_state[cache_key] = result
                                     
                                     if "error" not in result:
@@ -583,7 +590,22 @@ elif page == get_ui_text("my_prescriptions"):
                 
                 st.session_state['listening_chat'] = False
         
-        history = st.session_state.memory.get_history(st.session_state.session_id)
+        # Walk back from the newest page; "Load earlier" adds one more page per click
+        pages_key = f"history_pages_{st.session_state.session_id}"
+        history, cursor = [], None
+        for _ in range(st.session_state.get(pages_key, 1)):
+            page_msgs, cursor = st.session_state.memory.get_history_page(
+                st.session_state.session_id, before=cursor, page_size=Config.CHAT_PAGE_SIZE
+            )
+            history = page_msgs + history
+            if cursor is None:
+                break
+
+        if cursor is not None:
+            if st.button("⬆️ Load earlier messages", key=f"load_earlier_{st.session_state.session_id}"):
+                st.session_state[pages_key] = st.session_state.get(pages_key, 1) + 1
+                st.rerun()
+
         st.session_state.messages = [{"role": msg['role'], "content": msg['content']} for msg in history]
         
         for i, msg in enumerate(st.session_state.messages):
@@ -610,31 +632,28 @@ elif page == get_ui_text("my_prescriptions"):
             with st.chat_message("user"):
                 st.markdown(prompt)
             
-            with st.spinner("🔄 Analyzing query..."):
-                inputs = {
-                    "question": prompt,
-                    "prescription_id": selected_prescription_id,
-                    "session_id": st.session_state.session_id,
-                    "context": [],
-                    "answer": ""
-                }
-                
-                result = st.session_state.rag_graph.invoke(inputs)
-                answer = result["answer"]
-                
+            inputs = {
+                "question": prompt,
+                "prescription_id": selected_prescription_id,
+                "session_id": st.session_state.session_id,
+                "context": [],
+                "answer": ""
+            }
+
+            with st.chat_message("ai"):
+                # Tokens are rendered as they arrive; the graph saves the turn when the stream ends
+                answer = st.write_stream(stream_answer(st.session_state.rag_graph, inputs))
                 st.session_state.messages.append({"role": "ai", "content": answer})
-                with st.chat_message("ai"):
-                    st.markdown(answer)
-                    # Auto-play response for voice query
-                    if voice_input:
-                        try:
-                            audio_bytes = st.session_state.voice_assistant.text_to_speech(
-                                answer, 
-                                st.session_state.user_language
-                            )
-                            if audio_bytes:
-                                st.audio(audio_bytes, format='audio/mp3', autoplay=True)
-                        except:
-                            pass
-                
-                st.rerun()
+                # Auto-play response for voice query
+                if voice_input:
+                    try:
+                        audio_bytes = st.session_state.voice_assistant.text_to_speech(
+                            answer, 
+                            st.session_state.user_language
+                        )
+                        if audio_bytes:
+                            st.audio(audio_bytes, format='audio/mp3', autoplay=True)
+                    except:
+                        pass
+
+            st.rerun()
@@ -0,0 +1,54 @@
+"""
+Upload size and extraction latency with and without image preprocessing.
+
+Runs PrescriptionExtractor on each image twice, once sending the original
+file and once the preprocessed one, bypassing the extraction cache. Needs
+GOOGLE_API_KEY. With --dry-run only the preprocessing is measured.
+
+    python bench_image_preprocess.py data/input/*.jpg [--max-edge 2048] [--format JPEG] [--dry-run]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+from src.config import Config
+from src.image_preprocess import preprocess_image
+
+def timed_extract(extractor, path, preprocess):
+    Config.IMAGE_PREPROCESS = preprocess
+    start = time.perf_counter()
+    result = extractor._extract(path)
+    return time.perf_counter() - start, result is not None
+
+def run(args):
+    extractor = None
+    if not args.dry_run:
+        from src.extractor import PrescriptionExtractor
+        extractor = PrescriptionExtractor()
+
+    header = f"{'file':<28} {'orig KB':>8} {'sent KB':>8} {'saved':>6} {'prep ms':>8}"
+    print(header + (f" {'orig s':>7} {'prep s':>7}" if extractor else ""))
+    for path in args.images:
+        prepared = preprocess_image(path, max_edge=args.max_edge, image_format=args.format)
+        line = (
+            f"{os.path.basename(path)[:28]:<28} {prepared.original_bytes / 1024:>8.0f} "
+            f"{len(prepared.data) / 1024:>8.0f} {prepared.bytes_saved / prepared.original_bytes:>6.0%} "
+            f"{prepared.seconds * 1000:>8.0f}"
+        )
+        if extractor:
+            Config.IMAGE_MAX_EDGE, Config.IMAGE_FORMAT = args.max_edge, args.format
+            original_s, _ = timed_extract(extractor, path, preprocess=False)
+            prepared_s, _ = timed_extract(extractor, path, preprocess=True)
+            line += f" {original_s:>7.2f} {prepared_s:>7.2f}"
+        print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--max-edge", type=int, default=Config.IMAGE_MAX_EDGE)
+    parser.add_argument("--format", default=Config.IMAGE_FORMAT)
+    parser.add_argument("--dry-run", action="store_true")
+    run(parser.parse_args())
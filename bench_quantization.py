@@ -0,0 +1,95 @@
+"""
+Recall vs latency benchmark for LocalVectorIndex storage options.
+
+Compares int8 quantization and Matryoshka truncation against the
+full-precision float32 index. Uses real embeddings from the embedding cache
+when it has enough of them, otherwise synthetic clustered vectors.
+
+    python bench_quantization.py [--vectors 5000] [--queries 200] [--top-k 10]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from src.config import Config
+from src.vector_backends import LocalVectorIndex
+
+CONFIGS = [
+    ("float32 / full", None, None),
+    ("int8 / full", "int8", None),
+    ("float32 / 1536", None, 1536),
+    ("float32 / 768", None, 768),
+    ("int8 / 768", "int8", 768),
+    ("int8 / 256", "int8", 256),
+]
+
+def cached_embeddings(limit):
+    """Loads up to `limit` real vectors from the embedding cache, if present."""
+    if not os.path.exists(Config.EMBEDDING_CACHE_PATH):
+        return None
+    conn = sqlite3.connect(Config.EMBEDDING_CACHE_PATH)
+    rows = conn.execute("SELECT vector FROM embeddings LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    vectors = [np.frombuffer(blob, dtype=np.float32) for (blob,) in rows]
+    vectors = [v for v in vectors if v.shape == (Config.EMBEDDING_DIMENSION,)]
+    return np.stack(vectors) if len(vectors) >= 100 else None
+
+def synthetic_embeddings(count, dimension, seed=0):
+    """Clustered vectors whose variance decays with the component index, like MRL embeddings."""
+    rng = np.random.default_rng(seed)
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dimension) / 64.0)
+    centers = rng.normal(size=(max(1, count // 20), dimension)) * decay
+    labels = rng.integers(0, len(centers), size=count)
+    noise = rng.normal(scale=0.35, size=(count, dimension)) * decay
+    return (centers[labels] + noise).astype(np.float32)
+
+def build_index(vectors, quantization, truncate_dim):
+    index = LocalVectorIndex(dimension=vectors.shape[1], quantization=quantization, truncate_dim=truncate_dim)
+    batch = 500
+    for start in range(0, len(vectors), batch):
+        index.upsert([(str(i), vectors[i], {}) for i in range(start, min(start + batch, len(vectors)))])
+    return index
+
+def run(args):
+    vectors = cached_embeddings(args.vectors)
+    source = "embedding cache"
+    if vectors is None:
+        vectors = synthetic_embeddings(args.vectors, Config.EMBEDDING_DIMENSION)
+        source = "synthetic"
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=args.queries, replace=False)]
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+
+    print(f"{len(vectors)} vectors ({source}), {len(queries)} queries, top_k={args.top_k}\n")
+    print(f"{'config':<16} {'bytes/vec':>10} {'index MB':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+
+    baseline = None
+    for name, quantization, truncate_dim in CONFIGS:
+        index = build_index(vectors, quantization, truncate_dim)
+        latencies = []
+        results = []
+        for q in queries:
+            start = time.perf_counter()
+            matches = index.query(q, top_k=args.top_k).matches
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append({m.id for m in matches})
+        if baseline is None:
+            baseline = results
+        recall = np.mean([len(r & b) / len(b) for r, b in zip(results, baseline)])
+        total = index.memory_bytes()
+        print(
+            f"{name:<16} {total / len(vectors):>10.0f} {total / 1e6:>9.1f} "
+            f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f} {recall:>9.3f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    run(parser.parse_args())
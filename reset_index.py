@@ -1,5 +1,6 @@
 
 from pinecone import Pinecone
+from src.bootstrap import IndexManifest
 from src.config import Config
 from src.utils import setup_logger
 
@@ -14,6 +15,8 @@ def reset_index():
             print(f"Deleting index: {index_name}...")
             pc.delete_index(index_name)
             print("Index deleted.")
+            # Recorded index/OTC state no longer matches, so re-verify on next start
+            IndexManifest().clear()
         else:
             print(f"Index {index_name} does not exist.")
             
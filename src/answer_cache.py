@@ -0,0 +1,135 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from src.config import Config
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def _normalize_question(question):
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+class SemanticAnswerCache:
+    """
+    Caches RAG answers per (prescription_id, session_id, language). Answers
+    are built from the session's history and summary, so they are never
+    served to another conversation, even on the same prescription.
+    A question hits when it matches a cached one verbatim (after normalisation)
+    or when its embedding's cosine similarity is at least `threshold`.
+    Entries expire after `ttl_seconds` and the least recently used ones are
+    evicted beyond `max_entries`.
+    """
+    def __init__(self, threshold=None, ttl_seconds=None, max_entries=None):
+        self.threshold = threshold or Config.ANSWER_CACHE_THRESHOLD
+        self.ttl_seconds = ttl_seconds or Config.ANSWER_CACHE_TTL
+        self.max_entries = max_entries or Config.ANSWER_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry:
+            bucket = self._buckets.get(entry["bucket"])
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[entry["bucket"]]
+
+    def _live_entries(self, bucket_key):
+        now = time.time()
+        live = []
+        for entry_id in list(self._buckets.get(bucket_key, ())):
+            if now - self._entries[entry_id]["created"] > self.ttl_seconds:
+                self._drop(entry_id)
+            else:
+                live.append(entry_id)
+        return live
+
+    def lookup(self, prescription_id, session_id, language, question, embed_fn=None):
+        """
+        Returns a cached answer or None. embed_fn(question) is only called when
+        there is no verbatim match and the bucket has candidates.
+        """
+        bucket_key = (prescription_id, session_id, language)
+        normalized = _normalize_question(question)
+        with self._lock:
+            candidates = self._live_entries(bucket_key)
+            best_id = next((i for i in candidates if self._entries[i]["question"] == normalized), None)
+
+        if best_id is None and candidates and embed_fn is not None:
+            query = np.asarray(embed_fn(question), dtype=np.float32)
+            query /= np.linalg.norm(query) or 1.0
+            with self._lock:
+                best_score = self.threshold
+                for entry_id in candidates:
+                    entry = self._entries.get(entry_id)
+                    if entry is None or entry["vector"] is None:
+                        continue
+                    score = float(entry["vector"] @ query)
+                    if score >= best_score:
+                        best_id, best_score = entry_id, score
+
+        with self._lock:
+            if best_id is None or best_id not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id]["answer"]
+
+    def store(self, prescription_id, session_id, language, question, answer, embedding=None):
+        bucket_key = (prescription_id, session_id, language)
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "bucket": bucket_key,
+                "question": _normalize_question(question),
+                "vector": vector,
+                "answer": answer,
+                "created": time.time(),
+            }
+            self._buckets.setdefault(bucket_key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, prescription_id):
+        """Drops every cached answer for a prescription, e.g. after it is re-indexed."""
+        with self._lock:
+            stale = [i for i, e in self._entries.items() if e["bucket"][0] == prescription_id]
+            for entry_id in stale:
+                self._drop(entry_id)
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached answer(s) for prescription {prescription_id}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_answer_cache():
+    """Process-wide answer cache shared by every RAGGraph."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SemanticAnswerCache()
+        return _shared_cache
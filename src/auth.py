@@ -1,14 +1,13 @@
 import bcrypt
-from pymongo import MongoClient
 from datetime import datetime
-from src.config import Config
+from src.db import get_mongo_client
 from src.utils import setup_logger
 
 logger = setup_logger(__name__)
 
 class AuthManager:
     def __init__(self):
-        self.client = MongoClient(Config.MONGO_URI, **Config.get_tls_kwargs())
+        self.client = get_mongo_client()
         self.db = self.client.get_database("prescription_db")
         self.users = self.db.users
 
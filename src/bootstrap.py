@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import threading
+from src.config import Config
+from src.utils import setup_logger, ensure_directory
+
+logger = setup_logger(__name__)
+
+_lock = threading.RLock()
+_verified = set()
+
+
+def content_hash(value):
+    """Stable SHA-256 of any JSON-serialisable value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def run_once(key, check):
+    """
+    Runs check() the first time `key` is seen in this process and remembers it
+    if it succeeds (returns anything but False). Later calls are free.
+    """
+    with _lock:
+        if key in _verified:
+            return True
+        if check() is not False:
+            _verified.add(key)
+            return True
+        return False
+
+
+def forget(key=None):
+    """Forgets process-level verification, e.g. after an index was deleted."""
+    with _lock:
+        if key is None:
+            _verified.clear()
+        else:
+            _verified.discard(key)
+
+
+class IndexManifest:
+    """
+    Small JSON file recording what has already been verified or ingested
+    (index name and dimension, OTC list hash and per-item hashes), so a new
+    process can skip the network checks while nothing has changed.
+    """
+    def __init__(self, path=None):
+        self.path = path or Config.INDEX_MANIFEST_PATH
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable index manifest {self.path}: {e}")
+            return {}
+
+    def get(self, section):
+        return self.read().get(section)
+
+    def update(self, section, value):
+        with _lock:
+            manifest = self.read()
+            manifest[section] = value
+            ensure_directory(os.path.dirname(self.path))
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(self.path + ".tmp", self.path)
+
+    def clear(self):
+        with _lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        forget()
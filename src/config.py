@@ -9,12 +9,71 @@ class Config:
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
     MONGO_URI = os.getenv("MONGO_URI")
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000"))
     PINECONE_INDEX_NAME = "prescription-index"
     PINECONE_ENV = "us-east-1"
+    VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")  # "pinecone" or "local"
+    # Namespaces served from the local index even when Pinecone is the main backend
+    LOCAL_NAMESPACES = [ns.strip() for ns in os.getenv("LOCAL_NAMESPACES", "").split(",") if ns.strip()]
     GEMINI_MODEL_NAME = "gemini-2.5-flash-lite"
+    EMBEDDING_MODEL_NAME = "models/gemini-embedding-001"
+    EMBEDDING_DIMENSION = 3072
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))  # batchEmbedContents accepts up to 100 texts
+    # Prescriptions with at most this many chunks are served without a vector search
+    # (a top_k=5 search would return every chunk anyway).
+    DIRECT_CONTEXT_MAX_CHUNKS = int(os.getenv("DIRECT_CONTEXT_MAX_CHUNKS", "5"))
+    DIRECT_CONTEXT_CACHE_SIZE = 1000
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+    ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))  # seconds
+    ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "2000"))
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+    PROMPT_HISTORY_MESSAGES = 6  # most recent messages kept verbatim in the prompt
+    HISTORY_WINDOW = 12  # messages loaded per turn; older ones are only in the summary
+    CHAT_PAGE_SIZE = 20  # messages per page when showing a transcript
+    # Ask Gemini for application/json responses where the output is parsed as JSON
+    GEMINI_JSON_MODE = os.getenv("GEMINI_JSON_MODE", "true").lower() == "true"
+    # Verify all ambiguous medicines of a prescription in one LLM call instead of one call each
+    OTC_BATCH_VERIFICATION = os.getenv("OTC_BATCH_VERIFICATION", "true").lower() == "true"
+    OTC_VERDICT_CACHE_SIZE = int(os.getenv("OTC_VERDICT_CACHE_SIZE", "5000"))  # in-memory LRU in front of MongoDB
     DATA_DIR = os.path.join(os.getcwd(), "data")
     INPUT_DIR = os.path.join(DATA_DIR, "input")
     PROCESSED_DIR = os.path.join(DATA_DIR, "processed")
+    CACHE_DIR = os.path.join(DATA_DIR, "cache")
+    INDEX_MANIFEST_PATH = os.path.join(CACHE_DIR, "index_manifest.json")
+    LOCAL_INDEX_DIR = os.path.join(DATA_DIR, "vector_index")
+    LOCAL_INDEX_QUANTIZATION = os.getenv("LOCAL_INDEX_QUANTIZATION", "none")  # "none" or "int8"
+    LOCAL_INDEX_TRUNCATE_DIM = int(os.getenv("LOCAL_INDEX_TRUNCATE_DIM", "0")) or None  # e.g. 768 (Matryoshka)
+    LOCAL_INDEX_MAX_SEGMENTS = int(os.getenv("LOCAL_INDEX_MAX_SEGMENTS", "32"))  # merged into one when an index is opened
+    EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embeddings.sqlite3")
+    EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "5000"))  # in-memory LRU entries
+    # Prescription photos are downscaled and re-encoded before they are sent to Gemini
+    IMAGE_PREPROCESS = os.getenv("IMAGE_PREPROCESS", "true").lower() == "true"
+    IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "2048"))  # pixels, longest side
+    IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG")  # "JPEG" or "WEBP"
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+    IMAGE_GRAYSCALE = os.getenv("IMAGE_GRAYSCALE", "true").lower() == "true"
+    # Gemini File API uploads (PDFs)
+    GEMINI_UPLOAD_WORKERS = int(os.getenv("GEMINI_UPLOAD_WORKERS", "4"))
+    GEMINI_UPLOAD_DEADLINE = float(os.getenv("GEMINI_UPLOAD_DEADLINE", "120"))  # seconds until PROCESSING gives up
+    GEMINI_POLL_INITIAL_DELAY = 0.5  # seconds; doubles each poll, with full jitter
+    GEMINI_POLL_MAX_DELAY = 8.0
+    GEMINI_FILE_TTL = 47 * 3600  # the File API deletes uploads after 48 hours
+    # Multi-page PDFs are extracted page by page in parallel
+    PDF_PAGE_PARALLEL = os.getenv("PDF_PAGE_PARALLEL", "true").lower() == "true"
+    PDF_PAGE_WORKERS = int(os.getenv("PDF_PAGE_WORKERS", "4"))
+    PDF_MIN_PAGE_TEXT = 40  # characters of text layer needed to send a page as text
+    # Text-layer PDFs are parsed locally; Gemini is used only below this confidence
+    RX_TEXT_FAST_PATH = os.getenv("RX_TEXT_FAST_PATH", "true").lower() == "true"
+    RX_PARSER_MIN_CONFIDENCE = float(os.getenv("RX_PARSER_MIN_CONFIDENCE", "0.7"))
+    # Background upload jobs (extract -> embed -> index)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_HEARTBEAT_INTERVAL = int(os.getenv("JOB_HEARTBEAT_INTERVAL", "15"))  # seconds between heartbeats and sweeps
+    JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "60"))  # seconds without a heartbeat before a job is resumed
+    JOB_POLL_INTERVAL = 2  # seconds between UI status refreshes
+    EXTRACTION_CACHE_PATH = os.path.join(CACHE_DIR, "extractions.sqlite3")
+    EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "1000"))  # rows kept, least recently used evicted
 
     @staticmethod
     def get_tls_kwargs():
@@ -26,12 +85,21 @@ class Config:
             "socketTimeoutMS": 5000
         }
 
+    @staticmethod
+    def get_pool_kwargs():
+        """Connection pool limits for the shared MongoClient"""
+        return {
+            "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+            "waitQueueTimeoutMS": Config.MONGO_WAIT_QUEUE_TIMEOUT_MS
+        }
+
     @staticmethod
     def validate():
         """Validate that all necessary API keys are present."""
         if not Config.MONGO_URI:
             raise ValueError("MONGO_URI is missing in .env")
-        if not Config.PINECONE_API_KEY:
+        if not Config.PINECONE_API_KEY and Config.VECTOR_BACKEND != "local":
             raise ValueError("PINECONE_API_KEY is missing in .env")
         if not Config.GOOGLE_API_KEY:
             print("Warning: GOOGLE_API_KEY is missing. Ensure you have access.")
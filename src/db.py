@@ -0,0 +1,100 @@
+import threading
+from pymongo import MongoClient, monitoring
+from src.config import Config
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks connection pool usage across every server of a client."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkout_failures = 0
+
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "checkout_failures": self.checkout_failures,
+            }
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def connection_created(self, event):
+        self._add(open=1)
+
+    def connection_closed(self, event):
+        self._add(open=-1)
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+_clients = {}
+_listeners = {}
+_lock = threading.Lock()
+
+def get_mongo_client(uri=None):
+    """
+    Returns the process-wide MongoClient for a URI.
+    MongoClient is thread-safe and pools connections itself, so every manager
+    and every Streamlit session shares one client instead of opening its own pool.
+    """
+    uri = uri or Config.MONGO_URI
+    with _lock:
+        client = _clients.get(uri)
+        if client is None:
+            listener = PoolStatsListener()
+            client = MongoClient(
+                uri,
+                event_listeners=[listener],
+                **Config.get_tls_kwargs(),
+                **Config.get_pool_kwargs()
+            )
+            _clients[uri] = client
+            _listeners[uri] = listener
+            logger.info(f"Created shared MongoClient (maxPoolSize={Config.MONGO_MAX_POOL_SIZE})")
+        return client
+
+def pool_stats(uri=None):
+    """Checked-out, waiting and open connection counts for the shared client."""
+    listener = _listeners.get(uri or Config.MONGO_URI)
+    stats = listener.snapshot() if listener else {}
+    stats["max_pool_size"] = Config.MONGO_MAX_POOL_SIZE
+    return stats
@@ -0,0 +1,166 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from src.config import Config
+from src.utils import setup_logger, ensure_directory
+
+logger = setup_logger(__name__)
+
+QUERY_TASK = "RETRIEVAL_QUERY"
+DOCUMENT_TASK = "RETRIEVAL_DOCUMENT"
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache.
+    An in-memory LRU sits in front of a SQLite table that stores vectors as
+    float32 blobs, so embeddings survive restarts and are shared between processes.
+    """
+    def __init__(self, path=None, max_items=None):
+        self.path = path
+        self.max_items = max_items or Config.EMBEDDING_CACHE_SIZE
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            try:
+                ensure_directory(os.path.dirname(path))
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"Embedding cache disk layer disabled ({path}): {e}")
+                self._conn = None
+
+    @staticmethod
+    def make_key(model, task_type, text):
+        return hashlib.sha256(f"{model}\x1f{task_type}\x1f{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """Returns {key: vector} for every cached key, counting hits and misses."""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    missing.append(key)
+
+            if missing and self._conn:
+                placeholders = ",".join("?" * len(missing))
+                try:
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+                    ).fetchall()
+                except sqlite3.Error as e:
+                    logger.warning(f"Embedding cache read failed: {e}")
+                    rows = []
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    vector = vector.tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                self.misses += len(missing) - len(rows)
+            else:
+                self.misses += len(missing)
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items):
+        """Stores (key, vector) pairs in both layers."""
+        items = list(items)
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, list(vector))
+            if self._conn:
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        [(key, array("f", vector).tobytes()) for key, vector in items]
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Embedding cache write failed: {e}")
+
+    def put(self, key, vector):
+        self.put_many([(key, vector)])
+
+    def stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+        }
+
+
+class CachedEmbeddings:
+    """
+    Drop-in wrapper around a LangChain embeddings object.
+    Only texts missing from the cache are sent to the underlying model.
+    """
+    def __init__(self, embeddings, cache, model_name=None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name or getattr(embeddings, "model", Config.EMBEDDING_MODEL_NAME)
+
+    def embed_query(self, text):
+        key = self.cache.make_key(self.model_name, QUERY_TASK, text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put(key, vector)
+        return vector
+
+    def embed_documents(self, texts):
+        keys = [self.cache.make_key(self.model_name, DOCUMENT_TASK, text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing = OrderedDict()
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing[key] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            self.cache.put_many(fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_embedding_cache():
+    """Process-wide cache shared by every VectorStoreManager."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache(Config.EMBEDDING_CACHE_PATH)
+        return _shared_cache
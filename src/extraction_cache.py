@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from src.config import Config
+from src.utils import setup_logger, ensure_directory
+
+logger = setup_logger(__name__)
+
+
+class ExtractionCache:
+    """
+    Persistent cache of PrescriptionExtractor results.
+    Keys combine the file's content hash, the model and the prompt version, so
+    a new model or prompt never serves stale extractions. The table is capped
+    at `max_items`; the least recently used rows are evicted first.
+    """
+    def __init__(self, path=None, max_items=None):
+        self.path = path
+        self.max_items = max_items or Config.EXTRACTION_CACHE_SIZE
+        self._lock = threading.Lock()
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            try:
+                ensure_directory(os.path.dirname(path))
+                self._conn = sqlite3.connect(path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS extractions "
+                    "(key TEXT PRIMARY KEY, result TEXT NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except Exception as e:
+                logger.warning(f"Extraction cache disabled ({path}): {e}")
+                self._conn = None
+
+    @staticmethod
+    def make_key(content_sha, model, prompt_version):
+        return hashlib.sha256(f"{content_sha}\x1f{model}\x1f{prompt_version}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        if not self._conn:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT result FROM extractions WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self._conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+                self.hits += 1
+                return json.loads(row[0])
+            except (sqlite3.Error, ValueError) as e:
+                logger.warning(f"Extraction cache read failed: {e}")
+                return None
+
+    def put(self, key, result):
+        if not self._conn:
+            return
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO extractions (key, result, last_used) VALUES (?, ?, ?)",
+                    (key, json.dumps(result), time.time())
+                )
+                self._conn.execute(
+                    "DELETE FROM extractions WHERE key NOT IN "
+                    "(SELECT key FROM extractions ORDER BY last_used DESC LIMIT ?)",
+                    (self.max_items,)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Extraction cache write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM extractions").fetchone()[0] if self._conn else 0
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_extraction_cache():
+    """Process-wide extraction cache backed by Config.EXTRACTION_CACHE_PATH."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ExtractionCache(Config.EXTRACTION_CACHE_PATH)
+        return _shared_cache
@@ -1,57 +1,178 @@
 import google.generativeai as genai
 from src.config import Config
-from src.utils import setup_logger
-import json
+from src.extraction_cache import ExtractionCache, get_extraction_cache
+from src.gemini_files import GeminiFileUploader
+from src.image_preprocess import preprocess_image
+from src.ingestion import IngestionManager
+from src.json_response import parse_json_response
+from src.rx_parser import parse_prescription_text
+from src.utils import setup_logger, file_sha256
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import os
 import time
 
 logger = setup_logger(__name__)
 
+EXTRACTION_PROMPT = """
+    You are an expert medical assistant. Analyze this prescription and extract the following information in JSON format.
+    Focus strictly on the medicine details and instructions.
+
+    {
+        "date": "Date of prescription",
+        "medicines": [
+            {
+                "name": "Exact name of the tablet/medicine",
+                "quantity": "How much to take (e.g., 1 tablet, 5ml)",
+                "timing": {
+                    "morning": "Yes/No",
+                    "afternoon": "Yes/No",
+                    "night": "Yes/No",
+                    "instruction": "Before meal / After meal / Empty stomach / etc."
+                },
+                "frequency": "Raw frequency string (e.g., 1-0-1)",
+                "duration": "For how many days the medicine should be taken"
+            }
+        ],
+        "notes": "Any special instructions"
+    }
+    If a field is missing, use "-". Return ONLY the JSON.
+    """
+
+EXTRACTION_SCHEMA = {
+    "type": "object",
+    "required": ["medicines"],
+    "properties": {
+        "date": {"type": ["string", "null"]},
+        "medicines": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["name"],
+                "properties": {
+                    "name": {"type": "string"},
+                    "timing": {"type": ["object", "null"]},
+                },
+            },
+        },
+        "notes": {"type": ["string", "null"]},
+    },
+}
+
+
+def merge_extractions(results):
+    """
+    Merges per-page extractions into one: the first known date, medicines
+    deduplicated by exact name, ignoring case and spacing (later pages fill in
+    fields an earlier page left as "-"), and the distinct notes of every page.
+    Names that differ in form or strength ("Inj Diclofenac 75mg" and
+    "Diclofenac 75mg tab") stay separate entries.
+    """
+    merged = {"date": "-", "medicines": [], "notes": "-"}
+    by_key = {}
+    notes = []
+    for result in results:
+        if merged["date"] in ("-", "", None) and result.get("date") not in ("-", "", None):
+            merged["date"] = result["date"]
+        for med in result.get("medicines") or []:
+            key = " ".join(str(med.get("name", "")).lower().split())
+            existing = by_key.get(key)
+            if existing is None:
+                by_key[key] = dict(med)
+                merged["medicines"].append(by_key[key])
+                continue
+            for field, value in med.items():
+                if existing.get(field) in ("-", "", None):
+                    existing[field] = value
+                elif isinstance(value, dict) and isinstance(existing.get(field), dict):
+                    for sub, sub_value in value.items():
+                        if existing[field].get(sub) in ("-", "", None):
+                            existing[field][sub] = sub_value
+        note = result.get("notes")
+        if note not in ("-", "", None) and note not in notes:
+            notes.append(note)
+    if notes:
+        merged["notes"] = "; ".join(notes)
+    return merged
+
 class PrescriptionExtractor:
+    # Bump whenever the prompt or the output format changes so cached extractions are not reused
+    PROMPT_VERSION = "1"
+
     def __init__(self):
+        self.cache = get_extraction_cache()
+        self.uploader = GeminiFileUploader()
+        # Shared by every extraction, so concurrent users cannot exceed PDF_PAGE_WORKERS page calls
+        self.page_pool = ThreadPoolExecutor(max_workers=Config.PDF_PAGE_WORKERS, thread_name_prefix="pdf-page")
         if not Config.GOOGLE_API_KEY:
             logger.warning("Google API Key not found")
         else:
             genai.configure(api_key=Config.GOOGLE_API_KEY)
             self.model = genai.GenerativeModel(Config.GEMINI_MODEL_NAME)
 
-    def extract_data(self, file_input):
-        prompt = """
-        You are an expert medical assistant. Analyze this prescription and extract the following information in JSON format.
-        Focus strictly on the medicine details and instructions.
-        
-        {
-            "date": "Date of prescription",
-            "medicines": [
-                {
-                    "name": "Exact name of the tablet/medicine",
-                    "quantity": "How much to take (e.g., 1 tablet, 5ml)",
-                    "timing": {
-                        "morning": "Yes/No",
-                        "afternoon": "Yes/No",
-                        "night": "Yes/No",
-                        "instruction": "Before meal / After meal / Empty stomach / etc."
-                    },
-                    "frequency": "Raw frequency string (e.g., 1-0-1)",
-                    "duration": "For how many days the medicine should be taken"
-                }
-            ],
-            "notes": "Any special instructions"
-        }
-        If a field is missing, use "-". Return ONLY the JSON.
+    @staticmethod
+    def content_hash(file_input):
+        """SHA-256 of a file path, raw bytes or PIL image; None for inputs that cannot be cached."""
+        try:
+            if isinstance(file_input, str) and os.path.isfile(file_input):
+                return file_sha256(file_input)
+            if isinstance(file_input, (bytes, bytearray)):
+                return hashlib.sha256(file_input).hexdigest()
+            if hasattr(file_input, "tobytes") and hasattr(file_input, "mode"):
+                header = f"{file_input.mode}:{file_input.size}".encode("utf-8")
+                return hashlib.sha256(header + file_input.tobytes()).hexdigest()
+        except Exception as e:
+            logger.warning(f"Could not hash extraction input: {e}")
+        return None
+
+    def extract_data(self, file_input, force_refresh=False):
         """
+        Extracts prescription data, reusing a cached result for the same file
+        content, model and prompt version unless force_refresh is set.
+        """
+        content_sha = self.content_hash(file_input)
+        cache_key = None
+        if content_sha:
+            cache_key = ExtractionCache.make_key(content_sha, Config.GEMINI_MODEL_NAME, self.PROMPT_VERSION)
+            if not force_refresh:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Extraction cache hit for {content_sha[:12]}")
+                    return cached
+
+        start = time.perf_counter()
+        result = self._extract(file_input, content_sha)
+        logger.info(f"Extraction took {time.perf_counter() - start:.2f}s")
+        if result is not None and cache_key:
+            self.cache.put(cache_key, result)
+        return result
 
+    def _extract(self, file_input, content_sha=None):
         try:
             content = []
-            content.append(prompt)
             
             if isinstance(file_input, str):
                 if file_input.endswith(".pdf"):
-                    sample_file = genai.upload_file(path=file_input, display_name="Prescription")
-                    while sample_file.state.name == "PROCESSING":
-                        time.sleep(2)
-                        sample_file = genai.get_file(sample_file.name)
-                    content.append(sample_file)
+                    pages = self._split_pdf(file_input)
+                    if len(pages) == 1:
+                        parsed = self._parse_locally(pages[0])
+                        if parsed:
+                            return parsed
+                    elif len(pages) > 1 and Config.PDF_PAGE_PARALLEL:
+                        return self._extract_pdf_pages(pages)
+                    job = self.uploader.submit(file_input, content_sha)
+                    try:
+                        upload = job.result(timeout=Config.GEMINI_UPLOAD_DEADLINE + 30)
+                    except Exception:
+                        job.cancel()
+                        raise
+                    logger.info(
+                        f"PDF upload {'reused' if upload.reused else 'ready'} after "
+                        f"{upload.polls} polls, {upload.waited:.1f}s waiting"
+                    )
+                    content.append(upload.file)
+                elif Config.IMAGE_PREPROCESS:
+                    content.append(preprocess_image(file_input).as_blob())
                 else:
                     import PIL.Image
                     img = PIL.Image.open(file_input)
@@ -64,14 +185,65 @@ class PrescriptionExtractor:
                 else:
                     content.append(file_input)
 
-            response = self.model.generate_content(content)
-            text = response.text
-            if "```json" in text:
-                text = text.split("```json")[1].split("```")[0]
-            elif "```" in text:
-                text = text.split("```")[1].split("```")[0]
-            return json.loads(text.strip())
+            return self._generate(content)
 
         except Exception as e:
             logger.error(f"Extraction failed: {e}")
             return None
+
+    def _generate(self, parts):
+        generation_config = {"response_mime_type": "application/json"} if Config.GEMINI_JSON_MODE else None
+        response = self.model.generate_content([EXTRACTION_PROMPT] + parts, generation_config=generation_config)
+        return parse_json_response(response.text, EXTRACTION_SCHEMA)
+
+    @staticmethod
+    def _split_pdf(path):
+        try:
+            return IngestionManager.split_pdf(path)
+        except Exception as e:
+            logger.warning(f"Could not split {path} into pages: {e}")
+            return []
+
+    @staticmethod
+    def _parse_locally(page):
+        """Rule-based result for a text-layer page, or None when Gemini is needed."""
+        if not (Config.RX_TEXT_FAST_PATH and page["text"]):
+            return None
+        parsed, confidence = parse_prescription_text(page["text"])
+        if confidence < Config.RX_PARSER_MIN_CONFIDENCE:
+            logger.info(f"Page {page['number']} text parsed with low confidence ({confidence:.2f}); using Gemini")
+            return None
+        logger.info(f"Page {page['number']} parsed locally ({len(parsed['medicines'])} medicines, "
+                    f"confidence {confidence:.2f})")
+        return parsed
+
+    def _extract_page(self, page):
+        parsed = self._parse_locally(page)
+        if parsed:
+            return parsed
+        try:
+            if page["text"]:
+                parts = [f"Prescription text (page {page['number']}):\n{page['text']}"]
+            else:
+                parts = [{"mime_type": "application/pdf", "data": page["pdf"]}]
+            return self._generate(parts)
+        except Exception as e:
+            logger.error(f"Extraction of page {page['number']} failed: {e}")
+            return None
+
+    def _extract_pdf_pages(self, pages):
+        """
+        Extracts every page on the shared page pool and merges the results.
+        Returns None if any page failed, so a partial result is never cached.
+        """
+        start = time.perf_counter()
+        results = list(self.page_pool.map(self._extract_page, pages))
+        logger.info(
+            f"Extracted {sum(1 for result in results if result)}/{len(pages)} pages "
+            f"({sum(1 for p in pages if p['text'])} from text layer) in {time.perf_counter() - start:.2f}s"
+        )
+        failed = [page["number"] for page, result in zip(pages, results) if not result]
+        if failed:
+            logger.error(f"Extraction failed for pages {failed}; discarding the partial result")
+            return None
+        return merge_extractions(results)
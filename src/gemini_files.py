@@ -0,0 +1,120 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import google.generativeai as genai
+from src.config import Config
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class UploadResult:
+    def __init__(self, file, polls=0, waited=0.0, reused=False):
+        self.file = file
+        self.polls = polls
+        self.waited = waited
+        self.reused = reused
+
+
+class UploadJob:
+    """Handle for a background upload; result() waits, cancel() stops the polling."""
+    def __init__(self, future, cancel_event):
+        self.future = future
+        self._cancel_event = cancel_event
+
+    def result(self, timeout=None):
+        return self.future.result(timeout=timeout)
+
+    def cancel(self):
+        self._cancel_event.set()
+        self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+
+class GeminiFileUploader:
+    """
+    Uploads files to the Gemini File API on a background pool and waits for
+    them to become ACTIVE with exponential backoff and jitter, up to a deadline.
+    Handles are reused for identical content while the File API still keeps them.
+    """
+    def __init__(self, upload_fn=None, get_fn=None, max_workers=None):
+        self._upload_fn = upload_fn or genai.upload_file
+        self._get_fn = get_fn or genai.get_file
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.GEMINI_UPLOAD_WORKERS, thread_name_prefix="gemini-upload"
+        )
+        self._handles = {}  # content sha -> (file, uploaded_at)
+        self._lock = threading.Lock()
+        self.uploads = 0
+        self.reused = 0
+        self.total_polls = 0
+        self.total_wait = 0.0
+
+    def _cached(self, content_sha):
+        if not content_sha:
+            return None
+        with self._lock:
+            entry = self._handles.get(content_sha)
+            if entry and time.time() - entry[1] < Config.GEMINI_FILE_TTL:
+                return entry[0]
+            self._handles.pop(content_sha, None)
+        return None
+
+    def _remember(self, content_sha, file):
+        if not content_sha:
+            return
+        now = time.time()
+        with self._lock:
+            self._handles[content_sha] = (file, now)
+            for sha in [sha for sha, (_, at) in self._handles.items() if now - at >= Config.GEMINI_FILE_TTL]:
+                del self._handles[sha]
+
+    def submit(self, path, content_sha=None, display_name="Prescription"):
+        """Starts the upload (or reuses a live handle) and returns an UploadJob."""
+        cancel_event = threading.Event()
+        cached = self._cached(content_sha)
+        if cached is not None:
+            self.reused += 1
+            future = self._executor.submit(lambda: UploadResult(cached, reused=True))
+        else:
+            future = self._executor.submit(self._upload_and_wait, path, content_sha, display_name, cancel_event)
+        return UploadJob(future, cancel_event)
+
+    def _upload_and_wait(self, path, content_sha, display_name, cancel_event):
+        file = self._upload_fn(path=path, display_name=display_name)
+        self.uploads += 1
+        deadline = time.monotonic() + Config.GEMINI_UPLOAD_DEADLINE
+        delay = Config.GEMINI_POLL_INITIAL_DELAY
+        polls = 0
+        waited = 0.0
+        while file.state.name == "PROCESSING":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"File {file.name} still processing after {Config.GEMINI_UPLOAD_DEADLINE}s")
+            # Full jitter keeps concurrent uploads from polling in lockstep
+            sleep_for = min(random.uniform(0, delay), remaining)
+            start = time.monotonic()
+            if cancel_event.wait(sleep_for):
+                raise RuntimeError(f"Upload of {path} was cancelled")
+            waited += time.monotonic() - start
+            delay = min(delay * 2, Config.GEMINI_POLL_MAX_DELAY)
+            file = self._get_fn(file.name)
+            polls += 1
+
+        self.total_polls += polls
+        self.total_wait += waited
+        if file.state.name != "ACTIVE":
+            raise RuntimeError(f"File {file.name} ended in state {file.state.name}")
+        self._remember(content_sha, file)
+        return UploadResult(file, polls=polls, waited=waited)
+
+    def stats(self):
+        return {
+            "uploads": self.uploads,
+            "reused": self.reused,
+            "polls": self.total_polls,
+            "wait_seconds": round(self.total_wait, 2),
+        }
@@ -1,10 +1,14 @@
+from datetime import datetime
 from typing import TypedDict, List, Optional
 from langgraph.graph import StateGraph, END
 from langchain_google_genai import ChatGoogleGenerativeAI
+from src.answer_cache import get_answer_cache
 from src.config import Config
 from src.vector_store import VectorStoreManager
 from src.memory import MemoryManager
-from src.utils import setup_logger, remove_stopwords
+from src.prompt_builder import PromptBuilder
+from src.summarizer import ConversationSummarizer
+from src.utils import setup_logger, message_text
 
 logger = setup_logger(__name__)
 
@@ -14,60 +18,154 @@ class GraphState(TypedDict):
     session_id: str
     language: str
     context: List[str]
+    history: List[dict]
+    details: str
+    summary: str
+    summarized_until: Optional[datetime]
     answer: str
+    cache_hit: bool
+
+def stream_answer(graph, inputs):
+    """
+    Runs a compiled RAG graph and yields answer tokens as the generate node produces them.
+    If no tokens were streamed the final answer is yielded in one piece.
+    """
+    streamed = False
+    final_state = {}
+    for mode, payload in graph.stream(inputs, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") == "generate":
+                text = message_text(chunk)
+                if text:
+                    streamed = True
+                    yield text
+        else:
+            final_state = payload
+    if not streamed and final_state.get("answer"):
+        yield final_state["answer"]
 
 class RAGGraph:
-    def __init__(self):
-        self.vector_store = VectorStoreManager()
-        self.memory = MemoryManager()
+    def __init__(self, vector_store=None, memory=None):
+        self.vector_store = vector_store or VectorStoreManager()
+        self.memory = memory or MemoryManager()
         self.llm = ChatGoogleGenerativeAI(model=Config.GEMINI_MODEL_NAME, google_api_key=Config.GOOGLE_API_KEY)
+        self.answer_cache = get_answer_cache()
+        self.prompt_builder = PromptBuilder()
+        self.summarizer = ConversationSummarizer(self.llm, self.memory)
+
+    def _embed_question(self, question):
+        return self.vector_store.embeddings.embed_query(question)
+
+    def check_cache(self, state: GraphState):
+        logger.info("Node: Check Cache")
+        prescription_id = state.get("prescription_id")
+        if not prescription_id:
+            return {"cache_hit": False}
+        embed_fn = self._embed_question if self.vector_store.embeddings else None
+        answer = self.answer_cache.lookup(
+            prescription_id, state["session_id"], state.get("language", "English"), state["question"],
+            embed_fn=embed_fn
+        )
+        if answer is None:
+            return {"cache_hit": False}
+        logger.info(f"Answer cache hit for {prescription_id} ({self.answer_cache.stats()['hit_rate']:.0%} hit rate)")
+        self.memory.add_message(state["session_id"], "user", state["question"])
+        self.memory.add_message(state["session_id"], "ai", answer)
+        return {"answer": answer, "cache_hit": True}
+
+    def _direct_context(self, prescription_id, session_id):
+        """
+        Returns a prescription's chunks without a vector search when the corpus is small,
+        from the in-process cache first and the session document second.
+        """
+        chunks = self.vector_store.get_cached_chunks(prescription_id)
+        if chunks is None and session_id:
+            chunks = self.memory.get_context_chunks(session_id)
+            if chunks:
+                self.vector_store.cache_chunks(prescription_id, chunks)
+        if chunks and len(chunks) <= Config.DIRECT_CONTEXT_MAX_CHUNKS:
+            return chunks
+        return None
 
     def retrieve(self, state: GraphState):
         logger.info("Node: Retrieve")
         question = state["question"]
         prescription_id = state.get("prescription_id")
+        if prescription_id:
+            chunks = self._direct_context(prescription_id, state.get("session_id"))
+            if chunks is not None:
+                logger.info(f"Serving {len(chunks)} chunk(s) of {prescription_id} directly, skipping vector search")
+                return {"context": chunks}
         results = self.vector_store.search(question, prescription_id=prescription_id)
         context = [match.metadata["text"] for match in results]
         return {"context": context}
 
+    def load_history(self, state: GraphState):
+        logger.info("Node: Load History")
+        return {"history": self.memory.get_history(state["session_id"], limit=Config.HISTORY_WINDOW)}
+
+    def load_session(self, state: GraphState):
+        logger.info("Node: Load Session")
+        session = self.memory.get_session_context(state["session_id"])
+        return {
+            "details": session.get("details", ""),
+            "summary": session.get("summary", ""),
+            "summarized_until": session.get("summarized_until"),
+        }
+
     def generate(self, state: GraphState):
         logger.info("Node: Generate")
         question = state["question"]
         context = state["context"]
+        if not context and state.get("details"):
+            # Nothing indexed matched; the extracted medicine list is still useful context
+            context = [state["details"]]
         language = state.get("language", "English")
-        context_str = "\n\n".join(context)
-        history = self.memory.get_history(state["session_id"], limit=5)
-        history_str = "\n".join([f"{msg['role'].capitalize()}: {remove_stopwords(msg['content'])}" for msg in history])
-        prompt = f"""
-        You are a helpful medical assistant. Answer the user's question based on the provided context and chat history.
-        
-        IMPORTANT INSTRUCTIONS:
-        1. Answer in the following language: {language}
-        2. If the user asks about a medicine ("What is this for?"), provide TWO things:
-           a) The specific instructions from the prescription (dosage, timing).
-           b) General medical knowledge about what the medicine is commonly used for (e.g., "Paracetamol is commonly used for fever and pain relief").
-        
-        Context from Prescriptions:
-        {context_str}
-        
-        Chat History:
-        {history_str}
-        
-        User Question: {question}
-        
-        Answer:
-        """
-        response = self.llm.invoke(prompt)
+        summary = state.get("summary", "")
+        prompt, prompt_tokens, to_fold = self.prompt_builder.build(
+            question, context, state.get("history", []), summary=summary, language=language
+        )
+        logger.info(f"Prompt tokens: {prompt_tokens} (budget {self.prompt_builder.budget}) for session {state['session_id']}")
+
+        # Turns that no longer fit verbatim are folded into the session summary off the request path
+        summarized_until = state.get("summarized_until")
+        to_fold = [
+            msg for msg in to_fold
+            if not summarized_until or (msg.get("timestamp") and msg["timestamp"] > summarized_until)
+        ]
+        if to_fold:
+            self.summarizer.submit(state["session_id"], summary, to_fold)
+
+        # Streamed so LangGraph's "messages" mode can forward tokens as they arrive;
+        # the turn is persisted only once the full answer exists.
+        answer = "".join(message_text(chunk) for chunk in self.llm.stream(prompt))
         self.memory.add_message(state["session_id"], "user", question)
-        self.memory.add_message(state["session_id"], "ai", response.content)
-        return {"answer": response.content}
+        self.memory.add_message(state["session_id"], "ai", answer)
+        if state.get("prescription_id") and answer:
+            embedding = self._embed_question(question) if self.vector_store.embeddings else None
+            self.answer_cache.store(
+                state["prescription_id"], state["session_id"], language, question, answer, embedding=embedding
+            )
+        return {"answer": answer}
 
     def build_graph(self):
         workflow = StateGraph(GraphState)
+        workflow.add_node("check_cache", self.check_cache)
         workflow.add_node("retrieve", self.retrieve)
+        workflow.add_node("load_history", self.load_history)
+        workflow.add_node("load_session", self.load_session)
         workflow.add_node("generate", self.generate)
-        workflow.set_entry_point("retrieve")
-        workflow.add_edge("retrieve", "generate")
+        workflow.set_entry_point("check_cache")
+        # Retrieval, history and session lookups are independent, so they run as
+        # parallel branches and generate waits for all three.
+        fan_out = ["retrieve", "load_history", "load_session"]
+        workflow.add_conditional_edges(
+            "check_cache",
+            lambda state: END if state.get("cache_hit") else fan_out,
+            [END] + fan_out
+        )
+        workflow.add_edge(fan_out, "generate")
         workflow.add_edge("generate", END)
         return workflow.compile()
 
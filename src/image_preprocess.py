@@ -0,0 +1,104 @@
+import io
+import threading
+import time
+from PIL import Image, ImageOps
+from src.config import Config
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+_stats = {"images": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0}
+_stats_lock = threading.Lock()
+
+
+class PreparedImage:
+    """Re-encoded image ready to send to Gemini as an inline blob."""
+    def __init__(self, data, mime_type, size, original_bytes, original_size, seconds):
+        self.data = data
+        self.mime_type = mime_type
+        self.size = size
+        self.original_bytes = original_bytes
+        self.original_size = original_size
+        self.seconds = seconds
+
+    @property
+    def bytes_saved(self):
+        return self.original_bytes - len(self.data)
+
+    def as_blob(self):
+        """Content part accepted by GenerativeModel.generate_content."""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+
+def preprocess_image(source, max_edge=None, image_format=None, quality=None, grayscale=None):
+    """
+    Prepares a prescription photo for upload:
+    EXIF orientation fix, downscale so the longest edge is at most `max_edge`,
+    optional grayscale with autocontrast, then JPEG/WebP re-encoding.
+    `source` is a path, raw bytes or a PIL image. If re-encoding would make an
+    already small file bigger, the original bytes are sent instead.
+    """
+    start = time.perf_counter()
+    max_edge = max_edge or Config.IMAGE_MAX_EDGE
+    image_format = (image_format or Config.IMAGE_FORMAT).upper()
+    quality = quality or Config.IMAGE_QUALITY
+    grayscale = Config.IMAGE_GRAYSCALE if grayscale is None else grayscale
+
+    original = None
+    if isinstance(source, (bytes, bytearray)):
+        original = bytes(source)
+        image = Image.open(io.BytesIO(original))
+    elif isinstance(source, str):
+        with open(source, "rb") as f:
+            original = f.read()
+        image = Image.open(io.BytesIO(original))
+    else:
+        image = source
+    original_format = image.format
+    original_size = image.size
+    needs_rotation = image.getexif().get(0x0112, 1) != 1  # EXIF orientation tag
+
+    image = ImageOps.exif_transpose(image)
+    if max(image.size) > max_edge:
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if grayscale:
+        image = ImageOps.autocontrast(image.convert("L"), cutoff=1)
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=quality, optimize=True)
+    data = buffer.getvalue()
+    mime_type = MIME_TYPES.get(image_format, f"image/{image_format.lower()}")
+
+    unchanged_geometry = image.size == original_size and not needs_rotation
+    if original and len(original) <= len(data) and original_format in MIME_TYPES and unchanged_geometry:
+        data, mime_type = original, MIME_TYPES[original_format]
+
+    prepared = PreparedImage(
+        data, mime_type, image.size,
+        original_bytes=len(original) if original else len(data),
+        original_size=original_size,
+        seconds=time.perf_counter() - start
+    )
+    with _stats_lock:
+        _stats["images"] += 1
+        _stats["bytes_in"] += prepared.original_bytes
+        _stats["bytes_out"] += len(prepared.data)
+        _stats["seconds"] += prepared.seconds
+    logger.info(
+        f"Preprocessed image {original_size[0]}x{original_size[1]} -> {prepared.size[0]}x{prepared.size[1]}, "
+        f"{prepared.original_bytes / 1024:.0f} KB -> {len(prepared.data) / 1024:.0f} KB "
+        f"in {prepared.seconds * 1000:.0f} ms"
+    )
+    return prepared
+
+
+def preprocess_stats():
+    """Totals since start-up: images processed, bytes in/out and time spent."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+    return stats
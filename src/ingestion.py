@@ -1,6 +1,9 @@
+import io
 import os
 from PIL import Image
 import pypdf
+from src.config import Config
+from src.image_preprocess import preprocess_image
 from src.utils import setup_logger
 
 logger = setup_logger(__name__)
@@ -10,9 +13,35 @@ class IngestionManager:
     def load_file(file_path):
         ext = os.path.splitext(file_path)[1].lower()
         if ext in ['.jpg', '.jpeg', '.png']:
+            if Config.IMAGE_PREPROCESS:
+                return [preprocess_image(file_path).as_blob()]
             return [Image.open(file_path)]
         elif ext == '.pdf':
             return file_path
         else:
             raise ValueError(f"Unsupported file type: {ext}")
 
+    @staticmethod
+    def split_pdf(file_path, min_text_chars=None):
+        """
+        One entry per page: {"number", "text", "pdf"}. Pages with a usable text
+        layer carry their text; scanned pages carry a one-page PDF instead.
+        """
+        min_text_chars = min_text_chars or Config.PDF_MIN_PAGE_TEXT
+        reader = pypdf.PdfReader(file_path)
+        pages = []
+        for number, page in enumerate(reader.pages, 1):
+            try:
+                text = (page.extract_text() or "").strip()
+            except Exception as e:
+                logger.warning(f"Could not read text of page {number} in {file_path}: {e}")
+                text = ""
+            entry = {"number": number, "text": text if len(text) >= min_text_chars else None, "pdf": None}
+            if entry["text"] is None:
+                writer = pypdf.PdfWriter()
+                writer.add_page(page)
+                buffer = io.BytesIO()
+                writer.write(buffer)
+                entry["pdf"] = buffer.getvalue()
+            pages.append(entry)
+        return pages
@@ -0,0 +1,209 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from src.config import Config
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Background jobs on a bounded thread pool, mirrored to a MongoDB collection.
+    Handlers are registered per job kind and receive (job, update); update(**fields)
+    records progress and partial results that the UI can poll while the job runs.
+    Once started, the queue heartbeats its unfinished jobs and periodically
+    claims jobs whose owner stopped heartbeating (a process that died or
+    restarted), so they run again elsewhere.
+    """
+    FINISHED_RETENTION = 3600  # seconds a finished job stays in the in-process map
+
+    def __init__(self, collection=None, max_workers=None):
+        self.collection = collection
+        self.owner = uuid.uuid4().hex  # identifies this process on claimed jobs
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.JOB_WORKERS, thread_name_prefix="job"
+        )
+        self._handlers = {}
+        self._jobs = {}  # job_id -> job document, for jobs of this process
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper = None
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Creates the indexes for the stale-job sweep and for dedup lookups."""
+        if self.collection is None:
+            return
+        try:
+            self.collection.create_index([("status", ASCENDING), ("heartbeat_at", ASCENDING)], name="status_heartbeat")
+            self.collection.create_index([("dedup_key", ASCENDING), ("status", ASCENDING)], name="dedup_status")
+        except Exception as e:
+            logger.warning(f"Could not create job indexes: {e}")
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    def start(self):
+        """Starts the heartbeat and stale-job sweep; call after registering handlers."""
+        if self.collection is None or self._sweeper is not None:
+            return
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="job-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _sweep_loop(self):
+        while True:
+            self.heartbeat()
+            self.resume_pending()
+            if self._stop.wait(Config.JOB_HEARTBEAT_INTERVAL):
+                return
+
+    def _save(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+            job["updated_at"] = job["heartbeat_at"] = datetime.utcnow()
+            snapshot = dict(job)
+        if self.collection is not None:
+            try:
+                # Only the owner writes; a job claimed by another process is not overwritten
+                self.collection.replace_one({"_id": snapshot["_id"], "owner": self.owner}, snapshot, upsert=True)
+            except DuplicateKeyError:
+                logger.warning(f"Job {snapshot['_id']} was claimed by another process; not saving")
+            except Exception as e:
+                logger.warning(f"Could not persist job {snapshot['_id']}: {e}")
+
+    def _find_active(self, dedup_key):
+        with self._lock:
+            for job in self._jobs.values():
+                if job.get("dedup_key") == dedup_key and job["status"] in (QUEUED, RUNNING):
+                    return job["_id"]
+        if self.collection is not None:
+            try:
+                job = self.collection.find_one({"dedup_key": dedup_key, "status": {"$in": [QUEUED, RUNNING]}})
+                if job is not None:
+                    return job["_id"]
+            except Exception as e:
+                logger.warning(f"Could not look up job {dedup_key}: {e}")
+        return None
+
+    def submit(self, kind, payload, dedup_key=None):
+        """
+        Queues a job and returns its id. A job with the same dedup_key that is
+        still queued or running, in this process or another, is reused instead
+        of starting a second one.
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"No handler registered for job kind '{kind}'")
+        if dedup_key:
+            existing = self._find_active(dedup_key)
+            if existing:
+                return existing
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "payload": payload,
+            "dedup_key": dedup_key,
+            "status": QUEUED,
+            "stage": None,
+            "result": {},
+            "error": None,
+            "owner": self.owner,
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            self._forget_finished()
+            self._jobs[job["_id"]] = job
+        self._save(job)
+        self._executor.submit(self._run, job)
+        return job["_id"]
+
+    def _forget_finished(self):
+        # Finished jobs stay readable from MongoDB; only the in-process copy is dropped
+        cutoff = datetime.utcnow() - timedelta(seconds=self.FINISHED_RETENTION)
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job["status"] in (DONE, FAILED) and job["updated_at"] < cutoff]:
+            del self._jobs[job_id]
+
+    def _run(self, job):
+        def update(stage=None, **result):
+            with self._lock:
+                job["result"].update(result)
+            self._save(job, stage=stage or job.get("stage"))
+
+        self._save(job, status=RUNNING)
+        try:
+            self._handlers[job["kind"]](job, update)
+            self._save(job, status=DONE, stage=DONE)
+        except Exception as e:
+            logger.error(f"Job {job['_id']} ({job['kind']}) failed: {e}")
+            self._save(job, status=FAILED, error=str(e))
+
+    def get(self, job_id):
+        """Current state of a job: this process's copy, else the stored document."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job, result=dict(job["result"]))
+        if self.collection is not None:
+            try:
+                return self.collection.find_one({"_id": job_id})
+            except Exception as e:
+                logger.warning(f"Could not read job {job_id}: {e}")
+        return None
+
+    def heartbeat(self):
+        """Marks this process's unfinished jobs as alive."""
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_many(
+                {"owner": self.owner, "status": {"$in": [QUEUED, RUNNING]}},
+                {"$set": {"heartbeat_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            logger.warning(f"Could not heartbeat jobs: {e}")
+
+    def resume_pending(self):
+        """
+        Claims jobs left queued or running by an owner that has not heartbeated
+        for Config.JOB_STALE_AFTER seconds, and reruns them.
+        """
+        if self.collection is None:
+            return 0
+        cutoff = datetime.utcnow() - timedelta(seconds=Config.JOB_STALE_AFTER)
+        resumed = 0
+        try:
+            while True:
+                now = datetime.utcnow()
+                job = self.collection.find_one_and_update(
+                    {
+                        "status": {"$in": [QUEUED, RUNNING]},
+                        "owner": {"$ne": self.owner},
+                        "heartbeat_at": {"$lt": cutoff},
+                        "kind": {"$in": list(self._handlers)},
+                    },
+                    {"$set": {"owner": self.owner, "status": QUEUED, "updated_at": now, "heartbeat_at": now}},
+                    return_document=ReturnDocument.AFTER
+                )
+                if job is None:
+                    break
+                with self._lock:
+                    self._jobs[job["_id"]] = job
+                self._executor.submit(self._run, job)
+                resumed += 1
+        except Exception as e:
+            logger.warning(f"Could not resume pending jobs: {e}")
+        if resumed:
+            logger.info(f"Resumed {resumed} pending jobs")
+        return resumed
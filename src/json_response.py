@@ -0,0 +1,177 @@
+import json
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+CLOSERS = {"{": "}", "[": "]"}
+LITERALS = {"True": "true", "False": "false", "None": "null"}
+TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "number": (int, float),
+    "integer": int,
+    "null": type(None),
+}
+
+
+class JSONResponseError(ValueError):
+    """The model response held no usable JSON, or it did not match the schema."""
+
+
+def _ends_string(text, i, quote):
+    """A single quote only closes a string when JSON syntax follows, so "it's" survives."""
+    if quote == '"':
+        return True
+    j = i + 1
+    while j < len(text) and text[j].isspace():
+        j += 1
+    return j == len(text) or text[j] in ",:}]"
+
+
+def find_json(text):
+    """
+    Returns the first balanced JSON object or array in `text` (code fences and
+    surrounding prose are skipped) in a single pass. A value cut off by the
+    token limit is closed so that it can still be repaired.
+    """
+    start = next((i for i, ch in enumerate(text) if ch in CLOSERS), None)
+    if start is None:
+        return None
+    stack = []
+    quote = None
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote and _ends_string(text, i, quote):
+                quote = None
+        elif ch in ('"', "'"):
+            quote = ch
+        elif ch in CLOSERS:
+            stack.append(CLOSERS[ch])
+        elif stack and ch == stack[-1]:
+            stack.pop()
+            if not stack:
+                return text[start:i + 1]
+    # Truncated: close the open string and containers
+    tail = text[start:]
+    if quote:
+        tail += quote
+    return tail.rstrip().rstrip(",") + "".join(reversed(stack))
+
+
+def repair_json(text):
+    """
+    Fixes the defects models commonly produce, in one pass: single-quoted
+    strings, trailing commas, Python True/False/None and raw newlines in strings.
+    """
+    out = []
+    quote = None
+    escaped = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+                out.append(ch)
+            elif ch == "\\":
+                escaped = True
+                out.append(ch)
+            elif ch == quote and _ends_string(text, i, quote):
+                quote = None
+                out.append('"')
+            elif ch == '"':
+                out.append('\\"')  # a double quote inside a single-quoted string
+            elif ch == "\n":
+                out.append("\\n")
+            else:
+                out.append(ch)
+        elif ch in ('"', "'"):
+            quote = ch
+            out.append('"')
+        elif ch in "}]":
+            # Drop a trailing comma before the closer
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+            out.append(ch)
+        elif ch.isalpha():
+            j = i
+            while j < len(text) and text[j].isalpha():
+                j += 1
+            word = text[i:j]
+            out.append(LITERALS.get(word, word))
+            i = j
+            continue
+        else:
+            out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def validate(value, schema, path="$"):
+    """
+    Checks `value` against a small JSON Schema subset (type, properties,
+    required, items, enum). Returns a list of error strings.
+    """
+    errors = []
+    expected = schema.get("type")
+    if expected:
+        allowed = expected if isinstance(expected, list) else [expected]
+        matches = any(
+            isinstance(value, TYPES[t]) and not (t in ("number", "integer") and isinstance(value, bool))
+            for t in allowed
+        )
+        if not matches:
+            return [f"{path}: expected {'/'.join(allowed)}, got {type(value).__name__}"]
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {value!r} not in {schema['enum']}")
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}: missing '{key}'")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], sub_schema, f"{path}.{key}"))
+    if isinstance(value, list) and "items" in schema:
+        for index, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{index}]"))
+    return errors
+
+
+def parse_json_response(text, schema=None):
+    """
+    Parses a model response into JSON: the raw text first (native JSON mode),
+    then the first balanced value, then its repaired form. Raises
+    JSONResponseError if nothing parses or the schema does not match.
+    """
+    if not isinstance(text, str):
+        raise JSONResponseError(f"Expected text, got {type(text).__name__}")
+    try:
+        value = json.loads(text)
+    except ValueError:
+        candidate = find_json(text)
+        if candidate is None:
+            raise JSONResponseError("No JSON object or array in response")
+        try:
+            value = json.loads(candidate)
+        except ValueError:
+            try:
+                value = json.loads(repair_json(candidate))
+                logger.info("Repaired malformed JSON in model response")
+            except ValueError as e:
+                raise JSONResponseError(f"Unparseable JSON in response: {e}") from e
+    if schema:
+        errors = validate(value, schema)
+        if errors:
+            raise JSONResponseError("; ".join(errors[:5]))
+    return value
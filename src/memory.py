@@ -1,20 +1,40 @@
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING
 from datetime import datetime
 import uuid
-from src.config import Config
+from src.db import get_mongo_client
 from src.utils import setup_logger
 
 logger = setup_logger(__name__)
 
 class MemoryManager:
+    _indexes_ready = False
+
     def __init__(self):
-        self.client = MongoClient(Config.MONGO_URI, **Config.get_tls_kwargs())
+        self.client = get_mongo_client()
         self.db = self.client.get_database("prescription_db")
         self.sessions = self.db.sessions
         self.messages = self.db.messages
+        self.uploads = self.db.uploads  # _id is the SHA-256 of the uploaded file
         logger.info("Connected to MongoDB")
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Creates the indexes chat history queries rely on (once per process)."""
+        if MemoryManager._indexes_ready:
+            return
+        try:
+            # Serves "latest N" and cursor pages for a session without scanning its other messages;
+            # _id breaks ties between messages written in the same millisecond.
+            self.messages.create_index(
+                [("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+                name="session_timestamp"
+            )
+            self.sessions.create_index([("session_id", ASCENDING)], name="session_id")
+            MemoryManager._indexes_ready = True
+        except Exception as e:
+            logger.warning(f"Could not create MongoDB indexes: {e}")
 
-    def get_or_create_session(self, user_id, prescription_id, title=None, filename=None, details=None):
+    def get_or_create_session(self, user_id, prescription_id, title=None, filename=None, details=None, context_chunks=None, medicines=None):
         existing_session = self.sessions.find_one({
             "user_id": user_id,
             "prescription_id": prescription_id
@@ -27,6 +47,10 @@ class MemoryManager:
                 updates["filename"] = filename
             if details and not existing_session.get("details"):
                 updates["details"] = details
+            if context_chunks and not existing_session.get("context_chunks"):
+                updates["context_chunks"] = context_chunks
+            if medicines and not existing_session.get("medicines"):
+                updates["medicines"] = medicines
             if updates:
                 self.sessions.update_one(
                     {"_id": existing_session["_id"]},
@@ -48,6 +72,10 @@ class MemoryManager:
             doc["filename"] = filename
         if details:
             doc["details"] = details
+        if context_chunks:
+            doc["context_chunks"] = context_chunks
+        if medicines:
+            doc["medicines"] = medicines
         self.sessions.insert_one(doc)
         logger.info(f"Created new session {session_id} for user {user_id} on prescription {prescription_id}")
         return session_id
@@ -56,6 +84,40 @@ class MemoryManager:
         session = self.sessions.find_one({"session_id": session_id})
         return session.get("details", "") if session else ""
 
+    def get_session_context(self, session_id):
+        session = self.sessions.find_one(
+            {"session_id": session_id},
+            {"details": 1, "summary": 1, "summarized_until": 1}
+        )
+        return session or {}
+
+    def get_context_chunks(self, session_id):
+        session = self.sessions.find_one({"session_id": session_id}, {"context_chunks": 1})
+        return session.get("context_chunks") if session else None
+
+    def get_session_medicines(self, session_id):
+        """Structured medicines list saved at upload; None for older sessions."""
+        session = self.sessions.find_one({"session_id": session_id}, {"medicines": 1})
+        return session.get("medicines") if session else None
+
+    def get_upload(self, content_sha):
+        """Prescription id and extraction already recorded for these file bytes, if any."""
+        return self.uploads.find_one({"_id": content_sha})
+
+    def record_upload(self, content_sha, prescription_id, extraction, title=None, details=None, context_chunks=None):
+        self.uploads.update_one(
+            {"_id": content_sha},
+            {"$setOnInsert": {
+                "prescription_id": prescription_id,
+                "extraction": extraction,
+                "title": title,
+                "details": details,
+                "context_chunks": context_chunks,
+                "created_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+
     def get_prescription_by_filename(self, user_id, filename):
         session = self.sessions.find_one({
             "user_id": user_id,
@@ -75,17 +137,44 @@ class MemoryManager:
         self.update_last_active(session_id)
 
     def get_history(self, session_id, limit=10):
-        cursor = self.messages.find({"session_id": session_id}).sort("timestamp", 1).limit(limit)
-        return list(cursor)
+        """Returns the latest `limit` messages of a session, oldest first."""
+        cursor = self.messages.find({"session_id": session_id}).sort(
+            [("timestamp", DESCENDING), ("_id", DESCENDING)]
+        ).limit(limit)
+        return list(cursor)[::-1]
+
+    def get_history_page(self, session_id, before=None, page_size=20):
+        """
+        Cursor pagination over a session's transcript, newest page first.
+        Returns (messages oldest first, cursor for the next older page or None).
+        """
+        query = {"session_id": session_id}
+        if before:
+            query["$or"] = [
+                {"timestamp": {"$lt": before["timestamp"]}},
+                {"timestamp": before["timestamp"], "_id": {"$lt": before["_id"]}}
+            ]
+        docs = list(self.messages.find(query).sort(
+            [("timestamp", DESCENDING), ("_id", DESCENDING)]
+        ).limit(page_size + 1))
+        next_cursor = None
+        if len(docs) > page_size:
+            docs = docs[:page_size]
+            next_cursor = {"timestamp": docs[-1]["timestamp"], "_id": docs[-1]["_id"]}
+        return docs[::-1], next_cursor
 
     def get_summary(self, session_id):
         session = self.sessions.find_one({"session_id": session_id})
         return session.get("summary", "") if session else ""
 
-    def update_summary(self, session_id, new_summary):
+    def update_summary(self, session_id, new_summary, summarized_until=None):
+        updates = {"summary": new_summary, "last_active": datetime.utcnow()}
+        if summarized_until:
+            # Timestamp of the newest message already folded into the summary
+            updates["summarized_until"] = summarized_until
         self.sessions.update_one(
             {"session_id": session_id},
-            {"$set": {"summary": new_summary, "last_active": datetime.utcnow()}}
+            {"$set": updates}
         )
 
     def update_last_active(self, session_id):
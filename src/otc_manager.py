@@ -1,43 +1,116 @@
-import json
+from collections import Counter
 from langchain_google_genai import ChatGoogleGenerativeAI
+from src.bootstrap import IndexManifest, content_hash, run_once
 from src.config import Config
+from src.db import get_mongo_client
+from src.json_response import parse_json_response, validate
 from src.utils import setup_logger
 from src.otc_data import OTC_LIST_DATA
+from src.otc_matcher import OTCMatcher, VERDICT_KEY_VERSION, medicine_name_part, verdict_key
+from src.otc_verdict_cache import OTCVerdictCache
+from src.vector_store import VectorStoreManager
 
 logger = setup_logger(__name__)
 
+VERDICT_SCHEMA = {
+    "type": "object",
+    "required": ["is_otc"],
+    "properties": {
+        "is_otc": {"type": "boolean"},
+        "matched_candidate": {"type": ["string", "null"]},
+        "reason": {"type": "string"},
+    },
+}
+
 class OTCManager:
     OTC_LIST = OTC_LIST_DATA
     
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(model=Config.GEMINI_MODEL_NAME, google_api_key=Config.GOOGLE_API_KEY)
-        from src.vector_store import VectorStoreManager
-        self.vector_store = VectorStoreManager()
+    def __init__(self, vector_store=None):
+        json_mode = {"response_mime_type": "application/json"} if Config.GEMINI_JSON_MODE else {}
+        self.llm = ChatGoogleGenerativeAI(
+            model=Config.GEMINI_MODEL_NAME, google_api_key=Config.GOOGLE_API_KEY, **json_mode
+        )
+        self.vector_store = vector_store or VectorStoreManager()
         self.otc_namespace = "otc_medicines"
+        self.matcher = OTCMatcher(self.OTC_LIST)
+        self.path_counts = Counter()
         self._initialize_otc_db()
+        self._initialize_verdict_cache()
+
+    def _otc_items(self):
+        """Maps the vector id of each OTC entry to a hash of its name and metadata."""
+        return {
+            self.vector_store.text_vector_id(item['medicine_name'], self.otc_namespace): content_hash(item)
+            for item in self.OTC_LIST
+        }
 
     def _initialize_otc_db(self):
+        # Verified once per process; the manifest lets later processes skip it too
+        key = f"otc:{self.vector_store.backend_id(self.otc_namespace)}:{self.otc_namespace}"
+        run_once(key, self._sync_otc_db)
+
+    def _sync_otc_db(self):
+        """
+        Brings the OTC namespace in line with OTC_LIST_DATA. Only entries whose
+        name or metadata changed since the last recorded ingestion are re-embedded,
+        and entries removed from the list are deleted.
+        """
         try:
-            # Check if namespace already exists and has data
-            try:
-                stats = self.vector_store.index.describe_index_stats()
-                if self.otc_namespace in stats.namespaces and stats.namespaces[self.otc_namespace].vector_count > 0:
-                    logger.info(f"OTC DB namespace '{self.otc_namespace}' already populated. Skipping ingestion.")
-                    return
-            except Exception as e:
-                logger.warning(f"Could not check index stats: {e}")
+            manifest = IndexManifest()
+            items = self._otc_items()
+            list_hash = content_hash(items)
+            backend = self.vector_store.backend_id(self.otc_namespace)
+            recorded = manifest.get("otc") or {}
+
+            previous = {}
+            if recorded.get("backend") == backend and recorded.get("namespace") == self.otc_namespace:
+                if recorded.get("list_hash") == list_hash:
+                    logger.info(f"OTC DB namespace '{self.otc_namespace}' matches manifest. Skipping ingestion.")
+                    return True
+                previous = recorded.get("items", {})
 
-            logger.info("Initializing OTC Vector DB...")
-            texts = [item['medicine_name'] for item in self.OTC_LIST]
-            metadatas = []
+            changed = []
             for item in self.OTC_LIST:
-                meta = item.get('metadata', {}).copy()
-                meta['source'] = 'general_otc_list'
-                metadatas.append(meta)
-            self.vector_store.add_texts(texts, metadatas, namespace=self.otc_namespace)
-            logger.info("OTC List Ingested into Pinecone.")
+                vector_id = self.vector_store.text_vector_id(item['medicine_name'], self.otc_namespace)
+                if previous.get(vector_id) != items[vector_id]:
+                    changed.append(item)
+            removed = [vector_id for vector_id in previous if vector_id not in items]
+
+            logger.info(f"Syncing OTC Vector DB: {len(changed)} new/changed, {len(removed)} removed...")
+            if changed:
+                texts = [item['medicine_name'] for item in changed]
+                metadatas = []
+                for item in changed:
+                    meta = item.get('metadata', {}).copy()
+                    meta['source'] = 'general_otc_list'
+                    metadatas.append(meta)
+                if not self.vector_store.add_texts(texts, metadatas, namespace=self.otc_namespace):
+                    return False
+            if removed:
+                self.vector_store.delete(removed, namespace=self.otc_namespace)
+
+            manifest.update("otc", {
+                "backend": backend,
+                "namespace": self.otc_namespace,
+                "list_hash": list_hash,
+                "items": items
+            })
+            logger.info("OTC List Ingested.")
+            return True
         except Exception as e:
             logger.error(f"Failed to initialize OTC DB: {e}")
+            return False
+
+    def _initialize_verdict_cache(self):
+        collection = None
+        if Config.MONGO_URI:
+            try:
+                collection = get_mongo_client().get_database("prescription_db").otc_verdicts
+            except Exception as e:
+                logger.warning(f"OTC verdict cache will be in-memory only: {e}")
+        list_version = content_hash({"key_version": VERDICT_KEY_VERSION, "otc_list": self.OTC_LIST})
+        self.verdict_cache = OTCVerdictCache(list_version, collection=collection)
+        run_once(f"otc_verdicts:{list_version}", self.verdict_cache.purge_stale)
 
     def search_otc_db(self, query, top_k=10):
         matches = self.vector_store.search(query, namespace=self.otc_namespace, top_k=top_k)
@@ -53,56 +126,190 @@ class OTCManager:
     def get_otc_list(self):
         return self.OTC_LIST
 
-    def check_medicines_with_llm(self, medicine_list):
-        logger.info("Checking medicines against OTC list using Vector Search + LLM")
-        results = {"otc_medicines": [], "consult_medicines": []}
-        for med in medicine_list:
-            med_str = str(med)
-            matches = self.vector_store.search(med_str, namespace=self.otc_namespace, top_k=3)
-            candidates = [m.metadata['text'] for m in matches if m.score > 0.7]
-            if not candidates:
-                 results["consult_medicines"].append({
-                     "name": med_str.split('(')[0],
-                     "reason": "No matching approved OTC medicine found in database."
-                 })
-                 continue
-            candidates_str = "\n".join(candidates)
-            prompt = f"""
-            You are a medical assistant. Verify if the extracted medicine is strictly equivalent to any of the allowed OTC candidates found.
-
-            Extracted Medicine: "{med_str}"
-
-            Allowed OTC Candidates (from database):
-            {candidates_str}
-
-            Instructions:
-            1. Determine if the 'Extracted Medicine' matches any 'Allowed OTC Candidate' (Brand or Generic).
-            2. Match must be safe and exact (e.g., "Crocin" matches "Paracetamol").
-            3. Return JSON.
-
-            Output Format:
+    def get_path_stats(self):
+        """How many medicines were settled locally vs. sent to the LLM."""
+        return dict(self.path_counts)
+
+    def _verify_one(self, med_str, candidates):
+        """One LLM call for one medicine; returns the parsed verdict dict."""
+        candidates_str = "\n".join(candidates)
+        prompt = f"""
+        You are a medical assistant. Verify if the extracted medicine is strictly equivalent to any of the allowed OTC candidates found.
+
+        Extracted Medicine: "{med_str}"
+
+        Allowed OTC Candidates (from database):
+        {candidates_str}
+
+        Instructions:
+        1. Determine if the 'Extracted Medicine' matches any 'Allowed OTC Candidate' (Brand or Generic).
+        2. Match must be safe and exact (e.g., "Crocin" matches "Paracetamol").
+        3. Return JSON.
+
+        Output Format:
+        {{
+            "is_otc": true/false,
+            "matched_candidate": "Name of matched OTC item" or null,
+            "reason": "Brief explanation"
+        }}
+        """
+        response = self.llm.invoke(prompt)
+        return parse_json_response(response.content, VERDICT_SCHEMA)
+
+    def _verify_batch(self, pending):
+        """
+        Verifies several (med_str, candidates) pairs in one LLM call.
+        Returns a verdict per item by position, or None where the answer was
+        missing or malformed so the caller can retry that item on its own.
+        """
+        items_str = "\n".join(
+            f'{i}. Extracted Medicine: "{med_str}"\n   Allowed OTC Candidates: {"; ".join(candidates)}'
+            for i, (med_str, candidates) in enumerate(pending, 1)
+        )
+        prompt = f"""
+        You are a medical assistant. For each numbered item, verify if the extracted medicine is strictly equivalent to any of its allowed OTC candidates.
+
+        Items:
+        {items_str}
+
+        Instructions:
+        1. Judge every item on its own candidates only (Brand or Generic).
+        2. Match must be safe and exact (e.g., "Crocin" matches "Paracetamol").
+        3. Return a JSON array with exactly one object per item, in the same order.
+
+        Output Format:
+        [
             {{
+                "item": 1,
                 "is_otc": true/false,
                 "matched_candidate": "Name of matched OTC item" or null,
                 "reason": "Brief explanation"
             }}
-            """
-            try:
-                response = self.llm.invoke(prompt)
-                content = response.content.replace("```json", "").replace("```", "").strip()
-                verification = json.loads(content)
-                name_clean = med_str.split(':')[0].strip("- ").strip()
-                if verification.get("is_otc"):
-                    results["otc_medicines"].append({
-                        "name": name_clean,
-                        "reason": f"Matched with {verification.get('matched_candidate')}"
-                    })
-                else:
-                    results["consult_medicines"].append({
-                        "name": name_clean,
-                        "reason": verification.get("reason", "Not a valid match with allowed list")
-                    })
-            except Exception as e:
-                logger.error(f"Error checking medicine {med_str}: {e}")
-                results["consult_medicines"].append({"name": med_str, "reason": "Error verifying safety"})
+        ]
+        """
+        verdicts = [None] * len(pending)
+        try:
+            response = self.llm.invoke(prompt)
+            parsed = parse_json_response(response.content, {"type": "array"})
+        except Exception as e:
+            logger.error(f"Batched OTC verification failed: {e}")
+            return verdicts
+        for position, verdict in enumerate(parsed):
+            if validate(verdict, VERDICT_SCHEMA):
+                continue
+            index = verdict.get("item", position + 1)
+            if isinstance(index, int) and 1 <= index <= len(pending) and verdicts[index - 1] is None:
+                verdicts[index - 1] = verdict
+        return verdicts
+
+    def check_medicines_with_llm(self, medicine_list):
+        logger.info("Checking medicines against OTC list (local matcher, then Vector Search + LLM)")
+        results = {"otc_medicines": [], "consult_medicines": []}
+        for kind, item in self._check_items([str(med) for med in medicine_list]):
+            results[f"{kind}_medicines"].append(item)
+        logger.info(f"OTC check paths so far: {self.get_path_stats()}")
         return results
+
+    @staticmethod
+    def split_medicines(medicines=None, details=None):
+        """
+        One entry per drug, from the extractor's structured `medicines` list
+        or, for older sessions, from the "- Name (Qty: ...)" lines of the details text.
+        """
+        if medicines:
+            names = [str(med.get("name", "")).strip() if isinstance(med, dict) else str(med).strip()
+                     for med in medicines]
+        else:
+            lines = [line.strip() for line in (details or "").splitlines() if line.strip()]
+            bullets = [line for line in lines if line.startswith("-")]
+            names = [medicine_name_part(line) for line in (bullets or lines)]
+        return [name for name in names if name and name not in ("-", "Unknown")]
+
+    def check_prescription(self, medicines=None, details=None):
+        """
+        Checks every drug of a prescription on its own. Verdicts are cached
+        per normalized drug name, strength and OTC list version across all
+        users, so a drug already judged costs no vector search or LLM call.
+        """
+        names = self.split_medicines(medicines, details)
+        keys = [verdict_key(name) for name in names]
+        verdicts = self.verdict_cache.get_many(keys)
+        self.path_counts["cache_hit"] += len(verdicts)
+        todo = {}  # verdict_key -> first name seen, checked once per prescription
+        for name, key in zip(names, keys):
+            if key not in verdicts and key not in todo:
+                todo[key] = name
+
+        if todo:
+            for key, (kind, item) in zip(todo, self._check_items(list(todo.values()))):
+                verdicts[key] = (kind, item["reason"])
+                if item["reason"] != "Error verifying safety":
+                    self.verdict_cache.put(key, kind, item["reason"])
+
+        results = {"otc_medicines": [], "consult_medicines": []}
+        for name, key in zip(names, keys):
+            kind, reason = verdicts[key]
+            results[f"{kind}_medicines"].append({"name": name, "reason": reason})
+        logger.info(f"OTC check of {len(names)} medicines ({len(todo)} new), paths so far: {self.get_path_stats()}")
+        return results
+
+    def _check_items(self, med_strs):
+        """Returns ("otc" | "consult", {"name", "reason"}) for each medicine string, in order."""
+        # None marks medicines still waiting for the LLM
+        outcomes = []
+        pending = []  # (position, name_clean, med_str, candidates)
+        for med_str in med_strs:
+            name_clean = medicine_name_part(med_str)
+            match = self.matcher.match(med_str)
+            if match.status == "match":
+                self.path_counts["local_match"] += 1
+                outcomes.append(("otc", {"name": name_clean, "reason": match.reason}))
+                continue
+            if match.status == "miss":
+                self.path_counts["local_miss"] += 1
+                outcomes.append(("consult", {"name": name_clean, "reason": match.reason}))
+                continue
+
+            # Ambiguous: unknown brands, combinations and strength mismatches need the LLM
+            matches = self.vector_store.search(med_str, namespace=self.otc_namespace, top_k=3)
+            candidates = list(match.candidates)
+            for m in matches:
+                if m.score > 0.7 and m.metadata['text'] not in candidates:
+                    candidates.append(m.metadata['text'])
+            if not candidates:
+                self.path_counts["no_candidates"] += 1
+                outcomes.append(("consult", {
+                    "name": med_str.split('(')[0],
+                    "reason": "No matching approved OTC medicine found in database."
+                }))
+                continue
+            pending.append((len(outcomes), name_clean, med_str, candidates))
+            outcomes.append(None)
+
+        verdicts = [None] * len(pending)
+        if Config.OTC_BATCH_VERIFICATION and len(pending) > 1:
+            self.path_counts["llm_batch"] += 1
+            verdicts = self._verify_batch([(med_str, candidates) for _, _, med_str, candidates in pending])
+
+        for (position, name_clean, med_str, candidates), verdict in zip(pending, verdicts):
+            if verdict is None:
+                self.path_counts["llm"] += 1
+                try:
+                    verdict = self._verify_one(med_str, candidates)
+                except Exception as e:
+                    logger.error(f"Error checking medicine {med_str}: {e}")
+                    outcomes[position] = ("consult", {"name": med_str, "reason": "Error verifying safety"})
+                    continue
+            else:
+                self.path_counts["llm_batched_items"] += 1
+            if verdict.get("is_otc"):
+                outcomes[position] = ("otc", {
+                    "name": name_clean,
+                    "reason": f"Matched with {verdict.get('matched_candidate')}"
+                })
+            else:
+                outcomes[position] = ("consult", {
+                    "name": name_clean,
+                    "reason": verdict.get("reason", "Not a valid match with allowed list")
+                })
+        return outcomes
@@ -0,0 +1,250 @@
+import re
+from collections import Counter
+from src.otc_data import OTC_LIST_DATA
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+# Descriptive words that say nothing about which drug it is
+NOISE_WORDS = {
+    "oral", "od", "variant", "equivalent", "eg", "e", "g", "decongestant", "strip",
+}
+
+# Dosage forms and qualifiers: stripped from the name, but an entry only covers the ones it lists
+FORM_WORDS = {
+    "tab": "tablet", "tabs": "tablet", "tablet": "tablet", "tablets": "tablet", "dt": "tablet",
+    "cap": "capsule", "caps": "capsule", "capsule": "capsule", "capsules": "capsule",
+    "syp": "liquid", "syrup": "liquid", "susp": "liquid", "suspension": "liquid",
+    "drop": "drops", "drops": "drops", "lozenge": "lozenge", "lozenges": "lozenge",
+    "effervescent": "effervescent", "sachet": "sachet",
+    "cream": "topical", "gel": "topical", "ointment": "topical",
+    "inj": "injection", "injection": "injection", "iv": "injection", "im": "injection",
+    "infusion": "injection", "vial": "injection", "ampoule": "injection",
+    "ear": "ear", "eye": "eye",
+    "sr": "modified release", "er": "modified release", "xr": "modified release",
+    "cr": "modified release", "mr": "modified release",
+    "lowdose": "low-dose",
+}
+LOW_DOSE_PATTERN = re.compile(r"\blow[\s-]*dos(?:e|age)\b")
+# Assumed for entries that name no dosage form (e.g. "Vitamin C")
+DEFAULT_FORMS = {"tablet", "capsule"}
+
+DOSAGE_PATTERN = re.compile(
+    r"(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?\s*(mg|mcg|µg|g|ml|iu|%)?(?![a-z])", re.IGNORECASE
+)
+
+
+def parse_dosage(text):
+    """
+    Returns (low, high, unit) for the first strength in text, e.g.
+    "Dolo 650" -> (650, 650, None), "Melatonin (3-5mg)" -> (3, 5, "mg").
+    """
+    match = DOSAGE_PATTERN.search(text)
+    if not match:
+        return None
+    low = float(match.group(1))
+    high = float(match.group(2)) if match.group(2) else low
+    unit = match.group(3).lower() if match.group(3) else None
+    return low, high, unit
+
+
+def _words(text):
+    text = LOW_DOSE_PATTERN.sub(" lowdose ", DOSAGE_PATTERN.sub(" ", text.lower()))
+    return re.sub(r"[^a-z0-9]+", " ", text).split()
+
+
+def normalize_name(text):
+    """Lowercases, strips strengths, punctuation, dosage forms and qualifiers."""
+    return " ".join(
+        w for w in _words(text) if w not in NOISE_WORDS and w not in FORM_WORDS and not w.isdigit()
+    )
+
+
+def dosage_forms(text):
+    """Dosage forms and qualifiers named in text, e.g. "Inj. Diclofenac" -> {"injection"}."""
+    return {FORM_WORDS[w] for w in _words(text) if w in FORM_WORDS}
+
+
+def medicine_name_part(med_str):
+    """Drops list bullets and the '(Qty: ...): timing' tail of a details line."""
+    name = med_str.strip().lstrip("-•* ").strip()
+    qty = name.find("(Qty")
+    if qty != -1:
+        return name[:qty].strip()
+    return name.split(":")[0].strip()
+
+
+# Bump when verdict_key changes so shared verdicts stored under the old keys are not reused
+VERDICT_KEY_VERSION = 2
+
+
+def verdict_key(med_str):
+    """
+    Key under which a verdict can be reused: the normalized name plus its
+    strength and dosage forms, so "Dolo 650" and "DOLO-650" share one verdict
+    while "Aspirin 75mg" and "Aspirin 325mg", or "Diclofenac 75mg inj" and
+    "Diclofenac 75mg tab", do not.
+    """
+    name_part = medicine_name_part(str(med_str))
+    name = normalize_name(name_part)
+    if not name:
+        return name
+    key = name
+    dosage = parse_dosage(name_part)
+    if dosage:
+        low, high, unit = dosage
+        strength = f"{low:g}" if low == high else f"{low:g}-{high:g}"
+        key += f"|{strength}{unit or ''}"
+    forms = dosage_forms(name_part)
+    if forms:
+        key += "|" + "+".join(sorted(forms))
+    return key
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance; stops early once every path exceeds `limit`."""
+    if abs(len(a) - len(b)) > (limit if limit is not None else len(a) + len(b)):
+        return (limit or 0) + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class MatchResult:
+    def __init__(self, status, entry=None, score=0.0, candidates=None, reason=""):
+        self.status = status          # "match", "miss" or "ambiguous"
+        self.entry = entry            # matched OTC medicine_name
+        self.score = score
+        self.candidates = candidates or []
+        self.reason = reason
+
+    def __repr__(self):
+        return f"MatchResult({self.status!r}, entry={self.entry!r}, score={self.score:.2f})"
+
+
+class OTCMatcher:
+    """
+    In-memory matcher over the OTC list.
+    Each entry is split into its generic name and brand aliases, e.g.
+    "Paracetamol (Dolo 650, Crocin)" -> paracetamol, dolo, crocin, with any
+    strength, "low-dose" and listed dosage form kept as constraints. Exact alias hits and near-exact
+    spellings are settled locally; everything else comes back as ambiguous
+    with the closest lexical candidates.
+    """
+    MATCH_MAX_EDITS = 1         # typo tolerance for a local match
+    MIN_FUZZY_LENGTH = 6        # shorter names must match exactly
+    CANDIDATE_SIMILARITY = 0.3  # trigram Jaccard for a lexical candidate
+
+    def __init__(self, otc_list=None):
+        self.aliases = {}           # normalized alias -> OTC medicine_name
+        self.dosages = {}           # OTC medicine_name -> (low, high, unit)
+        self.forms = {}             # OTC medicine_name -> dosage forms it covers
+        self.low_dose = set()       # entries that are OTC only at a low dose
+        self._trigram_index = {}    # trigram -> set of aliases
+        self._alias_trigrams = {}
+        for item in otc_list if otc_list is not None else OTC_LIST_DATA:
+            self._add_entry(item["medicine_name"])
+
+    def _add_entry(self, entry):
+        forms = dosage_forms(entry)
+        if "low-dose" in forms:
+            self.low_dose.add(entry)
+        if not forms - {"modified release", "low-dose"}:
+            forms |= DEFAULT_FORMS
+        self.forms[entry] = forms
+        outer = re.sub(r"\(.*?\)", " ", entry)
+        inner = " ".join(re.findall(r"\((.*?)\)", entry))
+        inner_parts = re.split(r"[,/]", inner)
+        # "Shelcal 500" and "Aspirin (325mg)" limit the strength; "(Dolo 650, ...)" is just a brand
+        for part in [outer] + inner_parts:
+            dosage = parse_dosage(part)
+            if dosage and (part is outer or not normalize_name(part)):
+                self.dosages[entry] = dosage
+                break
+        for part in re.split(r"[,/]", outer) + inner_parts:
+            alias = normalize_name(part)
+            if alias and alias not in self.aliases:
+                self.aliases[alias] = entry
+                grams = trigrams(alias)
+                self._alias_trigrams[alias] = grams
+                for gram in grams:
+                    self._trigram_index.setdefault(gram, set()).add(alias)
+
+    def _similar_aliases(self, name):
+        grams = trigrams(name)
+        shared = Counter()
+        for gram in grams:
+            for alias in self._trigram_index.get(gram, ()):
+                shared[alias] += 1
+        scored = []
+        for alias, count in shared.items():
+            jaccard = count / (len(grams) + len(self._alias_trigrams[alias]) - count)
+            scored.append((jaccard, alias))
+        scored.sort(reverse=True)
+        return scored
+
+    def _form_conflict(self, entry, med_str):
+        return not dosage_forms(med_str) <= self.forms.get(entry, DEFAULT_FORMS)
+
+    def _dosage_conflict(self, entry, med_str):
+        allowed = self.dosages.get(entry)
+        given = parse_dosage(med_str)
+        if entry in self.low_dose and not (allowed and given):
+            # "low-dose" is a strength limit; without numbers to compare it cannot be confirmed
+            return True
+        if not allowed or not given:
+            return False
+        if allowed[2] and given[2] and allowed[2] != given[2]:
+            return True
+        return not (allowed[0] <= given[0] and given[1] <= allowed[1])
+
+    def match(self, med_str):
+        med_str = str(med_str).strip()
+        if "\n" in med_str:
+            # A whole details block cannot be settled by looking at its first name
+            return MatchResult("ambiguous", reason="Several medicines in one entry.")
+        name = normalize_name(medicine_name_part(med_str))
+        if not name:
+            return MatchResult("miss", reason="No medicine name could be read.")
+
+        entry = self.aliases.get(name)
+        score = 1.0
+        if entry is None and len(name) >= self.MIN_FUZZY_LENGTH:
+            for similarity, alias in self._similar_aliases(name)[:5]:
+                if edit_distance(name, alias, self.MATCH_MAX_EDITS) <= self.MATCH_MAX_EDITS:
+                    entry, score = self.aliases[alias], similarity
+                    break
+
+        if entry is not None:
+            if self._form_conflict(entry, med_str):
+                return MatchResult("ambiguous", score=score, candidates=[entry],
+                                   reason="Dosage form differs from the approved OTC form.")
+            if self._dosage_conflict(entry, med_str):
+                return MatchResult("ambiguous", score=score, candidates=[entry],
+                                   reason="Strength differs from the approved OTC strength.")
+            return MatchResult("match", entry=entry, score=score, reason=f"Matched with {entry}")
+
+        candidates = []
+        best = 0.0
+        for similarity, alias in self._similar_aliases(name):
+            if similarity < self.CANDIDATE_SIMILARITY:
+                break
+            best = max(best, similarity)
+            if self.aliases[alias] not in candidates:
+                candidates.append(self.aliases[alias])
+        # A listed name inside a longer one ("paracetamol tramadol") may be a combination
+        for alias, listed in self.aliases.items():
+            if re.search(rf"\b{re.escape(alias)}\b", name) and listed not in candidates:
+                candidates.append(listed)
+        return MatchResult("ambiguous", score=best, candidates=candidates[:5])
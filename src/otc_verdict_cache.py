@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from src.config import Config
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class OTCVerdictCache:
+    """
+    Per-drug OTC verdicts shared by every user and process.
+    Entries are keyed by verdict_key (normalized name, strength and dosage
+    form) and the OTC list version, so editing OTC_LIST_DATA starts a fresh cache; entries of
+    older versions are deleted once per process. An in-process LRU sits in
+    front of the MongoDB collection, and the cache keeps working in memory
+    only if MongoDB is unavailable.
+    """
+    def __init__(self, list_version, collection=None, max_size=None):
+        self.list_version = list_version
+        self.collection = collection
+        self.max_size = max_size or Config.OTC_VERDICT_CACHE_SIZE
+        self._entries = OrderedDict()  # key -> (kind, reason)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _doc_id(self, key):
+        return f"{self.list_version}:{key}"
+
+    def _remember(self, key, verdict):
+        with self._lock:
+            self._entries[key] = verdict
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_many(self, keys):
+        """Returns {key: (kind, reason)} for every key with a cached verdict."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+        self.memory_hits += len(found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if missing and self.collection is not None:
+            try:
+                docs = self.collection.find({"_id": {"$in": [self._doc_id(key) for key in missing]}})
+                for doc in docs:
+                    verdict = (doc["kind"], doc["reason"])
+                    found[doc["key"]] = verdict
+                    self._remember(doc["key"], verdict)
+                    self.shared_hits += 1
+            except Exception as e:
+                logger.warning(f"OTC verdict cache lookup failed: {e}")
+        self.misses += len([key for key in missing if key not in found])
+        return found
+
+    def put(self, key, kind, reason):
+        self._remember(key, (kind, reason))
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_one(
+                {"_id": self._doc_id(key)},
+                {"$set": {
+                    "key": key,
+                    "list_version": self.list_version,
+                    "kind": kind,
+                    "reason": reason,
+                    "updated_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not store OTC verdict for '{key}': {e}")
+
+    def purge_stale(self):
+        """Deletes verdicts recorded against other versions of the OTC list."""
+        if self.collection is None:
+            return True
+        try:
+            deleted = self.collection.delete_many({"list_version": {"$ne": self.list_version}}).deleted_count
+            if deleted:
+                logger.info(f"Dropped {deleted} OTC verdicts from older OTC list versions")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not purge stale OTC verdicts: {e}")
+            return False
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "memory_hits": self.memory_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "size": size,
+        }
@@ -0,0 +1,123 @@
+import threading
+from src.config import Config
+from src.utils import setup_logger, remove_stopwords
+
+logger = setup_logger(__name__)
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+def count_tokens(text):
+    """
+    Approximate token count. Uses tiktoken's cl100k_base when it is available
+    (close enough to Gemini's tokenizer for budgeting) and ~4 chars/token otherwise.
+    """
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+                    _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def _truncate_to_tokens(text, max_tokens):
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Binary search on characters keeps this independent of the tokenizer in use
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+PROMPT_TEMPLATE = """
+        You are a helpful medical assistant. Answer the user's question based on the provided context and chat history.
+
+        IMPORTANT INSTRUCTIONS:
+        1. Answer in the following language: {language}
+        2. If the user asks about a medicine ("What is this for?"), provide TWO things:
+           a) The specific instructions from the prescription (dosage, timing).
+           b) General medical knowledge about what the medicine is commonly used for (e.g., "Paracetamol is commonly used for fever and pain relief").
+
+        Context from Prescriptions:
+        {context}
+
+        Summary of Earlier Conversation:
+        {summary}
+
+        Chat History:
+        {history}
+
+        User Question: {question}
+
+        Answer:
+        """
+
+
+class PromptBuilder:
+    """
+    Assembles the RAG prompt within a token budget.
+    Prescription context is filled first (up to `context_share` of what the
+    fixed template leaves), then the conversation summary, then the most recent
+    history messages, newest first. History messages that were loaded but not
+    placed verbatim are returned so they can be folded into the summary.
+    """
+    def __init__(self, budget=None, max_history_messages=None, context_share=0.6):
+        self.budget = budget or Config.PROMPT_TOKEN_BUDGET
+        self.max_history_messages = max_history_messages or Config.PROMPT_HISTORY_MESSAGES
+        self.context_share = context_share
+
+    def build(self, question, context, history, summary="", language="English"):
+        """Returns (prompt, token_count, messages_to_fold)."""
+        fixed = count_tokens(PROMPT_TEMPLATE.format(language=language, context="", summary="", history="", question=question))
+        remaining = max(0, self.budget - fixed)
+
+        context_parts = []
+        context_budget = int(remaining * self.context_share)
+        for chunk in context:
+            cost = count_tokens(chunk) + 2
+            if cost > context_budget:
+                trimmed = _truncate_to_tokens(chunk, context_budget - 2)
+                if trimmed:
+                    context_parts.append(trimmed)
+                break
+            context_parts.append(chunk)
+            context_budget -= cost
+        context_str = "\n\n".join(context_parts)
+        remaining -= count_tokens(context_str)
+
+        summary_str = _truncate_to_tokens(summary or "", remaining // 2)
+        remaining -= count_tokens(summary_str)
+
+        kept = []
+        for msg in reversed(history[-self.max_history_messages:]):
+            line = f"{msg['role'].capitalize()}: {remove_stopwords(msg['content'])}"
+            cost = count_tokens(line) + 1
+            if cost > remaining:
+                break
+            kept.append((msg, line))
+            remaining -= cost
+        kept.reverse()
+        # Kept messages are always the newest suffix of the history
+        to_fold = list(history[:len(history) - len(kept)])
+        history_str = "\n".join(line for _, line in kept)
+
+        prompt = PROMPT_TEMPLATE.format(
+            language=language,
+            context=context_str,
+            summary=summary_str or "-",
+            history=history_str,
+            question=question
+        )
+        return prompt, count_tokens(prompt), to_fold
@@ -1,7 +1,6 @@
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-from pymongo import MongoClient
-from src.config import Config
+from src.db import get_mongo_client
 from src.utils import setup_logger
 
 logger = setup_logger(__name__)
@@ -9,7 +8,7 @@ logger = setup_logger(__name__)
 
 class ReminderManager:
     def __init__(self):
-        self.client = MongoClient(Config.MONGO_URI, **Config.get_tls_kwargs())
+        self.client = get_mongo_client()
         self.db = self.client['medimate']
         self.reminders = self.db['reminders']
         self.adherence = self.db['adherence_log']
@@ -0,0 +1,125 @@
+import threading
+import time
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class ResourceContainer:
+    """
+    Builds each heavy client (Pinecone, Gemini, LangGraph, ...) once per process,
+    lazily on first use, and hands the same instance to every Streamlit session.
+    Each resource has its own lock, so concurrent first requests build it once
+    and unrelated resources can be built in parallel.
+    """
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource: {name}")
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                start = time.perf_counter()
+                instance = self._factories[name]()
+                self._instances[name] = instance
+                logger.info(f"Built shared resource '{name}' in {time.perf_counter() - start:.2f}s")
+        return instance
+
+    def is_built(self, name):
+        return name in self._instances
+
+    def reset(self, name):
+        """Drops a built instance so the next get() rebuilds it."""
+        with self._locks.get(name, self._lock):
+            self._instances.pop(name, None)
+
+    def warm_up(self, names):
+        """Builds the given resources on a background thread; get() waits for any in progress."""
+        def build_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error(f"Failed to warm up resource '{name}': {e}")
+        thread = threading.Thread(target=build_all, name="resource-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+def _build_default_container():
+    # Imports stay inside the factories so importing this module is cheap
+    container = ResourceContainer()
+
+    def vector_store():
+        from src.vector_store import VectorStoreManager
+        return VectorStoreManager()
+
+    def memory():
+        from src.memory import MemoryManager
+        return MemoryManager()
+
+    def extractor():
+        from src.extractor import PrescriptionExtractor
+        return PrescriptionExtractor()
+
+    def rag_graph():
+        from src.graph import RAGGraph
+        return RAGGraph(vector_store=container.get("vector_store"), memory=container.get("memory")).build_graph()
+
+    def otc_manager():
+        from src.otc_manager import OTCManager
+        return OTCManager(vector_store=container.get("vector_store"))
+
+    def auth():
+        from src.auth import AuthManager
+        return AuthManager()
+
+    def reminder_manager():
+        from src.reminder import ReminderManager
+        return ReminderManager()
+
+    def pharmacy_locator():
+        from src.pharmacy_locator import PharmacyLocator
+        return PharmacyLocator()
+
+    def voice_assistant():
+        from src.voice_assistant import VoiceAssistant
+        return VoiceAssistant()
+
+    def job_queue():
+        from src.jobs import JobQueue
+        from src.upload_pipeline import process_upload
+        queue = JobQueue(collection=container.get("memory").db.jobs)
+        queue.register("upload", lambda job, update: process_upload(job, update, container))
+        queue.start()
+        return queue
+
+    for factory in (vector_store, memory, extractor, rag_graph, otc_manager, auth,
+                    reminder_manager, pharmacy_locator, voice_assistant, job_queue):
+        container.register(factory.__name__, factory)
+    return container
+
+
+_resources = None
+_resources_lock = threading.Lock()
+
+def get_resources():
+    """Process-wide resource container."""
+    global _resources
+    with _resources_lock:
+        if _resources is None:
+            _resources = _build_default_container()
+        return _resources
@@ -0,0 +1,151 @@
+import re
+
+FORM_PREFIX = re.compile(
+    r"^(?:tab(?:let)?s?|cap(?:sule)?s?|syp|syrup|susp(?:ension)?|inj(?:ection)?|oint(?:ment)?|gel|cream|"
+    r"drops?|lotion)\b\.?\s*",
+    re.IGNORECASE
+)
+BULLET = re.compile(r"^\s*(?:[-•*]|\d{1,2}[.)])\s*")
+# "1-0-1", "1 - 0 - 1", "½-0-1", "1-1-1-1"; the lookarounds keep dates like 12-03-2024 out
+FREQUENCY = re.compile(
+    r"(?<![\d/.-])([0-4](?:\.5)?|½)\s*-\s*([0-4](?:\.5)?|½)\s*-\s*([0-4](?:\.5)?|½)(?:\s*-\s*([0-4](?:\.5)?|½))?(?![\d/-])"
+)
+ABBREVIATIONS = {
+    "od": "1-0-0", "qd": "1-0-0", "bd": "1-0-1", "bid": "1-0-1", "tds": "1-1-1", "tid": "1-1-1",
+    "qid": "1-1-1-1", "hs": "0-0-1",
+}
+ABBREVIATION = re.compile(r"\b(" + "|".join(ABBREVIATIONS) + r")\b\.?", re.IGNORECASE)
+INSTRUCTIONS = [
+    (re.compile(r"\b(?:after|post)[\s-]*(?:food|meals?|breakfast|lunch|dinner)\b|\bp\.?c\.?(?=\s|$)", re.IGNORECASE),
+     "After meal"),
+    (re.compile(r"\b(?:before|pre)[\s-]*(?:food|meals?|breakfast|lunch|dinner)\b|\ba\.?c\.?(?=\s|$)", re.IGNORECASE),
+     "Before meal"),
+    (re.compile(r"\bempty\s+stomach\b", re.IGNORECASE), "Empty stomach"),
+    (re.compile(r"\bwith\s+(?:food|meals?)\b", re.IGNORECASE), "With meal"),
+    (re.compile(r"\b(?:at\s+)?bed\s*time\b", re.IGNORECASE), "At bedtime"),
+]
+DURATION = re.compile(r"(?:\bx\s*|\bfor\s+)?\b(\d+)\s*(days?|weeks?|months?)\b", re.IGNORECASE)
+QUANTITY = re.compile(r"\b(\d+(?:/\d+)?|½)\s*(tab(?:let)?s?|cap(?:sule)?s?|ml|drops?|puffs?|sachets?)\b", re.IGNORECASE)
+DATE = re.compile(r"\b(\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4})\b")
+# Strengths and dosing words: a line with these that does not parse is probably a missed medicine
+DRUG_HINT = re.compile(
+    r"\b\d+(?:\.\d+)?\s*(?:mg|mcg|µg|g|ml|iu)\b|"
+    r"\b(?:once|twice|thrice|times|daily|nightly|weekly|tablets?|capsules?|sos|stat)\b",
+    re.IGNORECASE
+)
+NOTES = re.compile(r"^\s*(?:advice|notes?|instructions?|remarks?)\s*[:\-]\s*(.+)$", re.IGNORECASE)
+# Anything after the name: the schedule, timing words, "x 5 days", "Qty", column separators
+NAME_END = re.compile(
+    FREQUENCY.pattern + r"|" + ABBREVIATION.pattern + r"|" + QUANTITY.pattern +
+    r"|\b(?:after|before|empty|with|at|for|x)\b|\bqty\b|\||\s--\s",
+    re.IGNORECASE
+)
+
+PLURAL_UNITS = {"days", "weeks", "months"}
+
+
+def _timing_from(frequency):
+    parts = frequency.split("-")
+    taken = ["No" if part == "0" else "Yes" for part in parts]
+    return {"morning": taken[0], "afternoon": taken[1], "night": taken[-1]}
+
+
+def parse_medicine_line(line):
+    """
+    Parses one line such as "Tab Dolo 650 1-0-1 x 5 days after food".
+    Returns (medicine, score) where score is the share of fields that were
+    recognised, or (None, 0.0) if the line does not look like a medicine.
+    """
+    body = BULLET.sub("", line).strip()
+    has_form = bool(FORM_PREFIX.match(body))
+    frequency_match = FREQUENCY.search(body)
+    abbreviation_match = ABBREVIATION.search(body)
+    if not (has_form or frequency_match or abbreviation_match):
+        return None, 0.0
+
+    body = FORM_PREFIX.sub("", body, count=1)
+    end = NAME_END.search(body)
+    name = (body[:end.start()] if end else body).strip(" :,-;")
+    if not re.search(r"[A-Za-z]{2,}", name):
+        return None, 0.0
+    rest = body[len(name):]
+
+    if frequency_match:
+        frequency = "-".join("0.5" if p == "½" else p for p in frequency_match.groups() if p is not None)
+    elif abbreviation_match:
+        frequency = ABBREVIATIONS[abbreviation_match.group(1).lower()]
+    else:
+        frequency = None
+
+    instruction = next((label for pattern, label in INSTRUCTIONS if pattern.search(rest)), None)
+    duration_match = DURATION.search(rest)
+    duration = None
+    if duration_match:
+        count, unit = duration_match.groups()
+        unit = unit.lower()
+        if count == "1" and unit in PLURAL_UNITS:
+            unit = unit[:-1]
+        elif count != "1" and unit not in PLURAL_UNITS:
+            unit += "s"
+        duration = f"{count} {unit}"
+    quantity_match = QUANTITY.search(rest)
+
+    timing = _timing_from(frequency) if frequency else {"morning": "-", "afternoon": "-", "night": "-"}
+    timing["instruction"] = instruction or "-"
+    medicine = {
+        "name": name,
+        "quantity": quantity_match.group(0) if quantity_match else "-",
+        "timing": timing,
+        "frequency": frequency or "-",
+        "duration": duration or "-",
+    }
+    # The schedule matters most; name alone is not enough to trust the line
+    score = 0.4 + (0.3 if frequency else 0.0) + (0.15 if duration else 0.0) + (0.15 if instruction else 0.0)
+    return medicine, score
+
+
+def parse_prescription_text(text):
+    """
+    Rule-based extraction for e-prescriptions with a text layer.
+    Returns (result, confidence) with result in the same schema as
+    PrescriptionExtractor. Confidence is the score of the weakest medicine
+    line, scaled by the share of lines in the medicine block that parsed.
+    It is 0 when no medicine was found or when a line that looks like a
+    medicine (a strength or dosing words) could not be parsed.
+    """
+    date = "-"
+    notes = []
+    medicines = []
+    scores = []
+    missed_drug_line = False
+    parsed_at = []      # line indexes of parsed medicines
+    unparsed_at = []    # line indexes of other body lines
+    for index, raw_line in enumerate(text.splitlines()):
+        line = raw_line.strip()
+        if not line:
+            continue
+        notes_match = NOTES.match(line)
+        if notes_match:
+            notes.append(notes_match.group(1).strip())
+            continue
+        medicine, score = parse_medicine_line(line)
+        if medicine:
+            medicines.append(medicine)
+            scores.append(score)
+            parsed_at.append(index)
+            continue
+        unparsed_at.append(index)
+        if DRUG_HINT.search(line):
+            missed_drug_line = True
+        if date == "-":
+            date_match = DATE.search(line)
+            if date_match:
+                date = date_match.group(1)
+
+    result = {"date": date, "medicines": medicines, "notes": "; ".join(notes) if notes else "-"}
+    if not scores or missed_drug_line:
+        return result, 0.0
+    # Headers and signatures are expected; unparsed lines between medicines are not
+    skipped = sum(1 for index in unparsed_at if parsed_at[0] < index < parsed_at[-1])
+    confidence = min(scores) * len(scores) / (len(scores) + skipped)
+    return result, confidence
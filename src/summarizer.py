@@ -0,0 +1,74 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.utils import setup_logger, message_text
+
+logger = setup_logger(__name__)
+
+
+class ConversationSummarizer:
+    """
+    Folds older chat turns into the rolling `sessions.summary` field.
+    Runs on a small background pool so summarization never delays an answer.
+    At most one summarization per session is in flight at a time; requests
+    that arrive meanwhile are coalesced into one follow-up run.
+    """
+    def __init__(self, llm, memory, max_workers=2):
+        self.llm = llm
+        self.memory = memory
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarizer")
+        self._in_flight = set()
+        self._pending = {}  # session_id -> latest messages submitted while a run was in flight
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, summary, messages):
+        with self._lock:
+            if session_id in self._in_flight:
+                # Each request carries every turn that no longer fits, so the latest one covers the others
+                self._pending[session_id] = messages
+                return None
+            self._in_flight.add(session_id)
+        return self.executor.submit(self._run, session_id, summary, messages)
+
+    def _run(self, session_id, summary, messages):
+        """Summarizes, then keeps folding coalesced requests until none is pending."""
+        result = None
+        watermark = None
+        while True:
+            if messages:
+                result = self._summarize(session_id, summary, messages)
+                if result:
+                    summary = result
+                    watermark = messages[-1].get("timestamp")
+            with self._lock:
+                pending = self._pending.pop(session_id, None)
+                if pending is None:
+                    self._in_flight.discard(session_id)
+                    return result
+            messages = [
+                msg for msg in pending
+                if not watermark or (msg.get("timestamp") and msg["timestamp"] > watermark)
+            ]
+
+    def _summarize(self, session_id, summary, messages):
+        try:
+            transcript = "\n".join(f"{msg['role'].capitalize()}: {msg['content']}" for msg in messages)
+            prompt = f"""
+            Update the running summary of a conversation between a patient and a medical assistant about a prescription.
+            Keep medicines, dosages, timings and any concerns the patient raised. Be concise (under 150 words).
+
+            Current Summary:
+            {summary or "-"}
+
+            New Turns:
+            {transcript}
+
+            Updated Summary:
+            """
+            new_summary = message_text(self.llm.invoke(prompt)).strip()
+            if new_summary:
+                self.memory.update_summary(session_id, new_summary, summarized_until=messages[-1].get("timestamp"))
+                logger.info(f"Folded {len(messages)} message(s) into summary for session {session_id}")
+            return new_summary
+        except Exception as e:
+            logger.error(f"Summarization failed for session {session_id}: {e}")
+            return None
@@ -0,0 +1,60 @@
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def prescription_text(data):
+    """The details lines shown in the UI and the full text that is embedded."""
+    med_details = []
+    for med in data.get('medicines', []):
+        timing = med.get('timing') or {}
+        timing_str = f"Morning: {timing.get('morning')}, Afternoon: {timing.get('afternoon')}, Night: {timing.get('night')}, Instruction: {timing.get('instruction')}"
+        med_details.append(
+            f"- {med.get('name')} (Qty: {med.get('quantity')}): {timing_str}, Freq: {med.get('frequency')}, Duration: {med.get('duration')}"
+        )
+    meds_str = "\n".join(med_details)
+    text_content = f"Date: {data.get('date')}\n\nMedicines:\n{meds_str}\n\nNotes: {data.get('notes')}"
+    return meds_str, text_content
+
+
+def prescription_title(data, filename):
+    med_names = [m.get('name', 'Unknown') for m in data.get('medicines', [])]
+    if not med_names:
+        return f"Rx: {filename}"
+    title = f"Rx: {', '.join(med_names[:2])}"
+    if len(med_names) > 2:
+        title += "..."
+    return title
+
+
+def process_upload(job, update, resources):
+    """
+    Upload job: extract -> embed and index -> create the session and record
+    the content hash. The extraction is published before indexing starts so
+    the UI can show the medicines early.
+    """
+    payload = job["payload"]
+    prescription_id = payload["prescription_id"]
+    filename = payload["filename"]
+
+    update(stage="extracting")
+    data = resources.get("extractor").extract_data(payload["file_path"])
+    if not data:
+        raise RuntimeError("Failed to process prescription")
+    meds_str, text_content = prescription_text(data)
+    title = prescription_title(data, filename)
+    update(stage="indexing", extraction=data, title=title, details=meds_str)
+
+    resources.get("vector_store").add_prescription(prescription_id, [text_content], {"filename": filename})
+    memory = resources.get("memory")
+    memory.get_or_create_session(
+        payload["user_id"], prescription_id,
+        title=title, filename=filename, details=meds_str,
+        context_chunks=[text_content], medicines=data.get('medicines', [])
+    )
+    memory.record_upload(
+        payload["content_sha"], prescription_id, data,
+        title=title, details=meds_str, context_chunks=[text_content]
+    )
+    update(stage="indexed", prescription_id=prescription_id)
+    logger.info(f"Upload job {job['_id']} indexed prescription {prescription_id}")
@@ -1,5 +1,7 @@
+import hashlib
 import logging
 import os
+import uuid
 
 def setup_logger(name=__name__):
     logger = logging.getLogger(name)
@@ -15,6 +17,47 @@ def ensure_directory(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def save_upload(fileobj, directory, filename, chunk_size=1024 * 1024):
+    """
+    Streams an uploaded file to `directory` while hashing it and stores it
+    under its SHA-256, so identical uploads share one file whatever their name.
+    Returns (sha256, path).
+    """
+    ensure_directory(directory)
+    if hasattr(fileobj, "seek"):
+        fileobj.seek(0)
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "wb") as f:
+        for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+            digest.update(chunk)
+            f.write(chunk)
+    sha = digest.hexdigest()
+    path = os.path.join(directory, sha + os.path.splitext(filename)[1].lower())
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    return sha, path
+
+def message_text(message):
+    """Plain text of a message or chunk whose content may be a string or a list of parts."""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "")
+        for part in content
+        if isinstance(part, str) or part.get("type") == "text"
+    )
+
 def remove_stopwords(text):
     stop_words = {
         "a", "an", "the", "and", "but", "or", "for", "nor", "on", "at", "to", "from", "by", "with", "of",
@@ -0,0 +1,517 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import numpy as np
+from src.bootstrap import IndexManifest, run_once
+from src.config import Config
+from src.utils import setup_logger, ensure_directory
+
+logger = setup_logger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: segments are still append-only, the manifest update is not locked
+    fcntl = None
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock across processes sharing a local index directory."""
+    with open(path, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class VectorMatch:
+    """A single query hit, shaped like a Pinecone match (id, score, metadata)."""
+    def __init__(self, id, score, metadata=None):
+        self.id = id
+        self.score = score
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"VectorMatch(id={self.id!r}, score={self.score:.4f})"
+
+
+class QueryResult:
+    def __init__(self, matches):
+        self.matches = matches
+
+
+class NamespaceStats:
+    def __init__(self, vector_count):
+        self.vector_count = vector_count
+
+
+class IndexStats:
+    def __init__(self, namespaces, dimension=None):
+        self.namespaces = namespaces
+        self.dimension = dimension
+        self.total_vector_count = sum(ns.vector_count for ns in namespaces.values())
+
+
+class VectorBackend:
+    """
+    Interface every vector store backend implements.
+    It mirrors the subset of the Pinecone Index API that VectorStoreManager uses,
+    so a Pinecone Index and a local index are interchangeable.
+    """
+    def upsert(self, vectors, namespace=None):
+        raise NotImplementedError
+
+    def query(self, vector, top_k=5, include_metadata=True, filter=None, namespace=None):
+        raise NotImplementedError
+
+    def delete(self, ids, namespace=None):
+        raise NotImplementedError
+
+    def describe_index_stats(self):
+        raise NotImplementedError
+
+
+class PineconeBackend(VectorBackend):
+    """Serverless Pinecone index. Creates the index on first use if it is missing."""
+    def __init__(self, index_name=None, dimension=None):
+        from pinecone import Pinecone
+        self.pc = Pinecone(api_key=Config.PINECONE_API_KEY)
+        self.index_name = index_name or Config.PINECONE_INDEX_NAME
+        self.dimension = dimension or Config.EMBEDDING_DIMENSION
+        self.backend_id = f"pinecone:{self.index_name}"
+        run_once(f"pinecone_index:{self.index_name}", self._ensure_index)
+        self.index = self.pc.Index(self.index_name)
+
+    def _ensure_index(self):
+        """
+        Creates the index if it doesn't exist. Runs once per process, and is
+        skipped entirely while the index manifest records the same name and dimension.
+        """
+        from pinecone import ServerlessSpec
+        manifest = IndexManifest()
+        expected = {"index_name": self.index_name, "dimension": self.dimension}
+        if manifest.get("pinecone_index") == expected:
+            return True
+        if self.index_name in self.pc.list_indexes().names():
+            manifest.update("pinecone_index", expected)
+            return True
+
+        logger.info(f"Creating Pinecone index: {self.index_name}")
+        try:
+            self.pc.create_index(
+                name=self.index_name,
+                dimension=self.dimension,
+                metric="cosine",
+                spec=ServerlessSpec(
+                    cloud="aws",
+                    region=Config.PINECONE_ENV
+                )
+            )
+            time.sleep(5) # Wait for initialization
+            manifest.update("pinecone_index", expected)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to create index: {e}")
+            return False
+
+    def upsert(self, vectors, namespace=None):
+        return self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def query(self, vector, top_k=5, include_metadata=True, filter=None, namespace=None):
+        return self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=include_metadata,
+            filter=filter,
+            namespace=namespace
+        )
+
+    def delete(self, ids, namespace=None):
+        return self.index.delete(ids=ids, namespace=namespace)
+
+    def describe_index_stats(self):
+        return self.index.describe_index_stats()
+
+
+class _Namespace:
+    def __init__(self, dimension, dtype):
+        self.ids = []
+        self.rows = {}
+        self.metadata = []
+        self.vectors = np.zeros((0, dimension), dtype=dtype)
+        self.scales = np.zeros((0,), dtype=np.float32)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _matches_filter(metadata, filter_dict):
+    for field, condition in filter_dict.items():
+        expected = condition.get("$eq") if isinstance(condition, dict) else condition
+        if metadata.get(field) != expected:
+            return False
+    return True
+
+
+class LocalVectorIndex(VectorBackend):
+    """
+    In-process NumPy index with cosine top-k, namespaces and metadata
+    equality filters. Vectors are stored L2-normalised so a query is a single
+    matrix-vector product. When a path is given every batch is appended to
+    disk as a segment (see Persistence below); a namespace with a single
+    segment is memory-mapped on load.
+
+    Storage can be shrunk with Matryoshka-style truncation (truncate_dim keeps
+    the leading components and re-normalises) and/or int8 scalar quantization
+    (one float32 scale per vector), e.g. 3072 float32 -> 768 int8 is 16x smaller.
+    """
+    _open_indexes = {}
+    _open_lock = threading.Lock()
+
+    def __init__(self, dimension=None, path=None, quantization=None, truncate_dim=None):
+        self.dimension = dimension or Config.EMBEDDING_DIMENSION
+        self.quantization = quantization or "none"
+        if self.quantization not in ("none", "int8"):
+            raise ValueError(f"Unsupported quantization: {self.quantization}")
+        self.truncate_dim = truncate_dim if truncate_dim and truncate_dim < self.dimension else None
+        self.stored_dimension = self.truncate_dim or self.dimension
+        self.path = path
+        # The layout is part of the id so manifests recorded against another layout no longer match
+        self.backend_id = f"local:{path or id(self)}:{self.quantization}:{self.stored_dimension}"
+        self._namespaces = {}
+        self._lock = threading.RLock()
+        if path:
+            self._load()
+
+    @classmethod
+    def open(cls, path, dimension=None):
+        """Returns the process-wide index stored at path, loading it once."""
+        with cls._open_lock:
+            if path not in cls._open_indexes:
+                cls._open_indexes[path] = cls(
+                    dimension=dimension,
+                    path=path,
+                    quantization=Config.LOCAL_INDEX_QUANTIZATION,
+                    truncate_dim=Config.LOCAL_INDEX_TRUNCATE_DIM
+                )
+            return cls._open_indexes[path]
+
+    @property
+    def _dtype(self):
+        return np.int8 if self.quantization == "int8" else np.float32
+
+    def _namespace(self, namespace, create=False):
+        key = namespace or ""
+        ns = self._namespaces.get(key)
+        if ns is None and create:
+            ns = _Namespace(self.stored_dimension, self._dtype)
+            self._namespaces[key] = ns
+        return ns
+
+    def _prepare(self, matrix):
+        """Truncates (if configured) and L2-normalises float vectors."""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self.truncate_dim:
+            matrix = matrix[..., :self.truncate_dim]
+        return _normalize(matrix)
+
+    def _encode(self, matrix):
+        """Returns (stored rows, per-row scales) for prepared vectors."""
+        if self.quantization == "int8":
+            max_abs = np.abs(matrix).max(axis=-1, keepdims=True)
+            max_abs[max_abs == 0] = 1.0
+            codes = np.clip(np.rint(matrix / max_abs * 127.0), -127, 127).astype(np.int8)
+            return codes, (max_abs[..., 0] / 127.0).astype(np.float32)
+        return matrix.astype(np.float32), np.ones(matrix.shape[:-1], dtype=np.float32)
+
+    def _check_dimension(self, vector_id, values):
+        if values.shape not in ((self.dimension,), (self.stored_dimension,)):
+            raise ValueError(f"Vector {vector_id} has dimension {values.shape}, expected {self.dimension}")
+
+    def upsert(self, vectors, namespace=None):
+        latest = {}  # a repeated id within one batch keeps its last vector
+        for vector_id, values, metadata in vectors:
+            values = np.asarray(values, dtype=np.float32)
+            self._check_dimension(vector_id, values)
+            latest.pop(vector_id, None)
+            latest[vector_id] = (values[:self.stored_dimension], dict(metadata or {}))
+        if not latest:
+            return {"upserted_count": 0}
+        ids = list(latest)
+        metadatas = [metadata for _, metadata in latest.values()]
+        codes, scales = self._encode(self._prepare(np.stack([values for values, _ in latest.values()])))
+
+        with self._lock:
+            ns = self._namespace(namespace, create=True)
+            new_positions = []
+            for position, vector_id in enumerate(ids):
+                row = ns.rows.get(vector_id)
+                if row is None:
+                    ns.rows[vector_id] = len(ns.ids) + len(new_positions)
+                    new_positions.append(position)
+                    continue
+                if not ns.vectors.flags.writeable:
+                    ns.vectors = np.array(ns.vectors)
+                    ns.scales = np.array(ns.scales)
+                ns.vectors[row] = codes[position]
+                ns.scales[row] = scales[position]
+                ns.metadata[row] = metadatas[position]
+            if new_positions:
+                ns.vectors = np.concatenate([ns.vectors, codes[new_positions]])
+                ns.scales = np.concatenate([ns.scales, scales[new_positions]])
+                ns.ids.extend(ids[position] for position in new_positions)
+                ns.metadata.extend(metadatas[position] for position in new_positions)
+            if self.path:
+                self._append_segment(namespace, ids, metadatas, codes, scales)
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector, top_k=5, include_metadata=True, filter=None, namespace=None):
+        ns = self._namespace(namespace)
+        if ns is None or not ns.ids:
+            return QueryResult([])
+
+        query = self._prepare(vector)
+        with self._lock:
+            # int8 rows are upcast by the matmul; the scale restores the magnitude.
+            scores = (ns.vectors @ query) * ns.scales
+            if filter:
+                mask = np.fromiter((_matches_filter(m, filter) for m in ns.metadata), dtype=bool, count=len(ns.metadata))
+                scores = np.where(mask, scores, -np.inf)
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            matches = [
+                VectorMatch(ns.ids[row], float(scores[row]), ns.metadata[row] if include_metadata else None)
+                for row in top if np.isfinite(scores[row])
+            ]
+        return QueryResult(matches)
+
+    def delete(self, ids, namespace=None):
+        ids = list(ids)
+        with self._lock:
+            ns = self._namespace(namespace)
+            drop = {ns.rows[i] for i in ids if i in ns.rows} if ns is not None else set()
+            if drop:
+                keep = [row for row in range(len(ns.ids)) if row not in drop]
+                ns.vectors = np.array(ns.vectors[keep])
+                ns.scales = np.array(ns.scales[keep])
+                ns.ids = [ns.ids[row] for row in keep]
+                ns.metadata = [ns.metadata[row] for row in keep]
+                ns.rows = {vector_id: row for row, vector_id in enumerate(ns.ids)}
+            # Recorded even for ids this process has not loaded; another process may have written them
+            if self.path and ids:
+                empty = np.zeros((0, self.stored_dimension), dtype=self._dtype)
+                self._append_segment(namespace, [], [], empty, np.zeros((0,), dtype=np.float32), deleted=list(ids))
+        return {}
+
+    def describe_index_stats(self):
+        with self._lock:
+            namespaces = {name: NamespaceStats(len(ns.ids)) for name, ns in self._namespaces.items()}
+        return IndexStats(namespaces, dimension=self.dimension)
+
+    def memory_bytes(self):
+        """Bytes held by stored vectors and scales across all namespaces."""
+        with self._lock:
+            return sum(ns.vectors.nbytes + ns.scales.nbytes for ns in self._namespaces.values())
+
+    # --- Persistence ---
+    #
+    # Each upsert or delete batch is written as a new segment file
+    # (<namespace>.<id>.npy / .scales.npy / .json), and index.json lists the
+    # segments of every namespace in write order. A batch therefore costs
+    # O(batch), and processes sharing the directory only append to the
+    # manifest (under a file lock), so they never overwrite each other.
+    # Opening an index merges namespaces with too many segments into one,
+    # which is memory-mapped.
+
+    @staticmethod
+    def _file_stem(namespace):
+        name = namespace or "__default__"
+        return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+    def _manifest_path(self):
+        return os.path.join(self.path, "index.json")
+
+    def _lock_path(self):
+        return os.path.join(self.path, "index.lock")
+
+    def _layout(self):
+        return {
+            "dimension": self.dimension,
+            "stored_dimension": self.stored_dimension,
+            "quantization": self.quantization,
+        }
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path()):
+            return None
+        with open(self._manifest_path(), encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Indexes written before segments recorded one file stem per namespace
+        manifest["namespaces"] = {
+            name: [segments] if isinstance(segments, str) else list(segments)
+            for name, segments in manifest.get("namespaces", {}).items()
+        }
+        return manifest
+
+    def _write_manifest(self, manifest):
+        with open(self._manifest_path() + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(self._manifest_path() + ".tmp", self._manifest_path())
+
+    def _segment_files(self, segment):
+        return [os.path.join(self.path, f"{segment}{suffix}") for suffix in (".npy", ".scales.npy", ".json")]
+
+    def _write_segment(self, namespace, ids, metadata, vectors, scales, deleted=()):
+        """Writes a segment under a fresh name and returns it; nothing refers to it yet."""
+        segment = f"{self._file_stem(namespace)}.{uuid.uuid4().hex[:12]}"
+        vectors_path, scales_path, meta_path = self._segment_files(segment)
+        # Write to temp files first so a crash never leaves a torn segment.
+        for target, array in ((vectors_path, vectors), (scales_path, scales)):
+            with open(target + ".tmp", "wb") as f:
+                np.save(f, np.ascontiguousarray(array))
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ids": list(ids), "metadata": list(metadata), "deleted": list(deleted)}, f)
+        for target in (vectors_path, scales_path, meta_path):
+            os.replace(target + ".tmp", target)
+        return segment
+
+    def _remove_segments(self, segments):
+        for segment in segments:
+            for target in self._segment_files(segment):
+                if os.path.exists(target):
+                    os.remove(target)
+
+    def _append_segment(self, namespace, ids, metadata, vectors, scales, deleted=()):
+        ensure_directory(self.path)
+        segment = self._write_segment(namespace, ids, metadata, vectors, scales, deleted)
+        with _file_lock(self._lock_path()):
+            manifest = self._read_manifest() or dict(self._layout(), namespaces={})
+            layout = {key: manifest.get(key) for key in self._layout()}
+            if layout != self._layout():
+                self._remove_segments([segment])
+                raise RuntimeError(f"Local index at {self.path} now has layout {layout}, expected {self._layout()}")
+            manifest["namespaces"].setdefault(namespace or "", []).append(segment)
+            self._write_manifest(manifest)
+
+    def _read_segments(self, segments):
+        """Replays segments in write order into a namespace; a single clean segment is memory-mapped."""
+        ns = _Namespace(self.stored_dimension, self._dtype)
+        vector_parts, scale_parts = [], []
+        ids, metadata = [], []
+        latest = {}  # vector id -> position in the concatenated rows
+        for segment in segments:
+            vectors_path, scales_path, meta_path = self._segment_files(segment)
+            mmap_mode = "r" if len(segments) == 1 else None
+            vector_parts.append(np.load(vectors_path, mmap_mode=mmap_mode))
+            scale_parts.append(np.load(scales_path, mmap_mode=mmap_mode))
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            for vector_id in meta.get("deleted", []):
+                latest.pop(vector_id, None)
+            for vector_id, vector_meta in zip(meta["ids"], meta["metadata"]):
+                latest.pop(vector_id, None)
+                latest[vector_id] = len(ids)
+                ids.append(vector_id)
+                metadata.append(vector_meta)
+        if not ids:
+            return ns
+        keep = sorted(latest.values())
+        if len(keep) == len(ids) and len(segments) == 1:
+            ns.vectors, ns.scales = vector_parts[0], scale_parts[0]
+        else:
+            ns.vectors = np.concatenate(vector_parts)[keep]
+            ns.scales = np.concatenate(scale_parts)[keep]
+        ns.ids = [ids[position] for position in keep]
+        ns.metadata = [metadata[position] for position in keep]
+        ns.rows = {vector_id: row for row, vector_id in enumerate(ns.ids)}
+        return ns
+
+    def _compact_locked(self, manifest, names):
+        """Rewrites each named namespace as one segment; the caller holds the file lock."""
+        obsolete = []
+        for name in names:
+            segments = manifest["namespaces"][name]
+            ns = self._read_segments(segments)
+            manifest["namespaces"][name] = [self._write_segment(name, ns.ids, ns.metadata, ns.vectors, ns.scales)]
+            obsolete.extend(segments)
+        if names:
+            self._write_manifest(manifest)
+            self._remove_segments(obsolete)
+            logger.info(f"Compacted {len(obsolete)} segments of {len(names)} namespace(s) in {self.path}")
+
+    def compact(self):
+        """Merges every namespace on disk into a single segment."""
+        if not self.path or not os.path.exists(self._manifest_path()):
+            return
+        with self._lock, _file_lock(self._lock_path()):
+            manifest = self._read_manifest()
+            names = [name for name, segments in manifest["namespaces"].items() if len(segments) > 1]
+            self._compact_locked(manifest, names)
+
+    def _can_migrate(self, layout):
+        # Stored vectors can only be re-encoded to the same or fewer leading components
+        return (layout["dimension"] == self.dimension
+                and layout["quantization"] in ("none", "int8")
+                and isinstance(layout["stored_dimension"], int)
+                and self.stored_dimension <= layout["stored_dimension"])
+
+    def _migrate_locked(self, manifest):
+        """
+        Re-encodes every namespace of an index written with another layout into
+        this one. The old segments are only removed once the new manifest is in
+        place; the caller holds the file lock.
+        """
+        written, obsolete = {}, []
+        try:
+            for name, segments in manifest["namespaces"].items():
+                ns = self._read_segments(segments)
+                vectors, scales = self._encode(self._prepare(np.asarray(ns.vectors, dtype=np.float32) * ns.scales[:, None]))
+                written[name] = [self._write_segment(name, ns.ids, ns.metadata, vectors, scales)]
+                obsolete.extend(segments)
+        except Exception:
+            self._remove_segments([segment for segments in written.values() for segment in segments])
+            raise
+        self._write_manifest(dict(self._layout(), namespaces=written))
+        self._remove_segments(obsolete)
+
+    def _load(self):
+        if not os.path.exists(self._manifest_path()):
+            return
+        layout = self._layout()
+        try:
+            with _file_lock(self._lock_path()):
+                manifest = self._read_manifest()
+                layout = {key: manifest.get(key) for key in self._layout()}
+                if layout != self._layout() and self._can_migrate(layout):
+                    logger.info(f"Re-encoding local index at {self.path} from {layout} to {self._layout()}")
+                    self._migrate_locked(manifest)
+                    manifest, layout = self._read_manifest(), self._layout()
+                if layout == self._layout():
+                    self._compact_locked(manifest, [
+                        name for name, segments in manifest["namespaces"].items()
+                        if len(segments) > Config.LOCAL_INDEX_MAX_SEGMENTS
+                    ])
+                    for name, segments in manifest["namespaces"].items():
+                        self._namespaces[name] = self._read_segments(segments)
+        except Exception as e:
+            logger.error(f"Failed to load local vector index from {self.path}: {e}")
+            self._namespaces = {}
+            return
+        if layout != self._layout():
+            # Refuse to start rather than lose the vectors already stored there
+            message = (f"Local index at {self.path} has layout {layout}, which cannot be re-encoded "
+                       f"to {self._layout()}. Restore the previous settings or use another LOCAL_INDEX_DIR.")
+            logger.error(message)
+            raise RuntimeError(message)
+        logger.info(f"Loaded local vector index from {self.path} ({len(self._namespaces)} namespaces)")
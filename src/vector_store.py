@@ -1,47 +1,112 @@
-from pinecone import Pinecone, ServerlessSpec
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from src.answer_cache import get_answer_cache
 from src.config import Config
+from src.embedding_cache import CachedEmbeddings, get_embedding_cache
 from src.utils import setup_logger
+from src.vector_backends import LocalVectorIndex, PineconeBackend
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import threading
 import time
 
 logger = setup_logger(__name__)
 
 class VectorStoreManager:
     """
-    Manages interactions with Pinecone Vector DB.
+    Manages embeddings and the vector index.
+    Pinecone is the default backend; Config.VECTOR_BACKEND="local" swaps in the
+    in-process NumPy index, and Config.LOCAL_NAMESPACES serves selected
+    namespaces (e.g. the fixed OTC list) locally while the rest stay on Pinecone.
     """
-    def __init__(self):
-        self.pc = Pinecone(api_key=Config.PINECONE_API_KEY)
-        self.index_name = Config.PINECONE_INDEX_NAME
-        
+    def __init__(self, backend=None):
         # Initialize Embeddings
         if Config.GOOGLE_API_KEY:
-            self.embeddings = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001", google_api_key=Config.GOOGLE_API_KEY)
+            self.embeddings = CachedEmbeddings(
+                GoogleGenerativeAIEmbeddings(model=Config.EMBEDDING_MODEL_NAME, google_api_key=Config.GOOGLE_API_KEY),
+                get_embedding_cache(),
+                model_name=Config.EMBEDDING_MODEL_NAME
+            )
         else:
             logger.warning("Google API Key missing for embeddings.")
             self.embeddings = None
 
-        self._ensure_index()
-        self.index = self.pc.Index(self.index_name)
-
-    def _ensure_index(self):
-        """Creates the index if it doesn't exist."""
-        if self.index_name not in self.pc.list_indexes().names():
-            logger.info(f"Creating Pinecone index: {self.index_name}")
-            try:
-                self.pc.create_index(
-                    name=self.index_name,
-                    dimension=3072,  # Updated for gemini-embedding-001
-                    metric="cosine",
-                    spec=ServerlessSpec(
-                        cloud="aws",
-                        region=Config.PINECONE_ENV
-                    )
-                )
-                time.sleep(5) # Wait for initialization
-            except Exception as e:
-                logger.error(f"Failed to create index: {e}")
-                pass
+        self.last_batch_timings = []
+        self._chunk_cache = OrderedDict()
+        self._chunk_lock = threading.Lock()
+        self.index = backend or self._default_backend()
+        self.namespace_backends = {
+            namespace: LocalVectorIndex.open(Config.LOCAL_INDEX_DIR)
+            for namespace in Config.LOCAL_NAMESPACES
+        }
+
+    @staticmethod
+    def _default_backend():
+        if Config.VECTOR_BACKEND == "local":
+            return LocalVectorIndex.open(Config.LOCAL_INDEX_DIR)
+        return PineconeBackend()
+
+    def _backend_for(self, namespace):
+        return self.namespace_backends.get(namespace, self.index)
+
+    def backend_id(self, namespace=None):
+        """Identifies the backend serving a namespace, e.g. for manifests."""
+        return self._backend_for(namespace).backend_id
+
+    @staticmethod
+    def text_vector_id(text, namespace=None):
+        # Create a unique ID based on hash or index + namespace
+        text_hash = hashlib.md5(text.encode()).hexdigest()
+        return f"{namespace}_{text_hash}" if namespace else f"{text_hash}"
+
+    def delete(self, ids, namespace=None):
+        return self._backend_for(namespace).delete(ids=ids, namespace=namespace)
+
+    def cache_chunks(self, prescription_id, chunks):
+        """Keeps a prescription's chunks in memory for direct context retrieval."""
+        with self._chunk_lock:
+            self._chunk_cache[prescription_id] = list(chunks)
+            self._chunk_cache.move_to_end(prescription_id)
+            while len(self._chunk_cache) > Config.DIRECT_CONTEXT_CACHE_SIZE:
+                self._chunk_cache.popitem(last=False)
+
+    def get_cached_chunks(self, prescription_id):
+        with self._chunk_lock:
+            chunks = self._chunk_cache.get(prescription_id)
+            if chunks is not None:
+                self._chunk_cache.move_to_end(prescription_id)
+            return chunks
+
+    def _timed_upsert(self, batch, namespace=None):
+        start = time.perf_counter()
+        self._backend_for(namespace).upsert(vectors=batch, namespace=namespace)
+        return time.perf_counter() - start
+
+    def _embed_and_upsert(self, ids, texts, metadatas, namespace=None):
+        """
+        Embeds texts in embed_documents-sized batches and upserts each batch as
+        soon as it is embedded. Upserts run on a single background worker, so the
+        next embedding request overlaps with the previous write.
+        Returns per-batch timings.
+        """
+        batch_size = max(1, Config.EMBED_BATCH_SIZE)
+        pending = []
+        with ThreadPoolExecutor(max_workers=1) as upserter:
+            for batch_no, start in enumerate(range(0, len(texts), batch_size)):
+                end = start + batch_size
+                embed_start = time.perf_counter()
+                embeddings = self.embeddings.embed_documents(texts[start:end])
+                embed_time = time.perf_counter() - embed_start
+                batch = list(zip(ids[start:end], embeddings, metadatas[start:end]))
+                pending.append((batch_no, len(batch), embed_time, upserter.submit(self._timed_upsert, batch, namespace)))
+
+        timings = []
+        for batch_no, size, embed_time, future in pending:
+            upsert_time = future.result()
+            logger.info(f"Batch {batch_no}: {size} texts, embed {embed_time:.2f}s, upsert {upsert_time:.2f}s")
+            timings.append({"batch": batch_no, "size": size, "embed_s": embed_time, "upsert_s": upsert_time})
+        self.last_batch_timings = timings
+        return timings
 
     def add_texts(self, texts, metadata_list, namespace=None):
         """
@@ -50,27 +115,18 @@ class VectorStoreManager:
         if not self.embeddings:
             return False
 
-        vectors = []
+        ids = []
+        metadatas = []
         for i, text in enumerate(texts):
-            # Create a unique ID based on hash or index + namespace
-            import hashlib
-            text_hash = hashlib.md5(text.encode()).hexdigest()
-            vector_id = f"{namespace}_{text_hash}" if namespace else f"{text_hash}"
-            
-            embedding = self.embeddings.embed_query(text)
-            
+            ids.append(self.text_vector_id(text, namespace))
+
             meta = metadata_list[i].copy() if i < len(metadata_list) else {}
             meta["text"] = text
-            
-            vectors.append((vector_id, embedding, meta))
-
-        # Upsert in batches
-        batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i+batch_size]
-            self.index.upsert(vectors=batch, namespace=namespace)
-        
-        logger.info(f"Stored {len(vectors)} texts in namespace '{namespace}'")
+            metadatas.append(meta)
+
+        self._embed_and_upsert(ids, list(texts), metadatas, namespace=namespace)
+
+        logger.info(f"Stored {len(ids)} texts in namespace '{namespace}'")
         return True
 
     def add_prescription(self, prescription_id, text_chunks, metadata):
@@ -80,26 +136,24 @@ class VectorStoreManager:
         if not self.embeddings:
             return False
 
-        vectors = []
+        ids = []
+        metadatas = []
         for i, chunk in enumerate(text_chunks):
-            vector_id = f"{prescription_id}_{i}"
-            embedding = self.embeddings.embed_query(chunk)
-            
+            ids.append(f"{prescription_id}_{i}")
+
             # Combine chunk metadata with global metadata
             chunk_metadata = metadata.copy()
             chunk_metadata["text"] = chunk
             chunk_metadata["chunk_id"] = i
             chunk_metadata["prescription_id"] = prescription_id
-            
-            vectors.append((vector_id, embedding, chunk_metadata))
-
-        # Upsert in batches
-        batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i+batch_size]
-            self.index.upsert(vectors=batch)
-        
-        logger.info(f"Stored {len(vectors)} chunks for prescription {prescription_id}")
+            metadatas.append(chunk_metadata)
+
+        self._embed_and_upsert(ids, list(text_chunks), metadatas)
+        self.cache_chunks(prescription_id, text_chunks)
+        # Answers generated from the previous version of this prescription are stale
+        get_answer_cache().invalidate(prescription_id)
+
+        logger.info(f"Stored {len(ids)} chunks for prescription {prescription_id}")
         return True
 
     def search(self, query, prescription_id=None, namespace=None, top_k=5):
@@ -117,7 +171,7 @@ class VectorStoreManager:
         if prescription_id:
             filter_dict = {"prescription_id": {"$eq": prescription_id}}
 
-        results = self.index.query(
+        results = self._backend_for(namespace).query(
             vector=query_embedding,
             top_k=top_k,
             include_metadata=True,
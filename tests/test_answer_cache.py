@@ -0,0 +1,57 @@
+import sys
+import os
+
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.answer_cache import SemanticAnswerCache
+
+import unittest
+
+class TestSemanticAnswerCache(unittest.TestCase):
+
+    def test_semantic_hit_above_threshold(self):
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        cache.store("rx1", "s1", "English", "When do I take it?", "After food", embedding=[1.0, 0.0])
+
+        embed = MagicMock(return_value=[0.99, 0.05])
+        self.assertEqual(cache.lookup("rx1", "s1", "English", "When should I take this?", embed_fn=embed), "After food")
+        self.assertIsNone(cache.lookup("rx1", "s1", "English", "Side effects?", embed_fn=lambda q: [0.0, 1.0]))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_verbatim_hit_does_not_embed(self):
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        cache.store("rx1", "s1", "English", "What is this for?", "Fever")
+        embed = MagicMock()
+
+        self.assertEqual(cache.lookup("rx1", "s1", "English", "what is this for", embed_fn=embed), "Fever")
+        embed.assert_not_called()
+
+    def test_scoped_by_prescription_session_and_language(self):
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=10)
+        cache.store("rx1", "s1", "English", "q", "a")
+        self.assertIsNone(cache.lookup("rx2", "s1", "English", "q"))
+        self.assertIsNone(cache.lookup("rx1", "s1", "Hindi", "q"))
+        # Another user's conversation on the same (deduplicated) prescription
+        self.assertIsNone(cache.lookup("rx1", "s2", "English", "q"))
+
+    def test_ttl_lru_and_invalidation(self):
+        cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=2)
+        cache.store("rx1", "s1", "English", "q1", "a1")
+        cache.store("rx1", "s1", "English", "q2", "a2")
+        cache.lookup("rx1", "s1", "English", "q1")
+        cache.store("rx2", "s1", "English", "q3", "a3")
+        self.assertIsNone(cache.lookup("rx1", "s1", "English", "q2"))
+        self.assertEqual(cache.lookup("rx1", "s1", "English", "q1"), "a1")
+
+        cache.invalidate("rx1")
+        self.assertIsNone(cache.lookup("rx1", "s1", "English", "q1"))
+
+        with patch('src.answer_cache.time.time', return_value=10 ** 12):
+            self.assertIsNone(cache.lookup("rx2", "s1", "English", "q3"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import sys
+import os
+
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.db import get_mongo_client, PoolStatsListener
+
+import unittest
+
+class TestSharedMongoClient(unittest.TestCase):
+
+    def test_managers_share_one_client(self):
+        from src.auth import AuthManager
+        from src.reminder import ReminderManager
+        self.assertIs(get_mongo_client(), get_mongo_client())
+        self.assertIs(AuthManager().client, ReminderManager().client)
+
+    def test_listener_tracks_checkouts_and_waiters(self):
+        listener = PoolStatsListener()
+        event = MagicMock()
+        listener.connection_created(event)
+        listener.connection_check_out_started(event)
+        listener.connection_check_out_started(event)
+        listener.connection_checked_out(event)
+
+        self.assertEqual(listener.snapshot()["waiting"], 1)
+        self.assertEqual(listener.snapshot()["checked_out"], 1)
+        self.assertEqual(listener.snapshot()["max_waiting"], 2)
+
+        listener.connection_check_out_failed(event)
+        listener.connection_checked_in(event)
+        stats = listener.snapshot()
+        self.assertEqual((stats["waiting"], stats["checked_out"], stats["checkout_failures"], stats["open"]), (0, 0, 1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import sys
+import os
+import tempfile
+
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+import unittest
+
+def fake_embeddings():
+    embeddings = MagicMock()
+    embeddings.embed_query.side_effect = lambda text: [float(len(text)), 0.5]
+    embeddings.embed_documents.side_effect = lambda texts: [[float(len(t)), 0.25] for t in texts]
+    return embeddings
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def test_query_is_embedded_once(self):
+        cached = CachedEmbeddings(fake_embeddings(), EmbeddingCache(), model_name="m")
+
+        first = cached.embed_query("paracetamol")
+        second = cached.embed_query("paracetamol")
+
+        self.assertEqual(first, second)
+        cached.embeddings.embed_query.assert_called_once_with("paracetamol")
+        stats = cached.cache.stats()
+        self.assertEqual((stats["memory_hits"], stats["misses"]), (1, 1))
+
+    def test_documents_only_embed_missing_texts(self):
+        cached = CachedEmbeddings(fake_embeddings(), EmbeddingCache(), model_name="m")
+        cached.embed_documents(["a", "bb"])
+
+        vectors = cached.embed_documents(["bb", "ccc", "a"])
+
+        self.assertEqual(vectors, [[2.0, 0.25], [3.0, 0.25], [1.0, 0.25]])
+        cached.embeddings.embed_documents.assert_called_with(["ccc"])
+
+    def test_task_type_and_model_are_part_of_key(self):
+        self.assertNotEqual(
+            EmbeddingCache.make_key("m", "RETRIEVAL_QUERY", "x"),
+            EmbeddingCache.make_key("m", "RETRIEVAL_DOCUMENT", "x")
+        )
+        self.assertNotEqual(
+            EmbeddingCache.make_key("m1", "RETRIEVAL_QUERY", "x"),
+            EmbeddingCache.make_key("m2", "RETRIEVAL_QUERY", "x")
+        )
+
+    def test_lru_eviction_and_disk_layer(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "emb.sqlite3")
+            cache = EmbeddingCache(path, max_items=1)
+            cache.put("k1", [1.0, 2.0])
+            cache.put("k2", [3.0, 4.0])
+            self.assertNotIn("k1", cache._memory)
+
+            self.assertEqual(cache.get("k1"), [1.0, 2.0])
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+
+            reopened = EmbeddingCache(path)
+            self.assertEqual(reopened.get("k2"), [3.0, 4.0])
+            cache._conn.close()
+            reopened._conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import sys
+import os
+import tempfile
+
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extraction_cache import ExtractionCache
+from src.extractor import PrescriptionExtractor
+
+import unittest
+
+class TestExtractionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "extractions.sqlite3")
+
+    def test_persists_and_keys_include_model_and_prompt(self):
+        cache = ExtractionCache(self.path)
+        key = ExtractionCache.make_key("sha", "model-a", "1")
+        cache.put(key, {"medicines": [{"name": "Dolo 650"}]})
+
+        reopened = ExtractionCache(self.path)
+        self.assertEqual(reopened.get(key), {"medicines": [{"name": "Dolo 650"}]})
+        self.assertIsNone(reopened.get(ExtractionCache.make_key("sha", "model-b", "1")))
+        self.assertIsNone(reopened.get(ExtractionCache.make_key("sha", "model-a", "2")))
+
+    def test_least_recently_used_rows_evicted(self):
+        cache = ExtractionCache(self.path, max_items=2)
+        cache.put("a", {"n": 1})
+        cache.put("b", {"n": 2})
+        cache.get("a")
+        cache.put("c", {"n": 3})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"n": 1})
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_extractor_uses_cache_unless_forced(self):
+        file_path = os.path.join(self.tmp.name, "rx.png")
+        with open(file_path, "wb") as f:
+            f.write(b"not really a png")
+
+        extractor = PrescriptionExtractor.__new__(PrescriptionExtractor)
+        extractor.cache = ExtractionCache(self.path)
+        with patch.object(PrescriptionExtractor, "_extract", return_value={"date": "-"}) as extract:
+            self.assertEqual(extractor.extract_data(file_path), {"date": "-"})
+            self.assertEqual(extractor.extract_data(file_path), {"date": "-"})
+            self.assertEqual(extract.call_count, 1)
+
+            extractor.extract_data(file_path, force_refresh=True)
+            self.assertEqual(extract.call_count, 2)
+
+    def test_failed_extraction_not_cached(self):
+        extractor = PrescriptionExtractor.__new__(PrescriptionExtractor)
+        extractor.cache = ExtractionCache(self.path)
+        with patch.object(PrescriptionExtractor, "_extract", return_value=None) as extract:
+            extractor.extract_data(b"bytes")
+            extractor.extract_data(b"bytes")
+            self.assertEqual(extract.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
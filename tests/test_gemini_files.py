@@ -0,0 +1,78 @@
+import sys
+import os
+import threading
+
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.gemini_files import GeminiFileUploader
+
+import unittest
+
+def fake_file(state, name="files/rx"):
+    file = MagicMock()
+    file.name = name
+    file.state.name = state
+    return file
+
+class TestGeminiFileUploader(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in [("GEMINI_POLL_INITIAL_DELAY", 0.01), ("GEMINI_POLL_MAX_DELAY", 0.02),
+                            ("GEMINI_UPLOAD_DEADLINE", 5)]:
+            patcher = patch(f"src.gemini_files.Config.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_polls_until_active_and_reports(self):
+        states = iter(["PROCESSING", "PROCESSING", "ACTIVE"])
+        uploader = GeminiFileUploader(
+            upload_fn=lambda path, display_name: fake_file("PROCESSING"),
+            get_fn=lambda name: fake_file(next(states))
+        )
+        result = uploader.submit("rx.pdf", "sha1").result(timeout=5)
+        self.assertEqual(result.file.state.name, "ACTIVE")
+        self.assertEqual(result.polls, 3)
+        self.assertFalse(result.reused)
+
+    def test_identical_content_reuses_handle(self):
+        upload = MagicMock(return_value=fake_file("ACTIVE"))
+        uploader = GeminiFileUploader(upload_fn=upload, get_fn=MagicMock())
+        uploader.submit("a.pdf", "sha1").result(timeout=5)
+        result = uploader.submit("b.pdf", "sha1").result(timeout=5)
+        self.assertTrue(result.reused)
+        self.assertEqual(upload.call_count, 1)
+        self.assertEqual(uploader.stats()["reused"], 1)
+
+    def test_deadline_and_failed_state(self):
+        uploader = GeminiFileUploader(
+            upload_fn=lambda path, display_name: fake_file("PROCESSING"),
+            get_fn=lambda name: fake_file("PROCESSING")
+        )
+        with patch("src.gemini_files.Config.GEMINI_UPLOAD_DEADLINE", 0.05):
+            with self.assertRaises(TimeoutError):
+                uploader.submit("rx.pdf").result(timeout=5)
+
+        failing = GeminiFileUploader(upload_fn=lambda path, display_name: fake_file("FAILED"), get_fn=MagicMock())
+        with self.assertRaises(RuntimeError):
+            failing.submit("rx.pdf", "sha2").result(timeout=5)
+        self.assertIsNone(failing._cached("sha2"))
+
+    def test_cancel_stops_polling(self):
+        polled = threading.Event()
+        def get_file(name):
+            polled.set()
+            return fake_file("PROCESSING")
+        uploader = GeminiFileUploader(upload_fn=lambda path, display_name: fake_file("PROCESSING"), get_fn=get_file)
+        with patch("src.gemini_files.Config.GEMINI_POLL_INITIAL_DELAY", 1.0), \
+             patch("src.gemini_files.Config.GEMINI_POLL_MAX_DELAY", 1.0):
+            job = uploader.submit("rx.pdf")
+            polled.wait(timeout=5)
+            job.cancel()
+            with self.assertRaises(Exception):
+                job.result(timeout=5)
+
+if __name__ == '__main__':
+    unittest.main()
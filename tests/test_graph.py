@@ -0,0 +1,138 @@
+import sys
+import os
+import threading
+
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from src.answer_cache import SemanticAnswerCache
+from src.graph import RAGGraph, stream_answer
+
+import unittest
+
+def make_graph(reply=None):
+    """Build a RAGGraph on mocked vector store and memory, with the LLM (a fake answering reply) patched in."""
+    vector_store = MagicMock()
+    vector_store.get_cached_chunks.return_value = None
+    vector_store.embeddings = None
+    memory = MagicMock()
+    memory.get_context_chunks.return_value = None
+    memory.get_history.return_value = []
+    memory.get_session_context.return_value = {}
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content=reply)])) if reply else MagicMock()
+    with patch('src.graph.ChatGoogleGenerativeAI', return_value=llm), \
+         patch('src.graph.get_answer_cache', return_value=SemanticAnswerCache()), \
+         patch('src.graph.ConversationSummarizer'):
+        return RAGGraph(vector_store=vector_store, memory=memory)
+
+class TestRetrieve(unittest.TestCase):
+
+    def test_small_prescription_skips_vector_search(self):
+        graph = make_graph()
+        graph.memory.get_context_chunks.return_value = ["Date: today\n\nMedicines:\n- Dolo 650"]
+
+        result = graph.retrieve({"question": "what is this for?", "prescription_id": "rx1", "session_id": "s1"})
+
+        self.assertEqual(result["context"], ["Date: today\n\nMedicines:\n- Dolo 650"])
+        graph.vector_store.search.assert_not_called()
+        graph.vector_store.cache_chunks.assert_called_once_with("rx1", result["context"])
+
+    @patch('src.graph.Config.DIRECT_CONTEXT_MAX_CHUNKS', 1)
+    def test_large_prescription_falls_back_to_vector_search(self):
+        graph = make_graph()
+        graph.vector_store.get_cached_chunks.return_value = ["a", "b"]
+        graph.vector_store.search.return_value = [MagicMock(metadata={"text": "b"})]
+
+        result = graph.retrieve({"question": "q", "prescription_id": "rx1", "session_id": "s1"})
+
+        self.assertEqual(result["context"], ["b"])
+        graph.vector_store.search.assert_called_once_with("q", prescription_id="rx1")
+
+    def test_unknown_prescription_uses_vector_search(self):
+        graph = make_graph()
+        graph.vector_store.search.return_value = []
+
+        self.assertEqual(graph.retrieve({"question": "q", "prescription_id": "rx9", "session_id": "s9"})["context"], [])
+        graph.vector_store.search.assert_called_once()
+
+class TestStreaming(unittest.TestCase):
+
+    def test_stream_answer_yields_tokens_and_persists_at_end(self):
+        graph = make_graph("Take one tablet after food")
+        graph.memory.get_context_chunks.return_value = ["Dolo 650 after food"]
+        graph.memory.get_history.return_value = []
+        app = graph.build_graph()
+
+        tokens = list(stream_answer(app, {
+            "question": "when?", "prescription_id": "rx1", "session_id": "s1", "context": [], "answer": ""
+        }))
+
+        self.assertGreater(len(tokens), 1)
+        self.assertEqual("".join(tokens), "Take one tablet after food")
+        graph.memory.add_message.assert_any_call("s1", "ai", "Take one tablet after food")
+
+    def test_repeated_question_is_served_from_answer_cache(self):
+        graph = make_graph("For fever")
+        graph.memory.get_context_chunks.return_value = ["Dolo 650 after food"]
+        graph.memory.get_history.return_value = []
+        app = graph.build_graph()
+        inputs = {"question": "What is this for?", "prescription_id": "rx1", "session_id": "s1", "context": [], "answer": ""}
+
+        first = "".join(stream_answer(app, inputs))
+        second = "".join(stream_answer(app, dict(inputs, question="what is this for")))
+
+        self.assertEqual(first, second)
+        self.assertEqual(graph.answer_cache.stats()["hits"], 1)
+        self.assertEqual(graph.memory.add_message.call_count, 4)
+
+class TestParallelBranches(unittest.TestCase):
+
+    def test_retrieve_history_and_session_run_concurrently(self):
+        graph = make_graph("ok")
+        barrier = threading.Barrier(3, timeout=5)
+
+        def arrive(value):
+            def wait(*args, **kwargs):
+                barrier.wait()
+                return value
+            return wait
+
+        graph.vector_store.get_cached_chunks.side_effect = arrive(["Dolo 650"])
+        graph.memory.get_history.side_effect = arrive([{"role": "user", "content": "hi"}])
+        graph.memory.get_session_context.side_effect = arrive({"details": "- Dolo 650", "summary": ""})
+
+        result = graph.build_graph().invoke(
+            {"question": "q", "prescription_id": "rx1", "session_id": "s1", "context": [], "answer": ""}
+        )
+
+        self.assertEqual(result["answer"], "ok")
+        self.assertEqual(result["context"], ["Dolo 650"])
+        self.assertEqual(result["details"], "- Dolo 650")
+        self.assertEqual(len(result["history"]), 1)
+
+    def test_old_turns_are_sent_to_summarizer(self):
+        from datetime import datetime, timedelta
+        with patch('src.prompt_builder.Config.PROMPT_HISTORY_MESSAGES', 2):
+            graph = make_graph("ok")
+        start = datetime(2026, 1, 1)
+        history = [
+            {"role": "user" if i % 2 == 0 else "ai", "content": f"message {i}", "timestamp": start + timedelta(minutes=i)}
+            for i in range(6)
+        ]
+        graph.memory.get_history.return_value = history
+        graph.memory.get_session_context.return_value = {
+            "details": "", "summary": "Asked about Dolo.", "summarized_until": start + timedelta(minutes=1)
+        }
+
+        graph.build_graph().invoke({"question": "q", "prescription_id": None, "session_id": "s1", "context": [], "answer": ""})
+
+        session_id, summary, folded = graph.summarizer.submit.call_args[0]
+        self.assertEqual((session_id, summary), ("s1", "Asked about Dolo."))
+        self.assertEqual([m["content"] for m in folded], ["message 2", "message 3"])
+
+if __name__ == '__main__':
+    unittest.main()
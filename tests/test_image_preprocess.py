@@ -0,0 +1,66 @@
+import sys
+import os
+import io
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.image_preprocess import preprocess_image, preprocess_stats
+
+import unittest
+
+def photo_bytes(width, height, orientation=None):
+    """Noisy JPEG, roughly like a phone photo of paper."""
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(120, 255, size=(height, width, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    image = Image.fromarray(pixels)
+    if orientation:
+        exif = image.getexif()
+        exif[0x0112] = orientation
+        image.save(buffer, format="JPEG", quality=95, exif=exif)
+    else:
+        image.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+class TestImagePreprocess(unittest.TestCase):
+
+    def test_large_photo_downscaled_and_smaller(self):
+        original = photo_bytes(3000, 2000)
+        prepared = preprocess_image(original, max_edge=1024)
+        self.assertEqual(prepared.size, (1024, 683))
+        self.assertEqual(prepared.mime_type, "image/jpeg")
+        self.assertGreater(prepared.bytes_saved, 0)
+        self.assertEqual(Image.open(io.BytesIO(prepared.data)).mode, "L")
+
+    def test_exif_orientation_applied(self):
+        prepared = preprocess_image(photo_bytes(400, 200, orientation=6), max_edge=1024)
+        self.assertEqual(prepared.size, (200, 400))
+
+    def test_webp_and_path_input(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rx.jpg")
+            with open(path, "wb") as f:
+                f.write(photo_bytes(1200, 800))
+            prepared = preprocess_image(path, max_edge=600, image_format="webp", grayscale=False)
+        self.assertEqual(prepared.as_blob()["mime_type"], "image/webp")
+        self.assertEqual(Image.open(io.BytesIO(prepared.data)).size, (600, 400))
+
+    def test_small_file_kept_when_reencoding_is_bigger(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (20, 20), "white").save(buffer, format="PNG")
+        prepared = preprocess_image(buffer.getvalue())
+        self.assertEqual(prepared.data, buffer.getvalue())
+        self.assertEqual(prepared.mime_type, "image/png")
+
+    def test_stats_accumulate(self):
+        before = preprocess_stats()["images"]
+        preprocess_image(photo_bytes(100, 100))
+        self.assertEqual(preprocess_stats()["images"], before + 1)
+
+if __name__ == '__main__':
+    unittest.main()
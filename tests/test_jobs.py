@@ -0,0 +1,182 @@
+import sys
+import os
+import threading
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pymongo.errors import DuplicateKeyError
+from unittest.mock import patch
+
+from src.jobs import JobQueue, DONE, FAILED, RUNNING
+
+import unittest
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+        elif "$in" in condition and value not in condition["$in"]:
+            return False
+        elif "$ne" in condition and value == condition["$ne"]:
+            return False
+        elif "$lt" in condition and not (value is not None and value < condition["$lt"]):
+            return False
+    return True
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the job queue."""
+    def __init__(self):
+        self.docs = {}
+        self.indexes = []
+        self.lock = threading.Lock()
+
+    def create_index(self, keys, name=None):
+        self.indexes.append(name)
+
+    def replace_one(self, query, doc, upsert=False):
+        with self.lock:
+            existing = self.docs.get(query["_id"])
+            if existing is not None and not matches(existing, query):
+                raise DuplicateKeyError("duplicate _id")
+            self.docs[query["_id"]] = dict(doc)
+
+    def find_one(self, query):
+        with self.lock:
+            doc = next((doc for doc in self.docs.values() if matches(doc, query)), None)
+            return dict(doc) if doc else None
+
+    def update_many(self, query, update):
+        with self.lock:
+            for doc in self.docs.values():
+                if matches(doc, query):
+                    doc.update(update["$set"])
+
+    def find_one_and_update(self, query, update, return_document=None):
+        with self.lock:
+            for doc in self.docs.values():
+                if matches(doc, query):
+                    doc.update(update["$set"])
+                    return dict(doc)
+        return None
+
+def job_doc(job_id, owner, heartbeat_at, status=RUNNING, dedup_key=None):
+    return {
+        "_id": job_id, "kind": "upload", "payload": {}, "dedup_key": dedup_key, "status": status,
+        "stage": "extracting", "result": {}, "error": None, "owner": owner,
+        "created_at": heartbeat_at, "updated_at": heartbeat_at, "heartbeat_at": heartbeat_at,
+    }
+
+def wait_for(queue, job_id, status):
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job and job["status"] == status:
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job_id} never reached {status}")
+
+class TestJobQueue(unittest.TestCase):
+
+    def test_job_runs_and_records_partial_results(self):
+        collection = FakeCollection()
+        queue = JobQueue(collection, max_workers=2)
+        seen = []
+
+        def handler(job, update):
+            update(stage="extracting")
+            update(stage="indexing", extraction={"medicines": [{"name": "Dolo 650"}]})
+            seen.append(collection.docs[job["_id"]]["result"])
+
+        queue.register("upload", handler)
+        job = wait_for(queue, queue.submit("upload", {"file_path": "rx.pdf"}), DONE)
+
+        self.assertEqual(job["result"]["extraction"]["medicines"][0]["name"], "Dolo 650")
+        self.assertEqual(seen[0]["extraction"]["medicines"][0]["name"], "Dolo 650")
+        self.assertEqual(collection.docs[job["_id"]]["status"], DONE)
+        self.assertEqual(collection.indexes, ["status_heartbeat", "dedup_status"])
+
+    def test_failed_job_keeps_error(self):
+        queue = JobQueue(FakeCollection(), max_workers=1)
+
+        def handler(job, update):
+            raise RuntimeError("Failed to process prescription")
+
+        queue.register("upload", handler)
+        job = wait_for(queue, queue.submit("upload", {}), FAILED)
+        self.assertEqual(job["error"], "Failed to process prescription")
+
+    def test_duplicate_submission_reuses_running_job(self):
+        queue = JobQueue(max_workers=1)
+        release = threading.Event()
+        queue.register("upload", lambda job, update: release.wait(5))
+
+        first = queue.submit("upload", {}, dedup_key="user:abc")
+        second = queue.submit("upload", {}, dedup_key="user:abc")
+        release.set()
+        self.assertEqual(first, second)
+        wait_for(queue, first, DONE)
+
+    def test_duplicate_submission_from_another_process(self):
+        collection = FakeCollection()
+        release = threading.Event()
+        first_process = JobQueue(collection, max_workers=1)
+        second_process = JobQueue(collection, max_workers=1)
+        for queue in (first_process, second_process):
+            queue.register("upload", lambda job, update: release.wait(5))
+
+        first = first_process.submit("upload", {}, dedup_key="user:abc")
+        second = second_process.submit("upload", {}, dedup_key="user:abc")
+        release.set()
+        self.assertEqual(first, second)
+        self.assertEqual(len(collection.docs), 1)
+        self.assertEqual(wait_for(second_process, first, DONE)["_id"], first)
+
+    def test_jobs_without_heartbeat_are_resumed(self):
+        collection = FakeCollection()
+        now = datetime.utcnow()
+        # Cut off by a restart two minutes ago: well within any "old job" window, but no heartbeat since
+        collection.docs["old"] = job_doc("old", "dead-process", now - timedelta(minutes=2))
+        collection.docs["live"] = job_doc("live", "live-process", now)
+
+        queue = JobQueue(collection, max_workers=1)
+        queue.register("upload", lambda job, update: update(prescription_id="p1"))
+
+        self.assertEqual(queue.resume_pending(), 1)
+        job = wait_for(queue, "old", DONE)
+        self.assertEqual(job["owner"], queue.owner)
+        self.assertEqual(job["result"]["prescription_id"], "p1")
+        self.assertEqual(collection.docs["live"]["status"], RUNNING)
+
+    def test_started_queue_heartbeats_and_sweeps_periodically(self):
+        collection = FakeCollection()
+        release = threading.Event()
+        queue = JobQueue(collection, max_workers=2)
+        queue.register("upload", lambda job, update: release.wait(5))
+        self.addCleanup(queue.stop)
+        self.addCleanup(release.set)
+
+        with patch("src.jobs.Config.JOB_HEARTBEAT_INTERVAL", 0.05):
+            running = queue.submit("upload", {})
+            collection.docs[running]["heartbeat_at"] = datetime.utcnow() - timedelta(hours=1)
+            queue.start()
+            # A job orphaned after start-up is still picked up by a later sweep
+            threading.Event().wait(0.1)
+            collection.docs["orphan"] = job_doc("orphan", "dead-process", datetime.utcnow() - timedelta(hours=1))
+            wait_for(queue, "orphan", RUNNING)
+
+        self.assertGreater(collection.docs[running]["heartbeat_at"], datetime.utcnow() - timedelta(minutes=1))
+        self.assertEqual(collection.docs[running]["owner"], queue.owner)
+
+    def test_claimed_job_is_not_overwritten_by_old_owner(self):
+        collection = FakeCollection()
+        collection.docs["j1"] = job_doc("j1", "new-owner", datetime.utcnow())
+        queue = JobQueue(collection, max_workers=1)
+        queue._save(job_doc("j1", queue.owner, datetime.utcnow(), status=FAILED))
+        self.assertEqual(collection.docs["j1"]["owner"], "new-owner")
+        self.assertEqual(collection.docs["j1"]["status"], RUNNING)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.json_response import JSONResponseError, find_json, parse_json_response, validate
+
+import unittest
+
+VERDICT = {"type": "object", "required": ["is_otc"], "properties": {"is_otc": {"type": "boolean"}}}
+
+class TestJSONResponse(unittest.TestCase):
+
+    def test_native_json_parsed_directly(self):
+        self.assertEqual(parse_json_response('{"is_otc": true}', VERDICT), {"is_otc": True})
+
+    def test_first_balanced_value_found_in_prose_and_fences(self):
+        text = 'Sure!\n```json\n{"a": "x } y", "b": [1, 2]}\n```\nAlso {"c": 1}'
+        self.assertEqual(find_json(text), '{"a": "x } y", "b": [1, 2]}')
+        self.assertEqual(parse_json_response("Result: [1, [2, 3]] done"), [1, [2, 3]])
+
+    def test_common_defects_repaired(self):
+        self.assertEqual(parse_json_response('{"a": 1, "b": [1, 2,],}'), {"a": 1, "b": [1, 2]})
+        self.assertEqual(
+            parse_json_response("{'is_otc': False, 'matched_candidate': None, 'reason': 'It's a \"combo\"'}"),
+            {"is_otc": False, "matched_candidate": None, "reason": 'It\'s a "combo"'}
+        )
+
+    def test_truncated_response_closed(self):
+        value = parse_json_response('{"medicines": [{"name": "Dolo 650", "quantity": "1 tab"')
+        self.assertEqual(value, {"medicines": [{"name": "Dolo 650", "quantity": "1 tab"}]})
+
+    def test_schema_validation(self):
+        self.assertEqual(validate({"is_otc": "yes"}, VERDICT), ["$.is_otc: expected boolean, got str"])
+        self.assertEqual(validate({}, VERDICT), ["$: missing 'is_otc'"])
+        with self.assertRaises(JSONResponseError):
+            parse_json_response('{"reason": "no verdict"}', VERDICT)
+
+    def test_no_json(self):
+        with self.assertRaises(JSONResponseError):
+            parse_json_response("I cannot help with that.")
+
+if __name__ == '__main__':
+    unittest.main()
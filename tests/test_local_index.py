@@ -0,0 +1,155 @@
+import sys
+import os
+import json
+import tempfile
+
+from unittest.mock import patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vector_backends import LocalVectorIndex
+
+import unittest
+
+class TestLocalVectorIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = LocalVectorIndex(dimension=3)
+        self.index.upsert([
+            ("rx1_0", [1.0, 0.0, 0.0], {"prescription_id": "rx1", "text": "one"}),
+            ("rx2_0", [0.9, 0.1, 0.0], {"prescription_id": "rx2", "text": "two"}),
+            ("rx3_0", [0.0, 1.0, 0.0], {"prescription_id": "rx3", "text": "three"}),
+        ])
+
+    def test_cosine_top_k(self):
+        matches = self.index.query([2.0, 0.0, 0.0], top_k=2).matches
+        self.assertEqual([m.id for m in matches], ["rx1_0", "rx2_0"])
+        self.assertAlmostEqual(matches[0].score, 1.0, places=5)
+        self.assertEqual(matches[0].metadata["text"], "one")
+
+    def test_metadata_filter(self):
+        matches = self.index.query(
+            [1.0, 0.0, 0.0], top_k=5, filter={"prescription_id": {"$eq": "rx3"}}
+        ).matches
+        self.assertEqual([m.id for m in matches], ["rx3_0"])
+
+    def test_namespaces_are_isolated(self):
+        self.index.upsert([("otc_a", [0.0, 0.0, 1.0], {"text": "a"})], namespace="otc")
+        self.assertEqual([m.id for m in self.index.query([1, 0, 0], namespace="otc").matches], ["otc_a"])
+        stats = self.index.describe_index_stats()
+        self.assertEqual(stats.namespaces["otc"].vector_count, 1)
+        self.assertEqual(stats.namespaces[""].vector_count, 3)
+
+    def test_upsert_replaces_and_delete_removes(self):
+        self.index.upsert([("rx1_0", [0.0, 0.0, 1.0], {"prescription_id": "rx1", "text": "new"})])
+        self.assertEqual(self.index.query([0, 0, 1], top_k=1).matches[0].metadata["text"], "new")
+        self.index.delete(ids=["rx1_0"])
+        self.assertNotIn("rx1_0", [m.id for m in self.index.query([0, 0, 1], top_k=5).matches])
+
+    def test_save_and_memory_mapped_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stored = LocalVectorIndex(dimension=3, path=tmp)
+            stored.upsert([("a", [1.0, 0.0, 0.0], {"text": "a"})], namespace="otc_medicines")
+
+            loaded = LocalVectorIndex(dimension=3, path=tmp)
+            matches = loaded.query([1.0, 0.0, 0.0], namespace="otc_medicines").matches
+            self.assertEqual([m.id for m in matches], ["a"])
+            self.assertEqual(loaded.describe_index_stats().namespaces["otc_medicines"].vector_count, 1)
+
+            loaded.upsert([("b", [0.0, 1.0, 0.0], {"text": "b"})], namespace="otc_medicines")
+            self.assertEqual(LocalVectorIndex(dimension=3, path=tmp).describe_index_stats().total_vector_count, 2)
+
+    def test_batches_are_appended_as_segments(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stored = LocalVectorIndex(dimension=3, path=tmp)
+            stored.upsert([("a", [1.0, 0.0, 0.0], {"text": "a"})])
+            first_files = set(os.listdir(tmp))
+            first_bytes = {name: open(os.path.join(tmp, name), "rb").read()
+                           for name in first_files if name.endswith(".npy")}
+            stored.upsert([("b", [0.0, 1.0, 0.0], {"text": "b"})])
+            stored.upsert([("a", [0.0, 0.0, 1.0], {"text": "a2"})])
+
+            # Earlier segments are never rewritten
+            for name, data in first_bytes.items():
+                with open(os.path.join(tmp, name), "rb") as f:
+                    self.assertEqual(f.read(), data)
+            with open(os.path.join(tmp, "index.json")) as f:
+                self.assertEqual(len(json.load(f)["namespaces"][""]), 3)
+
+            loaded = LocalVectorIndex(dimension=3, path=tmp)
+            self.assertEqual(loaded.describe_index_stats().total_vector_count, 2)
+            self.assertEqual(loaded.query([0.0, 0.0, 1.0], top_k=1).matches[0].metadata["text"], "a2")
+
+    def test_processes_sharing_a_directory_keep_each_others_writes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first = LocalVectorIndex(dimension=3, path=tmp)
+            second = LocalVectorIndex(dimension=3, path=tmp)
+            first.upsert([("a", [1.0, 0.0, 0.0], {})])
+            second.upsert([("b", [0.0, 1.0, 0.0], {})])
+            second.delete(ids=["a"])
+
+            ids = [m.id for m in LocalVectorIndex(dimension=3, path=tmp).query([1.0, 1.0, 0.0], top_k=5).matches]
+            self.assertEqual(ids, ["b"])
+
+    def test_segments_compacted_on_open(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            stored = LocalVectorIndex(dimension=3, path=tmp)
+            for i in range(4):
+                stored.upsert([(str(i), [1.0, float(i), 0.0], {})])
+            stored.delete(ids=["0"])
+
+            with patch("src.vector_backends.Config.LOCAL_INDEX_MAX_SEGMENTS", 2):
+                compacted = LocalVectorIndex(dimension=3, path=tmp)
+            self.assertEqual(len([name for name in os.listdir(tmp) if name.endswith(".scales.npy")]), 1)
+            self.assertEqual(sorted(compacted.describe_index_stats().namespaces[""].__dict__.values()), [3])
+            self.assertFalse(compacted._namespaces[""].vectors.flags.writeable)  # memory-mapped
+            self.assertEqual(LocalVectorIndex(dimension=3, path=tmp).describe_index_stats().total_vector_count, 3)
+
+class TestQuantizedLocalIndex(unittest.TestCase):
+
+    def test_int8_truncated_matches_full_precision_ranking(self):
+        import numpy as np
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 64)).astype(np.float32)
+        full = LocalVectorIndex(dimension=64)
+        small = LocalVectorIndex(dimension=64, quantization="int8", truncate_dim=32)
+        for index in (full, small):
+            index.upsert([(str(i), v, {}) for i, v in enumerate(vectors)])
+
+        self.assertEqual(small.memory_bytes(), 50 * (32 + 4))
+        self.assertEqual(small.query(vectors[7], top_k=1).matches[0].id, full.query(vectors[7], top_k=1).matches[0].id)
+        self.assertAlmostEqual(small.query(vectors[7], top_k=1).matches[0].score, 1.0, places=2)
+
+    def test_layout_change_reencodes_stored_vectors(self):
+        import numpy as np
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(20, 16)).astype(np.float32)
+        with tempfile.TemporaryDirectory() as tmp:
+            full = LocalVectorIndex(dimension=16, path=tmp)
+            full.upsert([(str(i), v, {"i": i}) for i, v in enumerate(vectors)], namespace="user_prescriptions")
+
+            small = LocalVectorIndex(dimension=16, path=tmp, quantization="int8", truncate_dim=8)
+            self.assertEqual(small.describe_index_stats().total_vector_count, 20)
+            self.assertNotEqual(small.backend_id, full.backend_id)
+            top = small.query(vectors[3], top_k=1, namespace="user_prescriptions").matches[0]
+            self.assertEqual((top.id, top.metadata), ("3", {"i": 3}))
+
+            # The migration is on disk, and new batches extend it
+            small.upsert([("new", vectors[0], {})], namespace="user_prescriptions")
+            reloaded = LocalVectorIndex(dimension=16, path=tmp, quantization="int8", truncate_dim=8)
+            self.assertEqual(reloaded.describe_index_stats().total_vector_count, 21)
+            self.assertEqual(reloaded._namespaces["user_prescriptions"].vectors.dtype, np.int8)
+
+    def test_layout_that_cannot_be_reencoded_refuses_to_start(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            LocalVectorIndex(dimension=4, path=tmp, truncate_dim=2).upsert([("a", [1.0, 0.0, 0.0, 0.0], {})])
+            files = sorted(os.listdir(tmp))
+
+            with self.assertRaises(RuntimeError):
+                LocalVectorIndex(dimension=4, path=tmp)
+            self.assertEqual(sorted(os.listdir(tmp)), files)
+            self.assertEqual(LocalVectorIndex(dimension=4, path=tmp, truncate_dim=2).describe_index_stats().total_vector_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
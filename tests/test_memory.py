@@ -0,0 +1,55 @@
+import sys
+import os
+
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.memory import MemoryManager
+
+import unittest
+
+def make_memory(docs_newest_first):
+    """MemoryManager whose messages.find(...).sort(...).limit(n) returns the first n docs."""
+    client = MagicMock()
+    cursor = MagicMock()
+    client.get_database.return_value.messages.find.return_value = cursor
+    cursor.sort.return_value = cursor
+    cursor.limit.side_effect = lambda n: iter(docs_newest_first[:n])
+    with patch('src.memory.get_mongo_client', return_value=client), \
+         patch.object(MemoryManager, '_indexes_ready', False):
+        return MemoryManager()
+
+def docs(n):
+    return [{"_id": i, "timestamp": i, "content": f"m{i}"} for i in range(n - 1, -1, -1)]
+
+class TestHistory(unittest.TestCase):
+
+    def test_get_history_returns_latest_messages_oldest_first(self):
+        memory = make_memory(docs(10))
+
+        history = memory.get_history("s1", limit=3)
+
+        self.assertEqual([m["content"] for m in history], ["m7", "m8", "m9"])
+        memory.messages.find.return_value.sort.assert_called_once_with([("timestamp", -1), ("_id", -1)])
+
+    def test_history_pages_walk_backwards(self):
+        memory = make_memory(docs(5))
+
+        page, cursor = memory.get_history_page("s1", page_size=2)
+        self.assertEqual([m["content"] for m in page], ["m3", "m4"])
+        self.assertEqual(cursor, {"timestamp": 3, "_id": 3})
+
+        memory.get_history_page("s1", before=cursor, page_size=2)
+        query = memory.messages.find.call_args[0][0]
+        self.assertEqual(query["$or"][0], {"timestamp": {"$lt": 3}})
+
+    def test_last_page_has_no_cursor(self):
+        memory = make_memory(docs(2))
+        page, cursor = memory.get_history_page("s1", page_size=5)
+        self.assertEqual(len(page), 2)
+        self.assertIsNone(cursor)
+
+if __name__ == '__main__':
+    unittest.main()
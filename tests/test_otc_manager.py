@@ -0,0 +1,161 @@
+import sys
+import os
+import tempfile
+
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import bootstrap
+from src.embedding_cache import EmbeddingCache
+from src.otc_manager import OTCManager
+from src.otc_matcher import verdict_key
+from src.vector_backends import LocalVectorIndex
+from src.vector_store import VectorStoreManager
+
+import unittest
+
+def make_vector_store():
+    """A VectorStoreManager on an in-process index, with a fake Gemini embeddings client."""
+    client = MagicMock()
+    client.embed_documents.side_effect = lambda texts: [[float(len(t)), 1.0, 0.5] for t in texts]
+    with patch('src.vector_store.Config.GOOGLE_API_KEY', 'test-key'), \
+         patch('src.vector_store.Config.LOCAL_NAMESPACES', []), \
+         patch('src.vector_store.GoogleGenerativeAIEmbeddings', return_value=client), \
+         patch('src.vector_store.get_embedding_cache', return_value=EmbeddingCache()):
+        return VectorStoreManager(backend=LocalVectorIndex(dimension=3))
+
+def make_otc_manager(store, otc_list):
+    """An OTCManager over store and otc_list, with the LLM patched and verdicts kept in memory."""
+    manager_class = type("TestOTCManager", (OTCManager,), {"OTC_LIST": otc_list})
+    with patch('src.otc_manager.ChatGoogleGenerativeAI'), patch('src.otc_manager.Config.MONGO_URI', None):
+        return manager_class(vector_store=store)
+
+class ManifestTestCase(unittest.TestCase):
+    """Keeps the index manifest and the run-once registry private to each test."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch('src.bootstrap.Config.INDEX_MANIFEST_PATH', os.path.join(self.tmp.name, "manifest.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(bootstrap.forget)
+        bootstrap.forget()
+
+class TestOTCBootstrap(ManifestTestCase):
+
+    def test_unchanged_list_skips_ingestion(self):
+        store = make_vector_store()
+        otc_list = [{"medicine_name": "Gelusil", "metadata": {"type": "Antacid"}}]
+        make_otc_manager(store, otc_list)
+        self.assertEqual(store.embeddings.embeddings.embed_documents.call_count, 1)
+
+        bootstrap.forget()  # simulate a new process reading the manifest
+        with patch.object(store, 'add_texts', wraps=store.add_texts) as add_texts:
+            make_otc_manager(store, otc_list)
+        add_texts.assert_not_called()
+        self.assertEqual(store.embeddings.embeddings.embed_documents.call_count, 1)
+
+    def test_changed_list_is_ingested_incrementally(self):
+        store = make_vector_store()
+        make_otc_manager(store, [
+            {"medicine_name": "Gelusil", "metadata": {"type": "Antacid"}},
+            {"medicine_name": "Digene", "metadata": {"type": "Antacid"}},
+        ])
+
+        bootstrap.forget()
+        make_otc_manager(store, [
+            {"medicine_name": "Gelusil", "metadata": {"type": "Antacid"}},
+            {"medicine_name": "Hajmola", "metadata": {"type": "Digestive"}},
+        ])
+
+        store.embeddings.embeddings.embed_documents.assert_called_with(["Hajmola"])
+        texts = {m.metadata["text"] for m in store.index.query([1.0, 1.0, 1.0], top_k=10, namespace="otc_medicines").matches}
+        self.assertEqual(texts, {"Gelusil", "Hajmola"})
+
+class TestOTCCheckRouting(ManifestTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.manager = make_otc_manager(MagicMock(), [
+            {"medicine_name": "Paracetamol (Dolo 650, Crocin)", "metadata": {}},
+            {"medicine_name": "Aspirin (325mg)", "metadata": {}},
+        ])
+        self.manager.vector_store.search.return_value = []
+
+    def test_clear_matches_skip_vector_search_and_llm(self):
+        results = self.manager.check_medicines_with_llm([
+            "- Crocin (Qty: 10 tablets): Morning: Yes, Freq: 1-0-1",
+            "Dolo 650",
+        ])
+        self.assertEqual([m["name"] for m in results["otc_medicines"]], ["Crocin", "Dolo 650"])
+        self.manager.vector_store.search.assert_not_called()
+        self.manager.llm.invoke.assert_not_called()
+        self.assertEqual(self.manager.get_path_stats(), {"local_match": 2})
+
+    def test_strength_mismatch_goes_to_llm(self):
+        self.manager.llm.invoke.return_value = MagicMock(
+            content='{"is_otc": false, "matched_candidate": null, "reason": "Low-dose aspirin"}'
+        )
+        results = self.manager.check_medicines_with_llm(["Aspirin 75mg"])
+        self.assertEqual(results["consult_medicines"][0]["reason"], "Low-dose aspirin")
+        self.assertIn("Aspirin (325mg)", self.manager.llm.invoke.call_args[0][0])
+        self.assertEqual(self.manager.get_path_stats(), {"llm": 1})
+
+    def test_unknown_medicine_without_candidates_is_not_sent_to_llm(self):
+        results = self.manager.check_medicines_with_llm(["Amoxicillin 500mg"])
+        self.assertEqual(len(results["consult_medicines"]), 1)
+        self.manager.llm.invoke.assert_not_called()
+
+    def test_ambiguous_medicines_verified_in_one_batch(self):
+        self.manager.llm.invoke.return_value = MagicMock(content='''```json
+        [{"item": 1, "is_otc": false, "matched_candidate": null, "reason": "Low-dose aspirin"},
+         {"item": 2, "is_otc": false, "matched_candidate": null, "reason": "Contains tramadol"}]
+        ```''')
+        results = self.manager.check_medicines_with_llm(["Aspirin 75mg", "Crocin", "Paracetamol + Tramadol"])
+        self.assertEqual(self.manager.llm.invoke.call_count, 1)
+        self.assertEqual([m["reason"] for m in results["consult_medicines"]], ["Low-dose aspirin", "Contains tramadol"])
+        self.assertEqual([m["name"] for m in results["otc_medicines"]], ["Crocin"])
+
+    def test_malformed_batch_items_fall_back_to_single_calls(self):
+        self.manager.llm.invoke.side_effect = [
+            MagicMock(content='[{"item": 1, "is_otc": false, "reason": "Low-dose aspirin"}, {"item": 2}]'),
+            MagicMock(content='{"is_otc": false, "matched_candidate": null, "reason": "Contains tramadol"}'),
+        ]
+        results = self.manager.check_medicines_with_llm(["Aspirin 75mg", "Paracetamol + Tramadol"])
+        self.assertEqual(self.manager.llm.invoke.call_count, 2)
+        self.assertIn("Paracetamol + Tramadol", self.manager.llm.invoke.call_args[0][0])
+        self.assertEqual([m["reason"] for m in results["consult_medicines"]], ["Low-dose aspirin", "Contains tramadol"])
+
+    def test_details_lines_split_into_medicines(self):
+        details = "- Dolo 650 (Qty: 1 tablet): Morning: Yes, Freq: 1-0-1\n- Aspirin 75mg (Qty: 1): Night: Yes"
+        self.assertEqual(OTCManager.split_medicines(details=details), ["Dolo 650", "Aspirin 75mg"])
+        self.assertEqual(OTCManager.split_medicines(medicines=[{"name": "Crocin"}, {"name": "-"}]), ["Crocin"])
+
+    def test_prescription_verdicts_memoized_per_drug(self):
+        self.manager.llm.invoke.return_value = MagicMock(
+            content='{"is_otc": false, "matched_candidate": null, "reason": "Low-dose aspirin"}'
+        )
+        first = self.manager.check_prescription(medicines=[{"name": "Aspirin 75mg"}, {"name": "Crocin"}])
+        second = self.manager.check_prescription(medicines=[{"name": "ASPIRIN 75 mg"}, {"name": "Dolo 650"}])
+
+        self.assertEqual(self.manager.llm.invoke.call_count, 1)
+        self.assertEqual(first["consult_medicines"], [{"name": "Aspirin 75mg", "reason": "Low-dose aspirin"}])
+        self.assertEqual(second["consult_medicines"], [{"name": "ASPIRIN 75 mg", "reason": "Low-dose aspirin"}])
+        self.assertEqual(self.manager.get_path_stats()["cache_hit"], 1)
+
+    def test_verdicts_not_shared_across_dosage_forms(self):
+        self.assertNotEqual(verdict_key("Diclofenac 75mg inj"), verdict_key("Diclofenac 75mg tab"))
+        self.assertEqual(verdict_key("Dolo 650"), verdict_key("DOLO-650"))
+        self.manager.llm.invoke.return_value = MagicMock(
+            content='{"is_otc": false, "matched_candidate": null, "reason": "Injection"}'
+        )
+        self.manager.check_prescription(medicines=[{"name": "Aspirin 75mg inj"}])
+        self.manager.check_prescription(medicines=[{"name": "Aspirin 75mg tab"}])
+        self.assertEqual(self.manager.llm.invoke.call_count, 2)
+        self.assertEqual(self.manager.get_path_stats()["cache_hit"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
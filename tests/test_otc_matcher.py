@@ -0,0 +1,70 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.otc_matcher import OTCMatcher, edit_distance, normalize_name, parse_dosage
+
+import unittest
+
+class TestOTCMatcher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.matcher = OTCMatcher()
+
+    def test_aliases_parsed_from_list(self):
+        self.assertEqual(self.matcher.aliases["crocin"], "Paracetamol (Dolo 650, Crocin)")
+        self.assertEqual(self.matcher.aliases["forcan"], "Fluconazole (150mg, e.g., Forcan)")
+        self.assertEqual(self.matcher.aliases["supradyn"], "Centrum, Supradyn")
+        # Strengths and descriptors are not aliases
+        self.assertNotIn("lozenges", self.matcher.aliases)
+        self.assertNotIn("decongestant", self.matcher.aliases)
+
+    def test_normalize_and_dosage(self):
+        self.assertEqual(normalize_name("Tab. Cetirizine 10mg"), "cetirizine")
+        self.assertEqual(parse_dosage("Melatonin (3-5mg)"), (3.0, 5.0, "mg"))
+        self.assertEqual(edit_distance("paracetmol", "paracetamol"), 1)
+
+    def test_brand_and_details_line_match(self):
+        for med in ["Crocin", "Dolo 650", "- Dolo 650 (Qty: 1 tablet): Morning: Yes", "Vitamin C 500mg"]:
+            self.assertEqual(self.matcher.match(med).status, "match", med)
+
+    def test_misspelling_matches(self):
+        result = self.matcher.match("Paracetmol 500mg")
+        self.assertEqual(result.status, "match")
+        self.assertEqual(result.entry, "Paracetamol (Dolo 650, Crocin)")
+
+    def test_dosage_mismatch_is_ambiguous(self):
+        self.assertEqual(self.matcher.match("Melatonin 3mg").status, "match")
+        result = self.matcher.match("Melatonin 10mg")
+        self.assertEqual(result.status, "ambiguous")
+        self.assertEqual(result.candidates, ["Melatonin (3-5mg)"])
+
+    def test_other_dosage_form_is_ambiguous(self):
+        for med in ["Diclofenac injection 75mg", "Inj. Diclofenac", "Diclofenac IV",
+                    "Iron injection", "Vitamin C injection", "Otrivin eye drops"]:
+            result = self.matcher.match(med)
+            self.assertEqual(result.status, "ambiguous", med)
+            self.assertEqual(len(result.candidates), 1, med)
+        for med in ["Iron tablets", "Tab Dolo 650", "Diclofenac SR 100", "Otrivin ear drops"]:
+            self.assertEqual(self.matcher.match(med).status, "match", med)
+
+    def test_low_dose_entry_needs_strength_check(self):
+        for med in ["Isotretinoin 40mg", "Sotret 10mg", "Isotretinoin"]:
+            self.assertEqual(self.matcher.match(med).status, "ambiguous", med)
+        self.assertEqual(self.matcher.match("Low-dose Aspirin 75mg").status, "ambiguous")
+
+    def test_similar_and_combined_names_are_ambiguous(self):
+        self.assertEqual(self.matcher.match("Desloratadine 5mg").status, "ambiguous")
+        result = self.matcher.match("Paracetamol + Tramadol")
+        self.assertEqual(result.status, "ambiguous")
+        self.assertIn("Paracetamol (Dolo 650, Crocin)", result.candidates)
+
+    def test_unknown_and_empty(self):
+        self.assertEqual(self.matcher.match("Amoxicillin 500mg").candidates, [])
+        self.assertEqual(self.matcher.match("- 500mg").status, "miss")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import sys
+import os
+
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.otc_verdict_cache import OTCVerdictCache
+
+import unittest
+
+class FakeCollection:
+    """Just enough of a pymongo collection for the verdict cache."""
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query):
+        return [self.docs[_id] for _id in query["_id"]["$in"] if _id in self.docs]
+
+    def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], {"_id": query["_id"]}).update(update["$set"])
+
+    def delete_many(self, query):
+        stale = [_id for _id, doc in self.docs.items() if doc["list_version"] != query["list_version"]["$ne"]]
+        for _id in stale:
+            del self.docs[_id]
+        return MagicMock(deleted_count=len(stale))
+
+class TestOTCVerdictCache(unittest.TestCase):
+
+    def test_verdicts_shared_through_collection(self):
+        collection = FakeCollection()
+        OTCVerdictCache("v1", collection).put("aspirin|75mg", "consult", "Low-dose aspirin")
+
+        other_process = OTCVerdictCache("v1", collection)
+        self.assertEqual(other_process.get_many(["aspirin|75mg", "crocin"]),
+                         {"aspirin|75mg": ("consult", "Low-dose aspirin")})
+        self.assertEqual(other_process.stats()["shared_hits"], 1)
+        self.assertEqual(other_process.stats()["misses"], 1)
+
+        other_process.get_many(["aspirin|75mg"])
+        self.assertEqual(other_process.stats()["memory_hits"], 1)
+
+    def test_new_list_version_starts_fresh_and_purges(self):
+        collection = FakeCollection()
+        OTCVerdictCache("v1", collection).put("crocin", "otc", "Matched")
+
+        cache = OTCVerdictCache("v2", collection)
+        self.assertEqual(cache.get_many(["crocin"]), {})
+        cache.purge_stale()
+        self.assertEqual(collection.docs, {})
+
+    def test_memory_only_when_collection_fails(self):
+        collection = MagicMock()
+        collection.find.side_effect = Exception("down")
+        collection.update_one.side_effect = Exception("down")
+        cache = OTCVerdictCache("v1", collection, max_size=1)
+
+        cache.put("crocin", "otc", "Matched")
+        self.assertEqual(cache.get_many(["crocin"]), {"crocin": ("otc", "Matched")})
+        cache.put("gelusil", "otc", "Matched")
+        self.assertEqual(cache.get_many(["crocin"]), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import sys
+import os
+import io
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pypdf
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.extractor import PrescriptionExtractor, merge_extractions
+from src.ingestion import IngestionManager
+
+import unittest
+
+def make_pdf(path, page_texts):
+    """PDF with one page per entry; None makes a page without a text layer."""
+    writer = pypdf.PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for text in page_texts:
+        page = writer.add_blank_page(612, 792)
+        if text:
+            stream = DecodedStreamObject()
+            stream.set_data("".join(
+                f"BT /F1 12 Tf 72 {720 - 20 * i} Td ({line}) Tj ET\n" for i, line in enumerate(text.split("\n"))
+            ).encode("latin-1"))
+            page[NameObject("/Contents")] = writer._add_object(stream)
+            page[NameObject("/Resources")] = DictionaryObject({
+                NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+            })
+    with open(path, "wb") as f:
+        writer.write(f)
+
+def med(name, **fields):
+    return dict({"name": name, "quantity": "-", "timing": {"morning": "-", "instruction": "-"},
+                 "frequency": "-", "duration": "-"}, **fields)
+
+class TestPdfPages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "rx.pdf")
+
+    def test_split_keeps_text_layer_and_isolates_scanned_pages(self):
+        make_pdf(self.path, ["Discharge summary for patient Ravi Kumar, ward 3", None])
+        pages = IngestionManager.split_pdf(self.path)
+        self.assertEqual([p["number"] for p in pages], [1, 2])
+        self.assertIn("Discharge summary", pages[0]["text"])
+        self.assertIsNone(pages[0]["pdf"])
+        self.assertEqual(len(pypdf.PdfReader(io.BytesIO(pages[1]["pdf"])).pages), 1)
+
+    def test_merge_deduplicates_medicines(self):
+        merged = merge_extractions([
+            {"date": "-", "medicines": [med("Dolo 650", frequency="1-0-1")], "notes": "Rest"},
+            {"date": "12/03/2024", "medicines": [med("DOLO  650", duration="5 days"), med("Pan 40")],
+             "notes": "-"},
+        ])
+        self.assertEqual(merged["date"], "12/03/2024")
+        self.assertEqual([m["name"] for m in merged["medicines"]], ["Dolo 650", "Pan 40"])
+        self.assertEqual(merged["medicines"][0]["duration"], "5 days")
+        self.assertEqual(merged["medicines"][0]["frequency"], "1-0-1")
+        self.assertEqual(merged["notes"], "Rest")
+
+    def test_merge_keeps_other_dosage_forms(self):
+        merged = merge_extractions([
+            {"date": "-", "medicines": [med("Inj Diclofenac 75mg", frequency="STAT")], "notes": "-"},
+            {"date": "-", "medicines": [med("Diclofenac 75mg tab", frequency="1-0-1")], "notes": "-"},
+        ])
+        self.assertEqual([m["frequency"] for m in merged["medicines"]], ["STAT", "1-0-1"])
+
+    def test_pages_extracted_in_parallel_and_merged(self):
+        make_pdf(self.path, ["Page one with enough text to count as a text layer", None, None])
+        extractor = PrescriptionExtractor.__new__(PrescriptionExtractor)
+        extractor.page_pool = ThreadPoolExecutor(max_workers=3)
+        self.addCleanup(extractor.page_pool.shutdown)
+
+        barrier = threading.Barrier(3, timeout=5)
+        def generate(parts):
+            barrier.wait()  # only passes if all three pages are in flight at once
+            if isinstance(parts[0], str):
+                return {"date": "-", "medicines": [med("Dolo 650")], "notes": "-"}
+            return {"date": "-", "medicines": [med("Pan 40")], "notes": "-"}
+        extractor._generate = MagicMock(side_effect=generate)
+
+        result = extractor._extract(self.path)
+        self.assertEqual([m["name"] for m in result["medicines"]], ["Dolo 650", "Pan 40"])
+        self.assertEqual(extractor._generate.call_count, 3)
+
+    def test_failed_page_fails_whole_extraction(self):
+        make_pdf(self.path, [None, None, None])
+        extractor = PrescriptionExtractor.__new__(PrescriptionExtractor)
+        extractor.page_pool = ThreadPoolExecutor(max_workers=3)
+        self.addCleanup(extractor.page_pool.shutdown)
+        extractor.cache = MagicMock()
+        extractor.cache.get.return_value = None
+        extractor._generate = MagicMock(side_effect=[
+            {"date": "-", "medicines": [med("Dolo 650")], "notes": "-"},
+            RuntimeError("503 Service Unavailable"),
+            {"date": "-", "medicines": [med("Pan 40")], "notes": "-"},
+        ])
+
+        self.assertIsNone(extractor.extract_data(self.path))
+        extractor.cache.put.assert_not_called()
+
+    def test_text_layer_pdf_parsed_without_gemini(self):
+        make_pdf(self.path, ["Date: 12/03/2024\n1. Tab Dolo 650 1-0-1 x 5 days after food\nAdvice: Rest"])
+        extractor = PrescriptionExtractor.__new__(PrescriptionExtractor)
+        extractor._generate = MagicMock()
+        extractor.uploader = MagicMock()
+
+        result = extractor._extract(self.path)
+        self.assertEqual(result["medicines"][0]["name"], "Dolo 650")
+        self.assertEqual(result["date"], "12/03/2024")
+        extractor._generate.assert_not_called()
+        extractor.uploader.submit.assert_not_called()
+
+    def test_low_confidence_text_falls_back_to_gemini(self):
+        make_pdf(self.path, ["Discharge summary, patient stable\nTab Zincovit", "1. Tab Dolo 650 1-0-1 x 5 days after food (Rx)"])
+        extractor = PrescriptionExtractor.__new__(PrescriptionExtractor)
+        extractor.page_pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(extractor.page_pool.shutdown)
+        extractor._generate = MagicMock(return_value={"date": "-", "medicines": [med("Zincovit")], "notes": "-"})
+
+        result = extractor._extract(self.path)
+        self.assertEqual(extractor._generate.call_count, 1)
+        self.assertEqual([m["name"] for m in result["medicines"]], ["Zincovit", "Dolo 650"])
+
+if __name__ == '__main__':
+    unittest.main()
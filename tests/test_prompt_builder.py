@@ -0,0 +1,86 @@
+import sys
+import os
+import threading
+
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.prompt_builder import PromptBuilder, count_tokens
+from src.summarizer import ConversationSummarizer
+
+import unittest
+
+def messages(n, size=20):
+    return [{"role": "user" if i % 2 == 0 else "ai", "content": f"turn {i} " + "word " * size} for i in range(n)]
+
+class TestPromptBuilder(unittest.TestCase):
+
+    def test_prompt_stays_within_budget(self):
+        builder = PromptBuilder(budget=600, max_history_messages=10)
+        context = ["Paracetamol 650mg twice daily after food. " * 60]
+
+        prompt, tokens, to_fold = builder.build("When do I take it?", context, messages(10), summary="Earlier: fever.")
+
+        self.assertLessEqual(tokens, 600)
+        self.assertEqual(tokens, count_tokens(prompt))
+        self.assertIn("When do I take it?", prompt)
+        self.assertIn("Earlier: fever.", prompt)
+
+    def test_newest_history_is_kept_and_older_is_folded(self):
+        builder = PromptBuilder(budget=5000, max_history_messages=4)
+        history = messages(7, size=2)
+
+        prompt, _, to_fold = builder.build("q", ["ctx"], history)
+
+        self.assertIn("turn 6", prompt)
+        self.assertIn("turn 3", prompt)
+        self.assertNotIn("turn 2 ", prompt)
+        self.assertEqual(to_fold, history[:3])
+
+class TestConversationSummarizer(unittest.TestCase):
+
+    def test_summary_is_saved_with_watermark(self):
+        llm = MagicMock()
+        llm.invoke.return_value = MagicMock(content="Patient takes Dolo after food.")
+        memory = MagicMock()
+        summarizer = ConversationSummarizer(llm, memory)
+        folded = [{"role": "user", "content": "when?", "timestamp": 1}, {"role": "ai", "content": "after food", "timestamp": 2}]
+
+        summarizer.submit("s1", "", folded).result(timeout=5)
+
+        memory.update_summary.assert_called_once_with("s1", "Patient takes Dolo after food.", summarized_until=2)
+
+    def test_requests_during_a_run_are_folded_afterwards(self):
+        started = threading.Event()
+        release = threading.Event()
+        prompts = []
+        def invoke(prompt):
+            prompts.append(prompt)
+            started.set()
+            release.wait(5)
+            return MagicMock(content=f"summary {len(prompts)}")
+        llm = MagicMock()
+        llm.invoke.side_effect = invoke
+        memory = MagicMock()
+        summarizer = ConversationSummarizer(llm, memory)
+        first = [{"role": "user", "content": "turn one", "timestamp": 1}]
+        later = first + [{"role": "ai", "content": "turn two", "timestamp": 2},
+                         {"role": "user", "content": "turn three", "timestamp": 3}]
+
+        future = summarizer.submit("s1", "", first)
+        started.wait(5)
+        self.assertIsNone(summarizer.submit("s1", "", first + later[1:2]))
+        self.assertIsNone(summarizer.submit("s1", "", later))
+        release.set()
+
+        self.assertEqual(future.result(timeout=5), "summary 2")
+        self.assertEqual(llm.invoke.call_count, 2)
+        self.assertIn("summary 1", prompts[1])
+        self.assertNotIn("turn one", prompts[1])
+        self.assertIn("turn three", prompts[1])
+        memory.update_summary.assert_called_with("s1", "summary 2", summarized_until=3)
+
+if __name__ == '__main__':
+    unittest.main()
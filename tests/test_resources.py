@@ -0,0 +1,49 @@
+import sys
+import os
+import threading
+import time
+
+from unittest.mock import MagicMock
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.resources import ResourceContainer
+
+import unittest
+
+class TestResourceContainer(unittest.TestCase):
+
+    def test_built_lazily_and_once_across_threads(self):
+        factory = MagicMock(side_effect=lambda: time.sleep(0.05) or object())
+        container = ResourceContainer()
+        container.register("vector_store", factory)
+        self.assertFalse(container.is_built("vector_store"))
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(container.get("vector_store"))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        factory.assert_called_once()
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_reset_rebuilds(self):
+        container = ResourceContainer()
+        container.register("otc_manager", object)
+        first = container.get("otc_manager")
+        container.reset("otc_manager")
+        self.assertIsNot(container.get("otc_manager"), first)
+
+    def test_warm_up_and_unknown_resource(self):
+        container = ResourceContainer()
+        container.register("memory", object)
+        container.warm_up(["memory"]).join(timeout=5)
+        self.assertTrue(container.is_built("memory"))
+        with self.assertRaises(KeyError):
+            container.get("missing")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.rx_parser import parse_medicine_line, parse_prescription_text
+
+import unittest
+
+SAMPLE = """City Clinic
+Dr. A. Rao, MBBS    Date: 12/03/2024
+Rx
+1. Tab Dolo 650 1-0-1 x 5 days after food
+2. Cap. Omez 20mg OD before breakfast for 2 weeks
+3. Syp Ascoril 5 ml TDS x 7 days after meals
+Advice: Drink plenty of fluids
+"""
+
+class TestRxParser(unittest.TestCase):
+
+    def test_common_formats(self):
+        result, confidence = parse_prescription_text(SAMPLE)
+        self.assertEqual(result["date"], "12/03/2024")
+        self.assertEqual(result["notes"], "Drink plenty of fluids")
+        self.assertEqual([m["name"] for m in result["medicines"]], ["Dolo 650", "Omez 20mg", "Ascoril"])
+        self.assertEqual(confidence, 1.0)
+
+        dolo, omez, ascoril = result["medicines"]
+        self.assertEqual(dolo["timing"], {"morning": "Yes", "afternoon": "No", "night": "Yes",
+                                          "instruction": "After meal"})
+        self.assertEqual(dolo["duration"], "5 days")
+        self.assertEqual(omez["frequency"], "1-0-0")
+        self.assertEqual(omez["duration"], "2 weeks")
+        self.assertEqual(ascoril["quantity"], "5 ml")
+        self.assertEqual(ascoril["frequency"], "1-1-1")
+
+    def test_same_schema_as_extractor(self):
+        result, _ = parse_prescription_text(SAMPLE)
+        self.assertEqual(set(result), {"date", "medicines", "notes"})
+        self.assertEqual(set(result["medicines"][0]), {"name", "quantity", "timing", "frequency", "duration"})
+        self.assertEqual(set(result["medicines"][0]["timing"]), {"morning", "afternoon", "night", "instruction"})
+
+    def test_dates_and_plain_text_are_not_medicines(self):
+        self.assertEqual(parse_medicine_line("Date 12-03-2024"), (None, 0.0))
+        self.assertEqual(parse_medicine_line("Patient: Ravi Kumar, 34 M"), (None, 0.0))
+
+    def test_confidence_low_for_incomplete_lines(self):
+        _, confidence = parse_prescription_text("Tab Dolo 650 1-0-1 x 5 days\nTab Zincovit")
+        self.assertLess(confidence, 0.7)
+        self.assertEqual(parse_prescription_text("Discharge summary")[1], 0.0)
+
+    def test_unparsed_medicine_lines_force_gemini(self):
+        text = ("Tab Dolo 650 1-0-1 x 5 days after food\n"
+                "Amoxicillin 500mg three times daily for 7 days\n"
+                "Pantoprazole 40mg once daily before breakfast")
+        result, confidence = parse_prescription_text(text)
+        self.assertEqual(len(result["medicines"]), 1)
+        self.assertEqual(confidence, 0.0)
+
+    def test_unparsed_lines_between_medicines_lower_confidence(self):
+        text = "Tab Dolo 650 1-0-1 x 5 days after food\nZincovit as directed\nTab Omez 1-0-0 x 5 days before food"
+        _, confidence = parse_prescription_text(text)
+        self.assertLess(confidence, 0.7)
+        # A signature after the medicine block does not count
+        _, confidence = parse_prescription_text(text.split("\n")[0] + "\nDr. A. Rao, MBBS")
+        self.assertEqual(confidence, 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
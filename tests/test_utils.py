@@ -0,0 +1,37 @@
+import sys
+import os
+import io
+import hashlib
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.utils import save_upload
+
+import unittest
+
+class TestSaveUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_stored_under_content_hash(self):
+        data = b"%PDF-1.4 prescription" * 1000
+        sha, path = save_upload(io.BytesIO(data), self.tmp.name, "Scan.PDF", chunk_size=4096)
+        self.assertEqual(sha, hashlib.sha256(data).hexdigest())
+        self.assertEqual(os.path.basename(path), sha + ".pdf")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_same_bytes_under_new_name_share_one_file(self):
+        first = save_upload(io.BytesIO(b"image"), self.tmp.name, "a.jpg")
+        second = save_upload(io.BytesIO(b"image"), self.tmp.name, "b.jpg")
+        other = save_upload(io.BytesIO(b"other image"), self.tmp.name, "a.jpg")
+        self.assertEqual(first, second)
+        self.assertNotEqual(first[0], other[0])
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
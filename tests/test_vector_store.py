@@ -0,0 +1,54 @@
+import sys
+import os
+
+from unittest.mock import MagicMock, patch
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.embedding_cache import EmbeddingCache
+from src.vector_store import VectorStoreManager
+
+import unittest
+
+def make_manager(backend=None):
+    """Build a VectorStoreManager on an injected backend, with a fake Gemini embeddings client."""
+    client = MagicMock()
+    client.embed_documents.side_effect = lambda texts: [[float(len(t)), 1.0] for t in texts]
+    with patch('src.vector_store.Config.GOOGLE_API_KEY', 'test-key'), \
+         patch('src.vector_store.Config.LOCAL_NAMESPACES', []), \
+         patch('src.vector_store.GoogleGenerativeAIEmbeddings', return_value=client), \
+         patch('src.vector_store.get_embedding_cache', return_value=EmbeddingCache()):
+        return VectorStoreManager(backend=backend or MagicMock())
+
+class TestBatchedEmbedding(unittest.TestCase):
+
+    @patch('src.vector_store.Config.EMBED_BATCH_SIZE', 2)
+    def test_add_texts_embeds_in_batches(self):
+        manager = make_manager()
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+        self.assertTrue(manager.add_texts(texts, [{"k": i} for i in range(5)], namespace="ns"))
+
+        self.assertEqual(manager.embeddings.embeddings.embed_documents.call_count, 3)
+        manager.embeddings.embeddings.embed_query.assert_not_called()
+        self.assertEqual(manager.index.upsert.call_count, 3)
+        upserted = [v for call in manager.index.upsert.call_args_list for v in call.kwargs["vectors"]]
+        self.assertEqual([meta["text"] for _, _, meta in upserted], texts)
+        self.assertTrue(all(call.kwargs["namespace"] == "ns" for call in manager.index.upsert.call_args_list))
+        self.assertEqual([t["size"] for t in manager.last_batch_timings], [2, 2, 1])
+
+    def test_add_prescription_ids_and_metadata(self):
+        manager = make_manager()
+
+        manager.add_prescription("rx1", ["first", "second"], {"filename": "a.png"})
+
+        vectors = manager.index.upsert.call_args.kwargs["vectors"]
+        self.assertEqual([v[0] for v in vectors], ["rx1_0", "rx1_1"])
+        self.assertEqual(vectors[1][2]["chunk_id"], 1)
+        self.assertEqual(vectors[1][2]["prescription_id"], "rx1")
+        self.assertEqual(vectors[1][2]["filename"], "a.png")
+        self.assertEqual(manager.get_cached_chunks("rx1"), ["first", "second"])
+
+if __name__ == '__main__':
+    unittest.main()